@@ -32,9 +32,11 @@ from ._extra_metrics import group_mean_underprediction  # noqa: F401
 
 from ._selection_rate import group_selection_rate  # noqa: F401
 
-from ._skm_wrappers import group_accuracy_score, group_confusion_matrix  # noqa: F401
+from ._skm_wrappers import group_accuracy_score  # noqa: F401
+from ._confusion_matrix import group_confusion_matrix  # noqa: F401
 from ._skm_wrappers import group_precision_score, group_recall_score  # noqa: F401
-from ._skm_wrappers import group_roc_auc_score, group_zero_one_loss  # noqa: F401
+from ._roc_auc_score import group_roc_auc_score  # noqa: F401
+from ._skm_wrappers import group_zero_one_loss  # noqa: F401
 from ._skm_wrappers import group_max_error  # noqa: F401
 from ._skm_wrappers import group_mean_absolute_error  # noqa: F401
 from ._skm_wrappers import group_mean_squared_error  # noqa: F401
@@ -43,9 +45,28 @@ from ._skm_wrappers import group_median_absolute_error  # noqa: F401
 from ._skm_wrappers import group_root_mean_squared_error  # noqa: F401
 from ._skm_wrappers import group_r2_score  # noqa: F401
 
+from ._binary_classification_metrics import group_binary_classification_metrics  # noqa: F401
+from ._group_metric_curves import group_metric_curves  # noqa: F401
+from ._calibration import group_expected_calibration_error  # noqa: F401
+from ._calibration import group_max_calibration_error, group_reliability_table  # noqa: F401
+from ._ranking_metrics import group_exposure, group_top_k_selection_rate  # noqa: F401
+
+from ._approximate_metric_by_group import approximate_metric_by_group  # noqa: F401
+from ._approximate_metric_by_group import ApproximateGroupMetricResult  # noqa: F401
+from ._blockwise_metric_by_group import blockwise_metric_by_group  # noqa: F401
+from ._bootstrap_metric_by_group import BootstrapGroupMetricResult  # noqa: F401
+from ._bootstrap_metric_by_group import bootstrap_metric_by_group  # noqa: F401
+from ._group_index import GroupIndex  # noqa: F401
+from ._group_metric_monitor import GroupMetricMonitor  # noqa: F401
 from ._group_metric_result import GroupMetricResult  # noqa: F401
 from ._group_metric_set import create_group_metric_set  # noqa: F401
+from ._group_metric_set import save_group_metric_set, load_group_metric_set  # noqa: F401
 from ._metrics_engine import make_group_metric, metric_by_group  # noqa: F401
+from ._multi_metric import metrics_by_group  # noqa: F401
+from ._multi_model_metrics import metric_by_group_for_models  # noqa: F401
+from ._sharded_metric_by_group import sharded_metric_by_group  # noqa: F401
+from ._streaming_group_metric import StreamingGroupMetric  # noqa: F401
+from ._top_k_groups import metric_by_group_top_k, TopKGroupMetricResult  # noqa: F401
 
 # -------------------------------------------
 
@@ -63,8 +84,12 @@ _extra_metrics = [
 _group_metrics = [
     "group_accuracy_score",
     "group_balanced_root_mean_squared_error",
+    "group_binary_classification_metrics",
     "group_confusion_matrix",
+    "group_expected_calibration_error",
+    "group_exposure",
     "group_fallout_rate",
+    "group_max_calibration_error",
     "group_max_error",
     "group_mean_absolute_error",
     "group_mean_prediction",
@@ -73,21 +98,37 @@ _group_metrics = [
     "group_mean_squared_log_error",
     "group_mean_underprediction",
     "group_median_absolute_error",
+    "group_metric_curves",
     "group_miss_rate",
     "group_precision_score",
     "group_r2_score",
     "group_recall_score",
+    "group_reliability_table",
     "group_roc_auc_score",
     "group_root_mean_squared_error",
     "group_selection_rate",
     "group_specificity_score",
+    "group_top_k_selection_rate",
     "group_zero_one_loss"
 ]
 
 _engine = [
+    "approximate_metric_by_group",
+    "ApproximateGroupMetricResult",
+    "blockwise_metric_by_group",
+    "bootstrap_metric_by_group",
+    "BootstrapGroupMetricResult",
+    "GroupIndex",
+    "GroupMetricMonitor",
     "GroupMetricResult",
     "make_group_metric",
-    "metric_by_group"
+    "metric_by_group",
+    "metric_by_group_for_models",
+    "metric_by_group_top_k",
+    "metrics_by_group",
+    "sharded_metric_by_group",
+    "StreamingGroupMetric",
+    "TopKGroupMetricResult"
 ]
 
 
@@ -0,0 +1,267 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Grouped metrics estimated from a stratified sample, with standard errors.
+
+The groups are the strata: samples are drawn without replacement within
+each group, using the permutation of a :class:`GroupIndex` which makes the
+members of every group contiguous, so no group can be missed. Only the
+sampled rows are gathered and evaluated, so once the groups are encoded
+the cost is proportional to the size of the sample rather than of the data.
+
+The metrics are those which are functions of sums of per-sample
+statistics. The sums of each group are estimated by scaling up the sums
+over its sample, and the sums over the whole dataset by adding the
+estimates of the groups together. Standard errors follow from the
+variance of these sums under sampling without replacement, carried
+through the metric by the delta method.
+"""
+
+import numpy as np
+
+from ._decomposable_metrics import _get_decomposable_metric
+from ._group_index import _get_group_index
+from ._group_metric_result import GroupMetricResult, _ByGroupView
+from ._input_manipulations import _convert_to_ndarray_and_squeeze
+from ._metrics_engine import _check_array_sizes
+
+_NO_ALLOCATION = "One of max_samples_per_group and sampling_fraction must be given"
+_BAD_MAX_SAMPLES = "max_samples_per_group must be a positive integer"
+_BAD_MIN_SAMPLES = "min_samples_per_group must be a positive integer"
+_BAD_FRACTION = "sampling_fraction must be greater than 0 and at most 1"
+_NOT_1D = "Approximate metrics require one dimensional y_true and y_pred"
+
+# Step for the numerical derivatives of the metrics, relative to the sums
+_RELATIVE_STEP = 1e-6
+
+
+class ApproximateGroupMetricResult(GroupMetricResult):
+    """Class to hold a grouped metric estimated from a sample, with standard errors.
+
+    These are produced by the :func:`approximate_metric_by_group` function.
+    Groups which were sampled in full have a standard error of zero, while
+    groups with a single sample drawn from several have an undefined (NaN)
+    standard error.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._overall_standard_error = None
+        self._by_group_standard_error = {}
+        self._by_group_sample_size = {}
+
+    @property
+    def overall_standard_error(self):
+        """Return the standard error of ``overall``."""
+        return self._overall_standard_error
+
+    @property
+    def by_group_standard_error(self):
+        """Return the standard error of the metric for each group.
+
+        This is a mapping with the same keys as ``by_group``.
+        """
+        return self._by_group_standard_error
+
+    @property
+    def by_group_sample_size(self):
+        """Return the number of samples drawn from each group.
+
+        This is a mapping with the same keys as ``by_group``.
+        """
+        return self._by_group_sample_size
+
+    @property
+    def sample_size(self):
+        """Return the total number of samples drawn."""
+        return sum(self._by_group_sample_size.values())
+
+
+def _check_positive_integer(value, message):
+    if isinstance(value, bool) or not isinstance(value, (int, np.integer)) or value < 1:
+        raise ValueError(message)
+
+
+def _allocate(counts, max_samples_per_group, sampling_fraction, min_samples_per_group):
+    """Choose the number of samples to draw from each group.
+
+    With a ``sampling_fraction``, each group gets that fraction of its
+    members, but at least ``min_samples_per_group``. The numbers are then
+    capped at ``max_samples_per_group``, and at the size of each group.
+    """
+    sizes = counts
+    if sampling_fraction is not None:
+        sizes = np.maximum(np.ceil(sampling_fraction * counts).astype(np.intp),
+                           min_samples_per_group)
+    if max_samples_per_group is not None:
+        sizes = np.minimum(sizes, max_samples_per_group)
+    return np.minimum(sizes, counts)
+
+
+def _draw_rows(rng, order, offsets, sizes):
+    """Draw the given number of rows without replacement from each group.
+
+    :return: The indices of the drawn rows, one group after another
+    """
+    counts = np.diff(offsets)
+    ends = np.cumsum(sizes)
+    positions = np.empty(ends[-1] if len(ends) > 0 else 0, dtype=np.intp)
+    for g in np.flatnonzero(sizes):
+        if sizes[g] == counts[g]:
+            chosen = np.arange(counts[g])
+        else:
+            chosen = rng.choice(counts[g], sizes[g], replace=False)
+        positions[ends[g] - sizes[g]:ends[g]] = offsets[g] + chosen
+    return order[positions]
+
+
+def _stratified_sums(statistics, codes, sizes, counts):
+    """Estimate the sums of the statistics of each group, with their covariances.
+
+    :param statistics: Array of shape ``(sample_size, n_statistics)`` of
+        (weighted) statistics of the sampled rows
+
+    :return: Tuple ``(sums, covariances)`` with shapes
+        ``(n_groups, n_statistics)`` and ``(n_groups, n_statistics, n_statistics)``
+    """
+    n_groups, n_statistics = len(sizes), statistics.shape[1]
+    means = np.empty((n_groups, n_statistics))
+    for j in range(n_statistics):
+        means[:, j] = np.bincount(codes, weights=statistics[:, j], minlength=n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means /= sizes[:, np.newaxis]
+
+    centred = statistics - means[codes]
+    cross = np.empty((n_groups, n_statistics, n_statistics))
+    for j in range(n_statistics):
+        for k in range(j + 1):
+            cross[:, j, k] = np.bincount(codes, weights=centred[:, j] * centred[:, k],
+                                         minlength=n_groups)
+            cross[:, k, j] = cross[:, j, k]
+
+    # The variance of the estimated total of a group, with the finite
+    # population correction for sampling without replacement. This cannot
+    # be estimated from a single sample of a larger group
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = counts**2 * (1 - sizes / counts) / (sizes * (sizes - 1))
+    factor = np.where(sizes == counts, 0.0, np.where(sizes > 1, factor, np.nan))
+    return counts[:, np.newaxis] * means, factor[:, np.newaxis, np.newaxis] * cross
+
+
+def _standard_errors(metric, sums, covariances):
+    """Propagate the covariances of the sums through the metric, by the delta method.
+
+    The derivatives of the metric are evaluated by central differences. The
+    standard error is NaN where the metric itself is undefined.
+    """
+    steps = _RELATIVE_STEP * np.abs(sums).max(axis=-1, keepdims=True)
+    steps = np.where(steps > 0, steps, _RELATIVE_STEP)
+    gradient = np.empty(sums.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for j in range(sums.shape[-1]):
+            shift = np.zeros(sums.shape)
+            shift[..., j] = steps[..., 0]
+            gradient[..., j] = (metric.finalize(sums + shift) -
+                                metric.finalize(sums - shift)) / (2 * steps[..., 0])
+    variance = np.einsum('...j,...jk,...k->...', gradient, covariances, gradient)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        undefined = np.isnan(metric.finalize(sums))
+    return np.where(undefined, np.nan, np.sqrt(np.maximum(variance, 0)))
+
+
+def approximate_metric_by_group(metric_function, y_true, y_pred, group_membership,
+                                sample_weight=None, *, max_samples_per_group=None,
+                                sampling_fraction=None, min_samples_per_group=10,
+                                random_state=None):
+    """Estimate a metric for each subgroup from a stratified sample, with standard errors.
+
+    Samples are drawn without replacement within each group, either up to
+    ``max_samples_per_group`` from every group, or a ``sampling_fraction``
+    of every group (proportional allocation) with at least
+    ``min_samples_per_group`` from each, so that small groups are still
+    represented. When both are given, the proportional allocation is capped
+    at ``max_samples_per_group``. The value for each group is the metric of
+    its sample, and ``overall`` is estimated from all the samples, each group
+    being weighted by its size. Only metrics which
+    :class:`StreamingGroupMetric` computes from sums of per-sample statistics
+    are supported. Every ``group_*`` metric made by :func:`make_group_metric`
+    has the same function as its ``approximate`` attribute, taking the
+    arguments after ``group_membership``.
+
+    Passing a :class:`GroupIndex` as ``group_membership`` avoids encoding the
+    groups on every call, after which the cost is proportional to the size
+    of the sample rather than of the data.
+
+    :param metric_function: Function ``(y_true, y_pred, sample_weight=None)``
+
+    :param y_true: Array of ground-truth values
+
+    :param y_pred: Array of predicted values
+
+    :param group_membership: Array indicating the group to which each input value
+        belongs. This may also have a column for each sensitive feature, or be a
+        :class:`GroupIndex`
+
+    :param sample_weight: Optional weights to apply to each input value
+
+    :param max_samples_per_group: The greatest number of samples drawn from any group
+    :type max_samples_per_group: int
+
+    :param sampling_fraction: The fraction of each group to sample
+    :type sampling_fraction: float
+
+    :param min_samples_per_group: The least number of samples drawn from a group
+        with a ``sampling_fraction`` (or all of them, for smaller groups)
+    :type min_samples_per_group: int
+
+    :param random_state: Seed for the random number generator
+    :type random_state: int
+
+    :raises ValueError: If the metric is not supported
+
+    :return: Object containing the estimates and their standard errors
+    :rtype: :class:`ApproximateGroupMetricResult`
+    """
+    _check_array_sizes(y_true, y_pred, 'y_true', 'y_pred')
+    _check_array_sizes(y_true, group_membership, 'y_true', 'group_membership')
+    if sample_weight is not None:
+        _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
+    if max_samples_per_group is None and sampling_fraction is None:
+        raise ValueError(_NO_ALLOCATION)
+    if max_samples_per_group is not None:
+        _check_positive_integer(max_samples_per_group, _BAD_MAX_SAMPLES)
+    if sampling_fraction is not None and not 0 < sampling_fraction <= 1:
+        raise ValueError(_BAD_FRACTION)
+    _check_positive_integer(min_samples_per_group, _BAD_MIN_SAMPLES)
+    metric = _get_decomposable_metric(metric_function)
+
+    y_a = _convert_to_ndarray_and_squeeze(y_true)
+    y_p = _convert_to_ndarray_and_squeeze(y_pred)
+    if y_a.ndim != 1 or y_p.ndim != 1:
+        raise ValueError(_NOT_1D)
+
+    index = _get_group_index(group_membership)
+    counts = index.counts
+    sizes = _allocate(counts, max_samples_per_group, sampling_fraction, min_samples_per_group)
+    rows = _draw_rows(np.random.default_rng(random_state), index.order, index.offsets, sizes)
+    codes = np.repeat(np.arange(index.n_groups), sizes)
+
+    y_a, y_p = y_a[rows], y_p[rows]
+    metric.validate(y_a, y_p)
+    statistics = metric.statistics(y_a, y_p).astype(float)
+    if sample_weight is not None:
+        s_w = _convert_to_ndarray_and_squeeze(sample_weight)[rows].astype(float)
+        statistics *= s_w[:, np.newaxis]
+
+    sums, covariances = _stratified_sums(statistics, codes, sizes, counts)
+    overall_sums, overall_covariance = sums.sum(axis=0), covariances.sum(axis=0)
+
+    result = ApproximateGroupMetricResult()
+    result.overall = metric.finalize(overall_sums)[()]
+    result._set_arrays(index.labels, metric.finalize(sums))
+    result._overall_standard_error = _standard_errors(metric, overall_sums,
+                                                      overall_covariance)[()]
+    result._by_group_standard_error = _ByGroupView(index.labels,
+                                                   _standard_errors(metric, sums, covariances))
+    result._by_group_sample_size = _ByGroupView(index.labels, sizes)
+    return result
@@ -27,7 +27,7 @@ def balanced_root_mean_squared_error(y_true, y_pred, sample_weight=None):
     """
     y_ta = _convert_to_ndarray_and_squeeze(y_true)
     y_pa = _convert_to_ndarray_and_squeeze(y_pred)
-    s_w = np.ones(len(y_ta))
+    s_w = None
     if sample_weight is not None:
         s_w = _convert_to_ndarray_and_squeeze(sample_weight)
 
@@ -40,7 +40,7 @@ def balanced_root_mean_squared_error(y_true, y_pred, sample_weight=None):
         indices = (y_ta == i)
         y_ta_s = y_ta[indices]
         y_pa_s = y_pa[indices]
-        s_w_s = s_w[indices]
-        errs[i] = math.sqrt(skm.mean_squared_error(y_ta_s, y_pa_s, s_w_s))
+        s_w_s = None if s_w is None else s_w[indices]
+        errs[i] = math.sqrt(skm.mean_squared_error(y_ta_s, y_pa_s, sample_weight=s_w_s))
 
     return errs.mean()
@@ -0,0 +1,235 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Binary classification group metrics derived from confusion counts.
+
+Every metric in this module is a function of the (weighted) number of
+true negatives, false positives, false negatives and true positives
+within a group. These counts are computed for all groups at once with
+a single :func:`numpy.bincount`, and the metrics are then derived from
+them, rather than partitioning the data and calling a separate
+metric function for each one.
+"""
+
+import numpy as np
+
+from ._group_metric_result import GroupMetricResult
+from ._group_index import _get_group_index
+from ._input_manipulations import _convert_to_ndarray_and_squeeze
+from ._metrics_engine import _check_array_sizes
+
+_Y_NOT_0_1 = "Only 0 and 1 are allowed in y_true and y_pred"
+
+# The order of the counts matches sklearn.metrics.confusion_matrix(...).ravel()
+# and is equal to 2*y_true + y_pred
+_TN, _FP, _FN, _TP = range(4)
+_N_CELLS = 4
+
+# Upper limit on the number of per-sample values held at once for a block of models
+_MAX_BLOCK_ELEMENTS = 1 << 22
+
+
+def _is_zero_one(y):
+    """Check whether every element of an array is either 0 or 1."""
+    return bool(np.all((y == 0) | (y == 1)))
+
+
+def _confusion_counts(group_codes, n_groups, y_true, y_pred, sample_weight=None):
+    """Compute the (weighted) confusion counts for every group.
+
+    :param group_codes: Integer array of group codes in the range ``[0, n_groups)``
+
+    :param n_groups: The number of distinct groups
+
+    :param y_true: Integer array of true values, all 0 or 1
+
+    :param y_pred: Integer array of predicted values, all 0 or 1
+
+    :param sample_weight: Optional weights to apply to each input value
+
+    :return: Array of shape ``(n_groups, 4)`` where each row holds the counts
+        of true negatives, false positives, false negatives and true positives
+    """
+    keys = group_codes * _N_CELLS + 2 * y_true + y_pred
+    counts = np.bincount(keys, weights=sample_weight, minlength=n_groups * _N_CELLS)
+    return counts.reshape(n_groups, _N_CELLS)
+
+
+def _model_blocks(n_samples, n_models, n_statistics=1):
+    """Split the models into blocks, bounding the size of the temporary arrays.
+
+    :return: List of slices of the models, each holding at most
+        ``_MAX_BLOCK_ELEMENTS`` statistics for all the samples (or a single model)
+    """
+    block_size = max(1, _MAX_BLOCK_ELEMENTS // max(1, n_samples * n_statistics))
+    return [slice(start, min(start + block_size, n_models))
+            for start in range(0, n_models, block_size)]
+
+
+def _model_confusion_counts(group_codes, n_groups, y_true, y_preds, sample_weight=None):
+    """Compute the (weighted) confusion counts for every model and group.
+
+    This is the same as :func:`_confusion_counts`, except that ``y_preds``
+    has shape ``(n_samples, n_models)``. The contribution of ``y_true`` to
+    the bincount keys is computed once, and shared between the models,
+    which are counted a block at a time.
+
+    :param y_preds: Array of predicted values, all 0 or 1
+
+    :return: Array of shape ``(n_models, n_groups, 4)``
+    """
+    n_samples, n_models = y_preds.shape
+    true_keys = group_codes * _N_CELLS + 2 * y_true
+    counts = np.empty((n_models, n_groups, _N_CELLS))
+    for block in _model_blocks(n_samples, n_models):
+        width = block.stop - block.start
+        model_offsets = _N_CELLS * n_groups * np.arange(width)
+        keys = (true_keys[:, np.newaxis] + y_preds[:, block].astype(np.intp) +
+                model_offsets).ravel()
+        s_w = None
+        if sample_weight is not None:
+            s_w = np.repeat(sample_weight, width)
+        block_counts = np.bincount(keys, weights=s_w, minlength=_N_CELLS * n_groups * width)
+        counts[block] = block_counts.reshape(width, n_groups, _N_CELLS)
+    return counts
+
+
+def _safe_divide(numerator, denominator, zero_division):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = numerator / denominator
+    return np.where(denominator == 0, zero_division, result)
+
+
+def _accuracy_score(counts):
+    return (counts[..., _TN] + counts[..., _TP]) / counts.sum(axis=-1)
+
+
+def _zero_one_loss(counts):
+    return (counts[..., _FP] + counts[..., _FN]) / counts.sum(axis=-1)
+
+
+def _precision_score(counts):
+    # Matches sklearn, which returns 0 when there are no predicted positives
+    return _safe_divide(counts[..., _TP], counts[..., _TP] + counts[..., _FP], 0.0)
+
+
+def _recall_score(counts):
+    # Matches sklearn, which returns 0 when there are no true positives
+    return _safe_divide(counts[..., _TP], counts[..., _TP] + counts[..., _FN], 0.0)
+
+
+def _specificity_score(counts):
+    return _safe_divide(counts[..., _TN], counts[..., _TN] + counts[..., _FP], np.nan)
+
+
+def _miss_rate(counts):
+    return 1 - _recall_score(counts)
+
+
+def _fallout_rate(counts):
+    return 1 - _specificity_score(counts)
+
+
+def _selection_rate(counts):
+    return (counts[..., _TP] + counts[..., _FP]) / counts.sum(axis=-1)
+
+
+def _mean_overprediction(counts):
+    return counts[..., _FP] / counts.sum(axis=-1)
+
+
+def _mean_underprediction(counts):
+    return counts[..., _FN] / counts.sum(axis=-1)
+
+
+# Keyed by the name of the corresponding scalar metric
+_CONFUSION_COUNT_METRICS = {
+    "accuracy_score": _accuracy_score,
+    "fallout_rate": _fallout_rate,
+    "mean_overprediction": _mean_overprediction,
+    "mean_underprediction": _mean_underprediction,
+    "miss_rate": _miss_rate,
+    "precision_score": _precision_score,
+    "recall_score": _recall_score,
+    "selection_rate": _selection_rate,
+    "specificity_score": _specificity_score,
+    "zero_one_loss": _zero_one_loss
+}
+
+
+def group_binary_classification_metrics(y_true, y_pred, group_membership,
+                                        sample_weight=None):
+    """Compute every binary classification group metric in a single pass.
+
+    The weighted confusion counts for each group are computed once, and the
+    following metrics are derived from them: ``accuracy_score``,
+    ``fallout_rate``, ``mean_overprediction``, ``mean_underprediction``,
+    ``miss_rate``, ``precision_score``, ``recall_score``, ``selection_rate``,
+    ``specificity_score`` and ``zero_one_loss``.
+    The values match those of the corresponding ``group_*`` functions called
+    with their default arguments.
+
+    :param y_true: Array of ground-truth values, all of which must be 0 or 1
+
+    :param y_pred: Array of predicted values, all of which must be 0 or 1
+
+    :param group_membership: Array indicating the group to which each input value belongs
+
+    :param sample_weight: Optional weights to apply to each input value
+
+    :return: Dictionary mapping the name of each metric to a :class:`GroupMetricResult`
+    :rtype: dict
+    """
+    _check_array_sizes(y_true, y_pred, 'y_true', 'y_pred')
+    _check_array_sizes(y_true, group_membership, 'y_true', 'group_membership')
+    if sample_weight is not None:
+        _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
+
+    y_a = _convert_to_ndarray_and_squeeze(y_true)
+    y_p = _convert_to_ndarray_and_squeeze(y_pred)
+    s_w = None
+    if sample_weight is not None:
+        s_w = _convert_to_ndarray_and_squeeze(sample_weight)
+
+    return _binary_classification_metrics_for_models(y_a, y_p[:, np.newaxis],
+                                                     group_membership, s_w)[0]
+
+
+def _binary_classification_metrics_for_models(y_true, y_preds, group_membership,
+                                              sample_weight=None):
+    """Compute every binary classification group metric for several models.
+
+    The confusion counts for all the models and groups are computed with a
+    :func:`numpy.bincount` for each block of models, sharing the group
+    encoding and the contribution of ``y_true`` between the models.
+
+    :param y_preds: Array of predicted values with shape ``(n_samples, n_models)``
+
+    :return: List with one dictionary for each model, in the same format as
+        returned by :func:`group_binary_classification_metrics`
+    """
+    y_a = _convert_to_ndarray_and_squeeze(y_true)
+    y_ps = np.asarray(y_preds)
+    s_w = None
+    if sample_weight is not None:
+        s_w = _convert_to_ndarray_and_squeeze(sample_weight)
+
+    if not (_is_zero_one(y_a) and _is_zero_one(y_ps)):
+        raise ValueError(_Y_NOT_0_1)
+
+    n_models = y_ps.shape[1]
+    index = _get_group_index(group_membership)
+    groups, group_codes = index.labels, index.codes
+    counts = _model_confusion_counts(group_codes, len(groups),
+                                     y_a.astype(np.intp), y_ps, s_w)
+    overall_counts = counts.sum(axis=1)
+
+    results = [dict() for _ in range(n_models)]
+    for name, derive in _CONFUSION_COUNT_METRICS.items():
+        overall_values = derive(overall_counts)
+        group_values = derive(counts)
+        for m in range(n_models):
+            results[m][name] = GroupMetricResult._from_arrays(overall_values[m], groups,
+                                                              group_values[m])
+
+    return results
@@ -0,0 +1,161 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import os
+import zipfile
+
+import numpy as np
+
+from ._metrics_engine import _check_array_sizes
+from ._streaming_group_metric import StreamingGroupMetric
+
+_DEFAULT_BLOCK_SIZE = 1 << 20
+
+_BAD_BLOCK_SIZE = "block_size must be a positive integer"
+_UNSUPPORTED_FILE = "Unsupported file {0}. Only .npy and .npz files can be read"
+_NPZ_NOT_SINGLE_ARRAY = "The file {0} must contain exactly one array"
+_UNSUPPORTED_NPY_VERSION = "Unsupported .npy format version {0} in {1}"
+_OBJECT_ARRAY_IN_FILE = "The array in {0} has an object dtype, which cannot be read in blocks"
+
+
+class _ArrayBlocks:
+    """Read an array (possibly a memory mapped one) in contiguous blocks."""
+
+    def __init__(self, array):
+        self._array = array
+
+    def __len__(self):
+        return len(self._array)
+
+    def blocks(self, block_size):
+        for start in range(0, len(self._array), block_size):
+            # Basic slicing of a memory map is a view, so only the pages in
+            # this block are read into memory
+            yield _squeeze_block(np.asarray(self._array[start:start+block_size]))
+
+
+class _NpzMemberBlocks:
+    """Read the single array stored in a .npz file in blocks, without loading all of it.
+
+    This works for both compressed and uncompressed archives, since the
+    member is decompressed as a stream.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        with zipfile.ZipFile(path) as archive:
+            names = archive.namelist()
+            if len(names) != 1:
+                raise ValueError(_NPZ_NOT_SINGLE_ARRAY.format(path))
+            self._member = names[0]
+            with archive.open(self._member) as f:
+                self._shape, self._dtype = self._read_header(f)
+
+    def __len__(self):
+        return self._shape[0] if len(self._shape) > 0 else 1
+
+    def blocks(self, block_size):
+        row_shape = self._shape[1:]
+        row_bytes = self._dtype.itemsize * int(np.prod(row_shape))
+        with zipfile.ZipFile(self._path) as archive:
+            with archive.open(self._member) as f:
+                self._read_header(f)
+                remaining = len(self)
+                while remaining > 0:
+                    n_rows = min(block_size, remaining)
+                    buffer = f.read(n_rows * row_bytes)
+                    block = np.frombuffer(buffer, dtype=self._dtype)
+                    yield _squeeze_block(block.reshape((n_rows,) + row_shape))
+                    remaining -= n_rows
+
+    def _read_header(self, f):
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        elif version == (2, 0):
+            shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+        else:
+            raise ValueError(_UNSUPPORTED_NPY_VERSION.format(version, self._path))
+        if dtype.hasobject:
+            raise ValueError(_OBJECT_ARRAY_IN_FILE.format(self._path))
+        return shape, dtype
+
+
+def _squeeze_block(block):
+    if block.ndim > 1 and block.shape[1:] == (1,) * (block.ndim - 1):
+        return block.reshape(len(block))
+    return block
+
+
+def _open_blocks(source):
+    """Wrap an input so that it can be read in blocks.
+
+    Paths to .npy files are memory mapped, and paths to .npz files are
+    streamed from the archive. Anything else is treated as an array.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.npy':
+            return _ArrayBlocks(np.load(path, mmap_mode='r'))
+        elif extension == '.npz':
+            return _NpzMemberBlocks(path)
+        raise ValueError(_UNSUPPORTED_FILE.format(path))
+    if isinstance(source, np.ndarray):
+        # This includes numpy.memmap
+        return _ArrayBlocks(source)
+    return _ArrayBlocks(np.asarray(source))
+
+
+def blockwise_metric_by_group(metric_function,
+                              y_true, y_pred, group_membership,
+                              sample_weight=None,
+                              *, block_size=_DEFAULT_BLOCK_SIZE):
+    """Evaluate a grouped metric by walking through the data in blocks.
+
+    Each of the inputs may be an array (including a :class:`numpy.memmap`),
+    or the path to a ``.npy`` file (which is memory mapped) or to a ``.npz``
+    file containing a single array (which is decompressed as a stream).
+    The data are processed one block of rows at a time, so the peak memory
+    use is proportional to ``block_size`` and the number of groups, rather
+    than to the size of the data.
+    Only the metrics supported by :class:`StreamingGroupMetric` can be
+    evaluated in this way.
+
+    :param metric_function: The metric to evaluate
+    :type metric_function: func
+
+    :param y_true: Array of ground-truth values, or a path to a file containing them
+
+    :param y_pred: Array of predicted values, or a path to a file containing them
+
+    :param group_membership: Array indicating the group to which each input value
+        belongs, or a path to a file containing it
+
+    :param sample_weight: Optional weights to apply to each input value (or a path
+        to a file containing them)
+
+    :param block_size: The number of rows processed at once
+    :type block_size: int
+
+    :return: The same result as :func:`metric_by_group` would produce, except
+        for :py:func:`sklearn.metrics.median_absolute_error`, which is
+        approximated with a quantile sketch. This is exact for groups of up
+        to 200 samples, and for larger groups the rank of the reported error
+        is typically within about 0.85 percent of one half
+    :rtype: :class:`GroupMetricResult`
+    """
+    accumulator = StreamingGroupMetric(metric_function)
+
+    if not isinstance(block_size, int) or block_size < 1:
+        raise ValueError(_BAD_BLOCK_SIZE)
+
+    sources = [_open_blocks(y_true), _open_blocks(y_pred), _open_blocks(group_membership)]
+    _check_array_sizes(sources[0], sources[1], 'y_true', 'y_pred')
+    _check_array_sizes(sources[0], sources[2], 'y_true', 'group_membership')
+    if sample_weight is not None:
+        sources.append(_open_blocks(sample_weight))
+        _check_array_sizes(sources[0], sources[3], 'y_true', 'sample_weight')
+
+    accumulator.update_from_chunks(zip(*[s.blocks(block_size) for s in sources]))
+    return accumulator.result()
@@ -0,0 +1,358 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Bootstrap confidence intervals for grouped metrics.
+
+For metrics which are functions of sums of per-sample statistics, each
+bootstrap replicate is a reweighting of the samples, so the replicated
+group sums are the product of a ``(n_bootstrap, n_samples)`` matrix of
+resampling weights with the per-sample statistics. These products are
+evaluated one contiguous block of each group at a time, so the weight
+matrix is never held in memory all at once. Other metrics are evaluated
+on explicitly resampled data, optionally with the replicates spread over
+an executor.
+"""
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ._decomposable_metrics import _find_fast_path
+from ._group_metric_result import GroupMetricResult
+from ._group_index import _get_group_index
+from ._input_manipulations import _convert_to_ndarray_and_squeeze
+from ._metrics_engine import _check_array_sizes, _metric_by_partition, _sort_data
+
+_POISSON = "poisson"
+_MULTINOMIAL = "multinomial"
+_METHODS = [_POISSON, _MULTINOMIAL]
+
+# Upper limit on the number of resampling weights drawn at once
+_MAX_BLOCK_ELEMENTS = 1 << 22
+
+_BAD_N_BOOTSTRAP = "n_bootstrap must be a positive integer"
+_BAD_CONFIDENCE_LEVEL = "confidence_level must be strictly between 0 and 1"
+_BAD_METHOD = "method must be one of {0}".format(_METHODS)
+_BAD_N_JOBS = "n_jobs must be a positive integer or -1"
+
+
+class BootstrapGroupMetricResult(GroupMetricResult):
+    """Class to hold a grouped metric together with bootstrap confidence intervals.
+
+    These are produced by the :func:`bootstrap_metric_by_group` function.
+    Each interval is a ``(lower, upper)`` tuple of percentiles of the
+    bootstrap distribution. Groups which are absent from a bootstrap
+    replicate are ignored when computing the intervals for that group.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._confidence_level = None
+        self._n_bootstrap = None
+        self._overall_interval = None
+        self._by_group_interval = {}
+        self._range_interval = None
+        self._range_ratio_interval = None
+
+    @property
+    def confidence_level(self):
+        """Return the confidence level of the intervals."""
+        return self._confidence_level
+
+    @property
+    def n_bootstrap(self):
+        """Return the number of bootstrap replicates used to compute the intervals."""
+        return self._n_bootstrap
+
+    @property
+    def overall_interval(self):
+        """Return the confidence interval of ``overall``."""
+        return self._overall_interval
+
+    @property
+    def by_group_interval(self):
+        """Return the confidence interval of the metric for each group.
+
+        This is a dictionary with the same keys as ``by_group``.
+        """
+        return self._by_group_interval
+
+    @property
+    def range_interval(self):
+        """Return the confidence interval of ``range``."""
+        return self._range_interval
+
+    @property
+    def range_ratio_interval(self):
+        """Return the confidence interval of ``range_ratio``."""
+        return self._range_ratio_interval
+
+
+def _draw_block_weights(rng, method, n_bootstrap, block_size, remaining):
+    """Draw the resampling weights of the next block of samples.
+
+    For the multinomial bootstrap, the number of draws falling in the
+    block is binomial given the draws which remain, and those draws are
+    then spread uniformly over the samples of the block. Proceeding block
+    by block in this way yields a multinomial sample over all the data.
+
+    :param remaining: Tuple ``(draws, samples)`` of the number of draws left
+        in each replicate, and the number of samples not yet visited. This
+        is ignored for the Poisson bootstrap
+    """
+    if method == _POISSON:
+        return rng.poisson(1.0, size=(n_bootstrap, block_size)), remaining
+    draws, samples = remaining
+    if block_size == samples:
+        in_block = draws
+    else:
+        in_block = rng.binomial(draws, block_size / samples)
+    weights = rng.multinomial(in_block, np.full(block_size, 1 / block_size))
+    return weights, (draws - in_block, samples - block_size)
+
+
+def _bootstrap_group_sums(metric, sorted_data, offsets, n_bootstrap, method, rng):
+    """Compute the group sums of the statistics for every bootstrap replicate.
+
+    :return: Tuple of the sums, with shape ``(n_bootstrap, n_groups, n_statistics)``,
+        and the number of resampled points in each group, with shape
+        ``(n_bootstrap, n_groups)``
+    """
+    y_a, y_p, s_w = sorted_data
+    stats = metric.statistics(y_a, y_p)
+    if s_w is not None:
+        stats = stats * s_w[:, np.newaxis]
+
+    n_groups = len(offsets) - 1
+    sums = np.zeros((n_bootstrap, n_groups, metric.n_statistics))
+    support = np.zeros((n_bootstrap, n_groups))
+    remaining = (np.full(n_bootstrap, len(y_a)), len(y_a))
+    block_size = max(1, _MAX_BLOCK_ELEMENTS // n_bootstrap)
+    for g in range(n_groups):
+        for start in range(offsets[g], offsets[g+1], block_size):
+            stop = min(start + block_size, offsets[g+1])
+            weights, remaining = _draw_block_weights(rng, method, n_bootstrap,
+                                                     stop - start, remaining)
+            sums[:, g, :] += weights @ stats[start:stop]
+            support[:, g] += weights.sum(axis=1)
+    return sums, support
+
+
+def _resample_positions(rng, method, n):
+    """Draw a resample of the positions ``0..n-1``, returned in sorted order."""
+    if method == _POISSON:
+        counts = rng.poisson(1.0, size=n)
+    else:
+        counts = rng.multinomial(n, np.full(n, 1 / n))
+    return np.repeat(np.arange(n), counts)
+
+
+def _evaluate_replicates(metric_function, sorted_data, offsets, method, seeds, kwargs):
+    """Evaluate a metric for the bootstrap replicates drawn from each of the seeds.
+
+    The data are sorted by group, and the resampled positions are sorted,
+    so every group remains a contiguous slice of each resample.
+
+    :return: Tuple of the overall values, with shape ``(len(seeds),)``, and the
+        group values, with shape ``(len(seeds), n_groups)``. Groups which are
+        absent from a replicate are given the value NaN
+    """
+    n_groups = len(offsets) - 1
+    overall = np.full(len(seeds), np.nan)
+    by_group = np.full((len(seeds), n_groups), np.nan)
+    for b, seed in enumerate(seeds):
+        positions = _resample_positions(np.random.default_rng(seed), method, offsets[-1])
+        if len(positions) == 0:
+            # Possible for the Poisson bootstrap of a very small dataset
+            continue
+        resampled = _sort_data(sorted_data, positions)
+        bounds = np.searchsorted(positions, offsets)
+        present = np.flatnonzero(np.diff(bounds) > 0)
+        # Absent groups have empty slices, so each present group ends where
+        # the next present group starts
+        result = _metric_by_partition(metric_function, resampled, resampled, present,
+                                      np.append(bounds[present], bounds[-1]), kwargs)
+        overall[b] = result.overall
+        for g in present:
+            by_group[b, g] = result.by_group[g]
+    return overall, by_group
+
+
+def _evaluate_replicates_concurrently(metric_function, sorted_data, offsets, method, seeds,
+                                      kwargs, executor, n_jobs):
+    """Evaluate the replicates of :func:`_evaluate_replicates` in batches over an executor.
+
+    If no ``executor`` is given, a :class:`concurrent.futures.ProcessPoolExecutor`
+    with ``n_jobs`` workers is created for the duration of the call.
+    """
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs)
+    try:
+        n_batches = min(len(seeds), os.cpu_count() or 1)
+        futures = [executor.submit(_evaluate_replicates, metric_function,
+                                   sorted_data, offsets, method, batch, kwargs)
+                   for batch in np.array_split(seeds, n_batches)]
+        batches = [f.result() for f in futures]
+    finally:
+        if own_executor:
+            executor.shutdown()
+    return np.concatenate([b[0] for b in batches]), np.concatenate([b[1] for b in batches])
+
+
+def _range_replicates(by_group):
+    """Compute ``range`` and ``range_ratio`` for each row of group values.
+
+    This follows :class:`GroupMetricResult`, ignoring absent (NaN) groups.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        minimum = np.nanmin(by_group, axis=1)
+        maximum = np.nanmax(by_group, axis=1)
+        ratio = np.where(minimum < 0, np.nan,
+                         np.where(maximum == 0, 1.0, minimum / maximum))
+    return maximum - minimum, ratio
+
+
+def _percentile_intervals(replicates, confidence_level):
+    """Compute the percentile interval of each column of the replicates."""
+    alpha = (1 - confidence_level) / 2
+    with warnings.catch_warnings():
+        # Columns which are entirely NaN give a NaN interval
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        lower, upper = np.nanquantile(replicates, [alpha, 1 - alpha], axis=0)
+    return lower, upper
+
+
+def bootstrap_metric_by_group(metric_function,
+                              y_true, y_pred, group_membership,
+                              sample_weight=None,
+                              *, n_bootstrap=1000, confidence_level=0.95,
+                              method=_POISSON, random_state=None, executor=None,
+                              n_jobs=None, **kwargs):
+    r"""Apply a metric to each subgroup, with bootstrap confidence intervals.
+
+    The point estimates are the same as those of :func:`metric_by_group`.
+    Confidence intervals are computed for ``overall``, for each group, and
+    for the ``range`` and ``range_ratio`` disparities, by evaluating the
+    metric on ``n_bootstrap`` resamples of the data.
+
+    When ``metric_function`` can be computed from sums of per-sample
+    statistics (for example :py:func:`sklearn.metrics.accuracy_score` or
+    :py:func:`sklearn.metrics.mean_squared_error`) and no ``kwargs`` are
+    given, all the replicates are evaluated at once as matrix products of
+    the resampling weights with the statistics. Otherwise, the metric is
+    called on each resample. This is done in the calling process, unless
+    ``n_jobs`` or an ``executor`` is given to spread the replicates over
+    several workers, in which case ``metric_function`` must be picklable
+    for worker processes.
+
+    :param metric_function: Function ``(y_true, y_pred, sample_weight=None, \*\*kwargs)``
+
+    :param y_true: Array of ground-truth values
+
+    :param y_pred: Array of predicted values
+
+    :param group_membership: Array indicating the group to which each input value belongs
+
+    :param sample_weight: Optional weights to apply to each input value
+
+    :param n_bootstrap: The number of bootstrap replicates
+    :type n_bootstrap: int
+
+    :param confidence_level: The confidence level of the percentile intervals
+    :type confidence_level: float
+
+    :param method: Either ``"poisson"``, where every sample is included a
+        Poisson(1) number of times, or ``"multinomial"``, which draws
+        ``n_samples`` samples with replacement
+    :type method: str
+
+    :param random_state: Seed for the random number generator
+    :type random_state: int
+
+    :param executor: Optional :class:`concurrent.futures.Executor` used to evaluate
+        the replicates of metrics which are called on each resample
+    :type executor: concurrent.futures.Executor
+
+    :param n_jobs: If no ``executor`` is given, the number of worker processes
+        used to evaluate the replicates of metrics which are called on each
+        resample, or -1 for one per CPU
+    :type n_jobs: int
+
+    :param \*\*kwargs: Optional arguments to be passed to the `metric_function`
+
+    :return: Object containing the point estimates and the confidence intervals
+    :rtype: :class:`BootstrapGroupMetricResult`
+    """
+    if not isinstance(n_bootstrap, int) or n_bootstrap < 1:
+        raise ValueError(_BAD_N_BOOTSTRAP)
+    if not 0 < confidence_level < 1:
+        raise ValueError(_BAD_CONFIDENCE_LEVEL)
+    if method not in _METHODS:
+        raise ValueError(_BAD_METHOD)
+    if n_jobs is not None and n_jobs != -1 and (not isinstance(n_jobs, int) or n_jobs < 1):
+        raise ValueError(_BAD_N_JOBS)
+
+    _check_array_sizes(y_true, y_pred, 'y_true', 'y_pred')
+    _check_array_sizes(y_true, group_membership, 'y_true', 'group_membership')
+    if sample_weight is not None:
+        _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
+
+    y_a = _convert_to_ndarray_and_squeeze(y_true)
+    y_p = _convert_to_ndarray_and_squeeze(y_pred)
+    s_w = None
+    if sample_weight is not None:
+        s_w = _convert_to_ndarray_and_squeeze(sample_weight)
+
+    index = _get_group_index(group_membership)
+    groups = index.labels
+    order, offsets = index.order, index.offsets
+    data = (y_a, y_p, s_w)
+    sorted_data = _sort_data(data, order)
+
+    point_estimate = _metric_by_partition(metric_function, data, sorted_data,
+                                          groups, offsets, kwargs)
+
+    rng = np.random.default_rng(random_state)
+    metric = _find_fast_path(metric_function, y_a, y_p, kwargs)
+    if metric is not None:
+        sums, support = _bootstrap_group_sums(metric, sorted_data, offsets,
+                                              n_bootstrap, method, rng)
+        # Replicates in which a group is absent, or for which the metric is
+        # undefined (such as a group with a single class), give NaN
+        overall = np.full(n_bootstrap, np.nan)
+        by_group = np.full(support.shape, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            present = support.sum(axis=1) > 0
+            overall[present] = metric.finalize(sums[present].sum(axis=1))
+            by_group[support > 0] = metric.finalize(sums[support > 0])
+    else:
+        seeds = rng.integers(np.iinfo(np.int64).max, size=n_bootstrap)
+        if executor is None and n_jobs in (None, 1):
+            overall, by_group = _evaluate_replicates(metric_function, sorted_data, offsets,
+                                                     method, seeds, kwargs)
+        else:
+            overall, by_group = _evaluate_replicates_concurrently(
+                metric_function, sorted_data, offsets, method, seeds, kwargs,
+                executor, n_jobs)
+
+    result = BootstrapGroupMetricResult()
+    result.overall = point_estimate.overall
+    result.by_group = point_estimate.by_group
+    result._confidence_level = confidence_level
+    result._n_bootstrap = n_bootstrap
+
+    range_values, range_ratio_values = _range_replicates(by_group)
+    lower, upper = _percentile_intervals(
+        np.column_stack((overall, range_values, range_ratio_values, by_group)),
+        confidence_level)
+    result._overall_interval = (lower[0], upper[0])
+    result._range_interval = (lower[1], upper[1])
+    result._range_ratio_interval = (lower[2], upper[2])
+    for i, group in enumerate(groups):
+        result._by_group_interval[group] = (lower[3+i], upper[3+i])
+
+    return result
@@ -0,0 +1,176 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Per-group calibration metrics from a single bincount.
+
+The predicted probabilities are divided into equal width bins, as in
+:py:func:`sklearn.calibration.calibration_curve`. Every calibration
+metric depends only on the total weight, the weighted sum of the predicted
+probabilities and the weighted number of positives in each bin, so these
+are computed for every ``(group, bin)`` pair with a single
+:func:`numpy.bincount`, and the metrics of all the groups are derived from
+them.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ._binary_classification_metrics import _is_zero_one
+from ._group_index import _get_group_index
+from ._group_metric_result import GroupMetricResult
+from ._input_manipulations import _convert_to_ndarray_and_squeeze
+from ._metrics_engine import _check_array_sizes
+
+_Y_TRUE_NOT_0_1 = "Only 0 and 1 are allowed in y_true"
+_PROB_NOT_IN_RANGE = "All the predicted probabilities must be in the interval [0, 1]"
+_BAD_N_BINS = "n_bins must be a positive integer"
+
+# The statistics accumulated for each bin
+_WEIGHT, _PROB_SUM, _POSITIVE_SUM = range(3)
+_N_STATISTICS = 3
+
+_RELIABILITY_COLUMNS = ['bin_lower', 'bin_upper', 'weight', 'mean_predicted_probability',
+                        'fraction_of_positives']
+
+
+def _calibration_sums(y_true, y_prob, group_codes, n_groups, n_bins, sample_weight):
+    """Accumulate the statistics of every probability bin of every group.
+
+    :return: Array of shape ``(n_groups, n_bins, 3)`` holding the total
+        weight, the weighted sum of the predicted probabilities and the
+        weighted number of positives in each bin
+    """
+    edges = np.linspace(0.0, 1.0, n_bins + 1)
+    # As in sklearn, a probability on an edge belongs to the lower bin
+    bins = np.searchsorted(edges[1:-1], y_prob)
+    weights = np.ones(len(y_prob)) if sample_weight is None else sample_weight
+
+    cells = (group_codes * n_bins + bins) * _N_STATISTICS
+    keys = np.concatenate((cells + _WEIGHT, cells + _PROB_SUM, cells + _POSITIVE_SUM))
+    statistics = np.concatenate((weights, weights * y_prob, weights * y_true))
+    sums = np.bincount(keys, weights=statistics, minlength=n_groups * n_bins * _N_STATISTICS)
+    return sums.reshape(n_groups, n_bins, _N_STATISTICS)
+
+
+def _bin_gaps(sums):
+    """Compute the absolute gap between the accuracy and confidence of each bin."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.abs(sums[..., _POSITIVE_SUM] - sums[..., _PROB_SUM]) / sums[..., _WEIGHT]
+
+
+def _expected_calibration_error(sums):
+    gaps = np.abs(sums[..., _POSITIVE_SUM] - sums[..., _PROB_SUM])
+    return gaps.sum(axis=-1) / sums[..., _WEIGHT].sum(axis=-1)
+
+
+def _max_calibration_error(sums):
+    gaps = _bin_gaps(sums)
+    return np.where(sums[..., _WEIGHT] > 0, gaps, -np.inf).max(axis=-1)
+
+
+def _reliability_table(sums, edges):
+    nonempty = sums[:, _WEIGHT] > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table = {
+            'bin_lower': edges[:-1],
+            'bin_upper': edges[1:],
+            'weight': sums[:, _WEIGHT],
+            'mean_predicted_probability': sums[:, _PROB_SUM] / sums[:, _WEIGHT],
+            'fraction_of_positives': sums[:, _POSITIVE_SUM] / sums[:, _WEIGHT]
+        }
+    return pd.DataFrame(table, columns=_RELIABILITY_COLUMNS)[nonempty].reset_index(drop=True)
+
+
+def _group_calibration_sums(y_true, y_prob, group_membership, sample_weight, n_bins):
+    """Validate the arguments and compute the bin statistics for every group.
+
+    :return: Tuple ``(groups, sums, overall_sums)``
+    """
+    _check_array_sizes(y_true, y_prob, 'y_true', 'y_prob')
+    _check_array_sizes(y_true, group_membership, 'y_true', 'group_membership')
+    if sample_weight is not None:
+        _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
+    if isinstance(n_bins, bool) or not isinstance(n_bins, (int, np.integer)) or n_bins < 1:
+        raise ValueError(_BAD_N_BINS)
+
+    y_a = _convert_to_ndarray_and_squeeze(y_true)
+    y_p = _convert_to_ndarray_and_squeeze(y_prob).astype(float)
+    s_w = None
+    if sample_weight is not None:
+        s_w = _convert_to_ndarray_and_squeeze(sample_weight).astype(float)
+    if not _is_zero_one(y_a):
+        raise ValueError(_Y_TRUE_NOT_0_1)
+    if not np.all((y_p >= 0) & (y_p <= 1)):
+        raise ValueError(_PROB_NOT_IN_RANGE)
+
+    index = _get_group_index(group_membership)
+    groups, group_codes = index.labels, index.codes
+    sums = _calibration_sums(y_a.astype(float), y_p, group_codes, len(groups), n_bins, s_w)
+    return groups, sums, sums.sum(axis=0)
+
+
+def group_expected_calibration_error(y_true, y_prob, group_membership,
+                                     sample_weight=None, n_bins=10):
+    """Compute the expected calibration error (ECE) of each group.
+
+    The predicted probabilities are divided into ``n_bins`` bins of equal
+    width. The ECE is the average, weighted by the number of samples in each
+    bin, of the absolute difference between the fraction of positives and
+    the mean predicted probability of the bin.
+
+    :param y_true: Array of ground-truth values, all of which must be 0 or 1
+
+    :param y_prob: Array of predicted probabilities of the positive class
+
+    :param group_membership: Array indicating the group to which each input value belongs
+
+    :param sample_weight: Optional weights to apply to each input value
+
+    :param n_bins: The number of probability bins
+    :type n_bins: int
+
+    :rtype: :class:`GroupMetricResult`
+    """
+    groups, sums, overall_sums = _group_calibration_sums(y_true, y_prob, group_membership,
+                                                         sample_weight, n_bins)
+    return GroupMetricResult._from_arrays(_expected_calibration_error(overall_sums), groups,
+                                          _expected_calibration_error(sums))
+
+
+def group_max_calibration_error(y_true, y_prob, group_membership,
+                                sample_weight=None, n_bins=10):
+    """Compute the maximum calibration error (MCE) of each group.
+
+    This is the greatest absolute difference between the fraction of
+    positives and the mean predicted probability of any non-empty bin. The
+    arguments are the same as for :func:`group_expected_calibration_error`.
+
+    :rtype: :class:`GroupMetricResult`
+    """
+    groups, sums, overall_sums = _group_calibration_sums(y_true, y_prob, group_membership,
+                                                         sample_weight, n_bins)
+    return GroupMetricResult._from_arrays(_max_calibration_error(overall_sums), groups,
+                                          _max_calibration_error(sums))
+
+
+def group_reliability_table(y_true, y_prob, group_membership, sample_weight=None, n_bins=10):
+    """Compute the reliability curve of each group as a table.
+
+    The table has a row for each non-empty probability bin, with the columns
+    ``bin_lower``, ``bin_upper``, ``weight`` (the number of samples, or their
+    total weight), ``mean_predicted_probability`` and
+    ``fraction_of_positives``. The last two match the values returned by
+    :py:func:`sklearn.calibration.calibration_curve`. The arguments are the
+    same as for :func:`group_expected_calibration_error`.
+
+    :return: Object holding a :class:`pandas.DataFrame` for all the data and for each group
+    :rtype: :class:`GroupMetricResult`
+    """
+    groups, sums, overall_sums = _group_calibration_sums(y_true, y_prob, group_membership,
+                                                         sample_weight, n_bins)
+    edges = np.linspace(0.0, 1.0, n_bins + 1)
+    result = GroupMetricResult()
+    result.overall = _reliability_table(overall_sums, edges)
+    for g, group in enumerate(groups):
+        result.by_group[group] = _reliability_table(sums[g], edges)
+    return result
@@ -0,0 +1,147 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Per-group confusion matrices from a single bincount.
+
+The true and predicted labels are encoded as positions in a common list
+of ``K`` labels, so that every sample is identified by the triple
+``(group, true label, predicted label)``. Counting these triples with one
+:func:`numpy.bincount` gives a ``(G, K, K)`` tensor which holds the
+confusion matrix of every group, with the same rows and columns.
+"""
+
+import numpy as np
+import sklearn.metrics as skm
+
+from ._group_index import _get_group_index
+from ._group_metric_result import GroupMetricResult
+from ._input_manipulations import _convert_to_ndarray_and_squeeze
+from ._metrics_engine import _check_array_sizes, metric_by_group
+
+
+def _label_codes(values, labels):
+    """Find the position of each value in an array of labels.
+
+    :return: Array of positions, with ``-1`` for values which are not labels
+    """
+    sorter = np.argsort(labels, kind='stable')
+    positions = np.searchsorted(labels, values, sorter=sorter)
+    positions = np.minimum(positions, len(labels) - 1)
+    codes = sorter[positions]
+    return np.where(labels[codes] == values, codes, -1)
+
+
+def _group_confusion_tensor(true_codes, pred_codes, group_codes, n_groups, n_labels,
+                            sample_weight):
+    """Count the samples of each group with each pair of true and predicted labels.
+
+    Samples whose true or predicted label code is ``-1`` are ignored, as
+    :py:func:`sklearn.metrics.confusion_matrix` ignores values which are not
+    among its labels.
+
+    :return: Array of shape ``(n_groups, n_labels, n_labels)``, where entry
+        ``[g, i, j]`` is the (weighted) number of samples in group ``g`` with
+        true label code ``i`` and predicted label code ``j``
+    """
+    keep = (true_codes >= 0) & (pred_codes >= 0)
+
+    keys = (group_codes[keep] * n_labels + true_codes[keep]) * n_labels + pred_codes[keep]
+    weights = None if sample_weight is None else sample_weight[keep]
+    counts = np.bincount(keys, weights=weights, minlength=n_groups * n_labels * n_labels)
+
+    # Follow sklearn in using integer counts, unless the weights are not integers
+    if sample_weight is None or sample_weight.dtype.kind in 'biu':
+        counts = counts.astype(np.int64)
+    return counts.reshape(n_groups, n_labels, n_labels)
+
+
+def _fast_path_labels(y_true, y_pred, labels, kwargs):
+    """Find the labels of the confusion matrices, if the fast path applies.
+
+    :return: Array of labels, or ``None`` if
+        :py:func:`sklearn.metrics.confusion_matrix` has to be called for each group
+    """
+    if kwargs or y_true.ndim != 1 or y_pred.ndim != 1 or len(y_true) == 0:
+        return None
+    # Leave sklearn to check and report unusual or mixed types of labels
+    kinds = {y_true.dtype.kind, y_pred.dtype.kind}
+    if not (kinds <= set('biu') or kinds <= set('U')):
+        return None
+
+    if labels is None:
+        return np.union1d(y_true, y_pred)
+    labels = np.asarray(labels)
+    if labels.ndim != 1 or len(labels) == 0 or len(np.unique(labels)) != len(labels):
+        return None
+    if labels.dtype.kind not in kinds and not (kinds <= set('biu') and labels.dtype.kind in 'biu'):
+        return None
+    return labels
+
+
+def group_confusion_matrix(y_true, y_pred, group_membership, sample_weight=None, **kwargs):
+    r"""Wrap the :py:func:`sklearn.metrics.confusion_matrix` routine.
+
+    The arguments remain the same, with `group_membership` added.
+    For single output data with integer or string labels, the confusion
+    matrices of all the groups are counted at once. As with calling
+    ``confusion_matrix`` on each group, the matrix of a group covers only
+    the labels which occur in that group, unless ``labels`` is given. In
+    that case, every matrix has a row and column for each of the ``labels``,
+    and is a view of a single ``(n_groups, n_labels, n_labels)`` array.
+    """
+    _check_array_sizes(y_true, y_pred, 'y_true', 'y_pred')
+    _check_array_sizes(y_true, group_membership, 'y_true', 'group_membership')
+    if sample_weight is not None:
+        _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
+
+    labels = kwargs.pop('labels', None)
+    y_a = _convert_to_ndarray_and_squeeze(y_true)
+    y_p = _convert_to_ndarray_and_squeeze(y_pred)
+    all_labels = _fast_path_labels(y_a, y_p, labels, kwargs)
+    if all_labels is None:
+        if labels is not None:
+            kwargs['labels'] = labels
+        return metric_by_group(skm.confusion_matrix,
+                               y_true, y_pred, group_membership, sample_weight,
+                               **kwargs)
+
+    s_w = None
+    if sample_weight is not None:
+        s_w = _convert_to_ndarray_and_squeeze(sample_weight)
+
+    index = _get_group_index(group_membership)
+    n_groups, n_labels = index.n_groups, len(all_labels)
+
+    # Which labels occur in the true and predicted values of each group
+    true_codes = _label_codes(y_a, all_labels)
+    pred_codes = _label_codes(y_p, all_labels)
+    in_true = np.zeros((n_groups, n_labels), dtype=bool)
+    in_true[index.codes[true_codes >= 0], true_codes[true_codes >= 0]] = True
+    in_pred = np.zeros((n_groups, n_labels), dtype=bool)
+    in_pred[index.codes[pred_codes >= 0], pred_codes[pred_codes >= 0]] = True
+
+    if labels is not None and not np.all(in_true.any(axis=1)):
+        # Let sklearn raise the error for a group without any of the labels
+        return metric_by_group(skm.confusion_matrix,
+                               y_true, y_pred, group_membership, sample_weight,
+                               labels=labels)
+
+    tensor = _group_confusion_tensor(true_codes, pred_codes, index.codes, n_groups, n_labels,
+                                     s_w)
+
+    result = GroupMetricResult()
+    # Count the overall matrix separately rather than summing the groups,
+    # so that weighted counts are added in the same order as by sklearn
+    result.overall = _group_confusion_tensor(true_codes, pred_codes,
+                                             np.zeros(len(y_a), dtype=np.intp), 1, n_labels,
+                                             s_w)[0]
+    for g, group in enumerate(index.labels):
+        if labels is not None:
+            result.by_group[group] = tensor[g]
+        else:
+            present = np.flatnonzero(in_true[g] | in_pred[g])
+            if len(present) == n_labels:
+                result.by_group[group] = tensor[g]
+            else:
+                result.by_group[group] = tensor[g][np.ix_(present, present)]
+    return result
@@ -0,0 +1,357 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Metrics which can be computed from sums of per-sample statistics.
+
+Many metrics can be written as a function of a small, fixed number
+of (weighted) sums over the samples. For example, the mean squared
+error only needs the sum of the weights and the weighted sum of the
+squared errors. For these metrics the per-group state has a constant
+size, and partial states for different parts of the data can be
+combined simply by adding them together.
+"""
+
+import numpy as np
+import sklearn.metrics as skm
+
+from ._balanced_root_mean_squared_error import balanced_root_mean_squared_error
+from ._balanced_root_mean_squared_error import _Y_TRUE_NOT_0_1
+from ._binary_classification_metrics import _CONFUSION_COUNT_METRICS, _N_CELLS
+from ._binary_classification_metrics import _Y_NOT_0_1
+from ._binary_classification_metrics import _confusion_counts, _is_zero_one
+from ._binary_classification_metrics import _model_blocks, _model_confusion_counts
+from ._extra_metrics import fallout_rate, miss_rate, specificity_score
+from ._group_metric_result import GroupMetricResult
+from ._mean_predictions import mean_prediction, mean_overprediction, mean_underprediction
+from ._selection_rate import selection_rate
+
+_UNSUPPORTED_METRIC = "The metric {0} cannot be computed from sums of per-sample statistics"
+_NEGATIVE_VALUES_LOG_ERROR = "Mean Squared Logarithmic Error cannot be used when " \
+    "targets contain negative values."
+
+
+class _DecomposableMetric:
+    """A metric which is a function of weighted sums of per-sample statistics.
+
+    :param n_statistics: The number of statistics computed for each sample
+
+    :param statistics: Function ``(y_true, y_pred)`` returning an array of shape
+        ``(n_samples, n_statistics)``
+
+    :param finalize: Function which maps an array of sums with shape
+        ``(..., n_statistics)`` to the metric values, with shape ``(...)``
+
+    :param validate: Optional function ``(y_true, y_pred)`` which raises an
+        exception if the metric cannot be applied to the data
+
+    :param check: Optional function ``(sums)`` which raises an exception if the
+        metric is undefined for any of the sums. The ``finalize`` function
+        gives NaN for these, and ``check`` is only called where the error of
+        the original metric function has to be reproduced
+
+    :param exact: Whether the decomposed form matches the original metric function
+        for all valid data. When this is ``False``, the decomposed form is not
+        used as a substitute for calling the original function
+    """
+
+    def __init__(self, n_statistics, statistics, finalize, validate=None, exact=True,
+                 check=None):
+        self.n_statistics = n_statistics
+        self.exact = exact
+        # Metrics with the same sums_key share their group sums, so these
+        # only need to be computed once when evaluating several metrics
+        self.sums_key = self
+        self._statistics = statistics
+        self._finalize = finalize
+        self._validate = validate
+        self._check = check
+
+    def validate(self, y_true, y_pred):
+        """Raise an exception if the metric cannot be applied to the data."""
+        if self._validate is not None:
+            self._validate(y_true, y_pred)
+
+    def check(self, sums):
+        """Raise an exception if the metric is undefined for any of the sums."""
+        if self._check is not None:
+            self._check(np.asarray(sums, dtype=float))
+
+    def statistics(self, y_true, y_pred):
+        """Compute the statistics for each sample."""
+        return self._statistics(y_true, y_pred)
+
+    def group_sums(self, group_codes, n_groups, y_true, y_pred, sample_weight=None):
+        """Compute the weighted sums of the statistics for each group.
+
+        :return: Array of shape ``(n_groups, n_statistics)``
+        """
+        stats = self.statistics(y_true, y_pred)
+        if sample_weight is not None:
+            stats = stats * sample_weight[:, np.newaxis]
+        sums = np.empty((n_groups, self.n_statistics))
+        for j in range(self.n_statistics):
+            sums[:, j] = np.bincount(group_codes, weights=stats[:, j], minlength=n_groups)
+        return sums
+
+    def model_group_sums(self, group_codes, n_groups, y_true, y_preds, sample_weight=None):
+        """Compute the weighted sums of the statistics for each model and group.
+
+        :param y_preds: Array of shape ``(n_samples, n_models)``
+
+        :return: Array of shape ``(n_models, n_groups, n_statistics)``
+        """
+        n_samples, n_models = y_preds.shape
+        sums = np.empty((n_models, n_groups, self.n_statistics))
+        for block in _model_blocks(n_samples, n_models, self.n_statistics):
+            width = block.stop - block.start
+            codes = (group_codes[:, np.newaxis] + n_groups * np.arange(width)).ravel()
+            s_w = None
+            if sample_weight is not None:
+                s_w = np.repeat(sample_weight, width)
+            block_sums = self.group_sums(codes, n_groups * width, np.repeat(y_true, width),
+                                         y_preds[:, block].ravel(), s_w)
+            sums[block] = block_sums.reshape(width, n_groups, self.n_statistics)
+        return sums
+
+    def finalize(self, sums):
+        """Compute the metric from the sums of the statistics."""
+        return self._finalize(np.asarray(sums, dtype=float))
+
+
+class _ConfusionCountMetric(_DecomposableMetric):
+    """A binary classification metric which is a function of the confusion counts."""
+
+    def __init__(self, finalize):
+        super().__init__(_N_CELLS, self._cell_indicators, finalize, self._check_zero_one)
+        self.sums_key = _ConfusionCountMetric
+
+    @staticmethod
+    def _check_zero_one(y_true, y_pred):
+        if not (_is_zero_one(y_true) and _is_zero_one(y_pred)):
+            raise ValueError(_Y_NOT_0_1)
+
+    @staticmethod
+    def _cell_indicators(y_true, y_pred):
+        cells = 2 * y_true.astype(np.intp) + y_pred.astype(np.intp)
+        return np.eye(_N_CELLS)[cells]
+
+    def group_sums(self, group_codes, n_groups, y_true, y_pred, sample_weight=None):
+        """Compute the weighted confusion counts for each group with a single bincount."""
+        return _confusion_counts(group_codes, n_groups,
+                                 y_true.astype(np.intp), y_pred.astype(np.intp),
+                                 sample_weight).astype(float)
+
+    def model_group_sums(self, group_codes, n_groups, y_true, y_preds, sample_weight=None):
+        """Compute the weighted confusion counts for each model and group, a block at a time."""
+        return _model_confusion_counts(group_codes, n_groups, y_true.astype(np.intp),
+                                       y_preds, sample_weight)
+
+
+class _WeightedMeanMetric(_DecomposableMetric):
+    """A metric which is the weighted mean of a per-sample quantity."""
+
+    def __init__(self, per_sample, validate=None):
+        super().__init__(2, self._mean_statistics, self._mean_finalize, validate)
+        self._per_sample = per_sample
+
+    def _mean_statistics(self, y_true, y_pred):
+        return np.column_stack((np.ones(len(y_true)), self._per_sample(y_true, y_pred)))
+
+    def group_sums(self, group_codes, n_groups, y_true, y_pred, sample_weight=None):
+        """Compute the total weight, and the weighted sum of the quantity, for each group.
+
+        The total weights come straight from the group codes, so only the
+        per-sample quantity is computed.
+        """
+        values = self._per_sample(y_true, y_pred)
+        if sample_weight is not None:
+            values = values * sample_weight
+        sums = np.empty((n_groups, 2))
+        sums[:, 0] = np.bincount(group_codes, weights=sample_weight, minlength=n_groups)
+        sums[:, 1] = np.bincount(group_codes, weights=values, minlength=n_groups)
+        return sums
+
+    @staticmethod
+    def _mean_finalize(sums):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return sums[..., 1] / sums[..., 0]
+
+
+def _error(y_true, y_pred):
+    return y_pred.astype(float) - y_true.astype(float)
+
+
+def _prediction(y_true, y_pred):
+    return y_pred.astype(float)
+
+
+def _overprediction(y_true, y_pred):
+    return np.maximum(_error(y_true, y_pred), 0)
+
+
+def _underprediction(y_true, y_pred):
+    return np.maximum(-_error(y_true, y_pred), 0)
+
+
+def _squared_error(y_true, y_pred):
+    return np.square(_error(y_true, y_pred))
+
+
+def _absolute_error(y_true, y_pred):
+    return np.abs(_error(y_true, y_pred))
+
+
+def _squared_log_error(y_true, y_pred):
+    return np.square(np.log1p(y_pred.astype(float)) - np.log1p(y_true.astype(float)))
+
+
+def _check_non_negative(y_true, y_pred):
+    if (y_true < 0).any() or (y_pred < 0).any():
+        raise ValueError(_NEGATIVE_VALUES_LOG_ERROR)
+
+
+def _check_y_true_zero_one(y_true, y_pred):
+    if not _is_zero_one(y_true):
+        raise ValueError(_Y_TRUE_NOT_0_1)
+
+
+def _balanced_rmse_statistics(y_true, y_pred):
+    is_one = (y_true == 1)
+    squared_error = np.square(_error(y_true, y_pred))
+    return np.column_stack((~is_one, np.where(is_one, 0, squared_error),
+                            is_one, np.where(is_one, squared_error, 0)))
+
+
+def _balanced_rmse_finalize(sums):
+    # The metric is undefined (NaN) unless both classes are present
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = (np.sqrt(sums[..., 1] / sums[..., 0]) +
+                  np.sqrt(sums[..., 3] / sums[..., 2])) / 2
+    return np.where((sums[..., 0] > 0) & (sums[..., 2] > 0), values, np.nan)
+
+
+def _balanced_rmse_check(sums):
+    # Both classes must be present, as in balanced_root_mean_squared_error
+    if np.any(sums[..., 0] == 0) or np.any(sums[..., 2] == 0):
+        raise ValueError(_Y_TRUE_NOT_0_1)
+
+
+def _r2_statistics(y_true, y_pred):
+    y_t = y_true.astype(float)
+    return np.column_stack((np.ones(len(y_t)), y_t, np.square(y_t),
+                            np.square(_error(y_true, y_pred))))
+
+
+def _r2_finalize(sums):
+    weight, total, total_squares, residual = np.moveaxis(sums, -1, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denominator = total_squares - np.square(total) / weight
+        # Follow sklearn.metrics.r2_score for constant y_true
+        return np.where(denominator > 0,
+                        1 - residual / denominator,
+                        np.where(residual == 0, 1.0, 0.0))
+
+
+def _build_registry():
+    registry = dict()
+
+    for metric_function in [skm.accuracy_score, fallout_rate, miss_rate,
+                            skm.precision_score, skm.recall_score, selection_rate,
+                            specificity_score, skm.zero_one_loss]:
+        finalize = _CONFUSION_COUNT_METRICS[metric_function.__name__]
+        registry[metric_function] = _ConfusionCountMetric(finalize)
+
+    registry[mean_prediction] = _WeightedMeanMetric(_prediction)
+    registry[mean_overprediction] = _WeightedMeanMetric(_overprediction)
+    registry[mean_underprediction] = _WeightedMeanMetric(_underprediction)
+    registry[skm.mean_squared_error] = _WeightedMeanMetric(_squared_error)
+    registry[skm.mean_absolute_error] = _WeightedMeanMetric(_absolute_error)
+    registry[skm.mean_squared_log_error] = _WeightedMeanMetric(_squared_log_error,
+                                                               _check_non_negative)
+    # sklearn returns NaN for r2_score when there is only one sample
+    registry[skm.r2_score] = _DecomposableMetric(4, _r2_statistics, _r2_finalize, exact=False)
+    registry[balanced_root_mean_squared_error] = _DecomposableMetric(
+        4, _balanced_rmse_statistics, _balanced_rmse_finalize,
+        validate=_check_y_true_zero_one, check=_balanced_rmse_check)
+
+    return registry
+
+
+_DECOMPOSABLE_METRICS = _build_registry()
+
+# The metrics for which metric_by_group uses the kernels by default
+_DEFAULT_FAST_PATH_METRICS = [mean_prediction,
+                              mean_overprediction,
+                              mean_underprediction,
+                              skm.mean_squared_error,
+                              skm.mean_absolute_error,
+                              balanced_root_mean_squared_error]
+
+
+def _get_decomposable_metric(metric_function):
+    """Look up the decomposed form of a metric function.
+
+    :raises ValueError: If the metric cannot be computed from sums of statistics
+    """
+    try:
+        return _DECOMPOSABLE_METRICS[metric_function]
+    except (KeyError, TypeError):
+        name = getattr(metric_function, '__name__', repr(metric_function))
+        raise ValueError(_UNSUPPORTED_METRIC.format(name))
+
+
+def _find_fast_path(metric_function, y_true, y_pred, kwargs):
+    """Find a decomposed form of a metric which can replace calls to it.
+
+    :return: The decomposed metric, or ``None`` if ``metric_function`` has to
+        be called directly (because it has no exact decomposed form, extra
+        arguments were supplied, or the data are not suitable)
+    """
+    if kwargs:
+        return None
+    try:
+        metric = _DECOMPOSABLE_METRICS.get(metric_function)
+    except TypeError:
+        return None
+    if metric is None or not metric.exact:
+        return None
+    if y_true.ndim != 1 or y_pred.ndim not in (1, 2) or len(y_true) == 0:
+        return None
+    try:
+        metric.validate(y_true, y_pred)
+    except ValueError:
+        # Let the metric function raise (or not) on its own terms
+        return None
+    return metric
+
+
+def _find_default_fast_path(metric_function, y_true, y_pred, kwargs):
+    """Find the per-group kernel which :func:`metric_by_group` uses for a metric.
+
+    This is only done for the regression metrics in
+    ``_DEFAULT_FAST_PATH_METRICS``, and single output data.
+
+    :return: The decomposed metric, or ``None`` if ``metric_function`` has to
+        be called for each group
+    """
+    if y_pred.ndim != 1 or metric_function not in _DEFAULT_FAST_PATH_METRICS:
+        return None
+    return _find_fast_path(metric_function, y_true, y_pred, kwargs)
+
+
+def _result_from_sums(metric, sums, groups, strict=True):
+    """Build a :class:`GroupMetricResult` from the statistic sums of each group.
+
+    :param sums: Array of shape ``(n_groups, n_statistics)``
+
+    :param groups: The label of each row of ``sums``
+
+    :param strict: Whether to raise the error of the metric function if it is
+        undefined for any group (or overall), rather than giving NaN
+    """
+    overall = sums.sum(axis=0)
+    if strict:
+        metric.check(overall)
+        metric.check(sums)
+    return GroupMetricResult._from_arrays(metric.finalize(overall)[()],
+                                          groups, metric.finalize(sums))
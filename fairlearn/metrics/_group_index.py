@@ -0,0 +1,190 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from ._group_partition import _encode_group_membership, _partition
+
+_BAD_CACHE_SIZE = "maxsize must be a non-negative integer"
+
+
+class GroupIndex:
+    """Encoding of the group membership of a set of samples, for reuse.
+
+    Every grouped metric starts by finding the distinct groups in
+    ``group_membership`` and the group of each sample, and most then
+    compute a permutation which brings the members of each group together.
+    When many metrics or models are evaluated against the same sensitive
+    features, a :class:`GroupIndex` can be built once and passed in place
+    of ``group_membership`` to :func:`metric_by_group`, the ``group_*``
+    metrics, :func:`create_group_metric_set` and
+    :class:`fairlearn.widget.FairlearnDashboard`, so that this work is
+    not repeated.
+
+    The indices can also be reused automatically: after
+    ``GroupIndex.set_cache_size(n)``, the indices of the ``n`` most recently
+    used ``group_membership`` arrays are kept, keyed by a hash of their
+    contents, and are found again when an equal array is passed.
+
+    :param group_membership: Array-like of group labels, with one row per
+        sample. This may have several columns (one per sensitive feature),
+        in which case the groups are the combinations of their values
+    """
+
+    _cache = OrderedDict()
+    _cache_size = 0
+
+    def __init__(self, group_membership):
+        labels, codes = _encode_group_membership(group_membership)
+        codes = np.asarray(codes, dtype=np.intp)
+        codes.flags.writeable = False
+        self._labels = labels
+        self._codes = codes
+        self._partition = None
+
+    @property
+    def labels(self):
+        """Return the sorted labels of the groups (tuples for several columns)."""
+        return self._labels
+
+    @property
+    def codes(self):
+        """Return the (read-only) position in :attr:`labels` of each sample's group."""
+        return self._codes
+
+    @property
+    def n_groups(self):
+        """Return the number of distinct groups."""
+        return len(self._labels)
+
+    @property
+    def order(self):
+        """Return the stable permutation which makes each group contiguous."""
+        return self._get_partition()[0]
+
+    @property
+    def offsets(self):
+        """Return the start of each group in the permuted samples, followed by the total."""
+        return self._get_partition()[1]
+
+    @property
+    def counts(self):
+        """Return the number of samples in each group."""
+        return np.diff(self.offsets)
+
+    def __len__(self):
+        """Return the number of samples."""
+        return len(self._codes)
+
+    def decode(self):
+        """Return the group label of each sample.
+
+        :return: Array with one entry per sample, or one row per sample if the
+            groups are defined by several columns
+        :rtype: numpy.ndarray
+        """
+        if len(self._labels) > 0 and isinstance(self._labels[0], tuple):
+            rows = np.empty((self.n_groups, len(self._labels[0])), dtype=object)
+            rows[:] = self._labels
+            return rows[self._codes]
+        return np.asarray(self._labels)[self._codes]
+
+    @classmethod
+    def set_cache_size(cls, maxsize):
+        """Set the number of indices kept for automatic reuse.
+
+        Zero (the default) disables the cache. Finding an index in the cache
+        requires a pass over the data to hash it, which is generally much
+        cheaper than encoding the groups again.
+
+        :param maxsize: The maximum number of cached indices
+        :type maxsize: int
+        """
+        if not isinstance(maxsize, int) or maxsize < 0:
+            raise ValueError(_BAD_CACHE_SIZE)
+        cls._cache_size = maxsize
+        while len(cls._cache) > maxsize:
+            cls._cache.popitem(last=False)
+
+    @classmethod
+    def clear_cache(cls):
+        """Discard all the cached indices."""
+        cls._cache.clear()
+
+    def _get_partition(self):
+        if self._partition is None:
+            order, offsets = _partition(self._codes, self.n_groups)
+            order.flags.writeable = False
+            offsets.flags.writeable = False
+            self._partition = (order, offsets)
+        return self._partition
+
+
+def _fingerprint(group_membership):
+    """Hash the contents of an array-like of group labels.
+
+    Object columns (such as strings) are hashed element-wise by pandas,
+    while numeric columns are hashed directly from their memory. Categorical
+    columns are hashed through their codes and categories.
+    """
+    if isinstance(group_membership, pd.DataFrame):
+        columns = [group_membership.iloc[:, j] for j in range(group_membership.shape[1])]
+        columns = [column.array if isinstance(column.dtype, pd.CategoricalDtype)
+                   else column.to_numpy() for column in columns]
+    elif isinstance(group_membership, pd.Series) and \
+            isinstance(group_membership.dtype, pd.CategoricalDtype):
+        columns = [group_membership.array]
+    elif isinstance(group_membership, pd.Categorical):
+        columns = [group_membership]
+    else:
+        g_d = np.asarray(group_membership)
+        columns = list(g_d.T) if g_d.ndim == 2 else [g_d.reshape(-1)]
+
+    digest = hashlib.sha1()
+    for column in columns:
+        if isinstance(column, pd.Categorical):
+            # Hash the codes and the categories, rather than every label
+            _hash_column(digest, column.categories.to_numpy())
+            column = column.codes
+        _hash_column(digest, column)
+    return type(group_membership).__name__, digest.hexdigest()
+
+
+def _hash_column(digest, column):
+    """Add a one dimensional array to a hash, along with its type."""
+    digest.update(str((column.dtype, column.shape)).encode())
+    if column.dtype.hasobject:
+        # Objects are hashed through their string form, so that 1 and '1'
+        # hash alike, and the kind of values has to be hashed as well
+        digest.update(pd.api.types.infer_dtype(column, skipna=False).encode())
+        column = pd.util.hash_array(column)
+    digest.update(np.ascontiguousarray(column).view(np.uint8))
+
+
+def _get_group_index(group_membership):
+    """Find the :class:`GroupIndex` for the ``group_membership`` of a metric.
+
+    :param group_membership: A :class:`GroupIndex`, which is returned as it is,
+        or an array-like of group labels
+
+    :rtype: :class:`GroupIndex`
+    """
+    if isinstance(group_membership, GroupIndex):
+        return group_membership
+    if GroupIndex._cache_size == 0:
+        return GroupIndex(group_membership)
+
+    key = _fingerprint(group_membership)
+    index = GroupIndex._cache.get(key)
+    if index is None:
+        index = GroupIndex(group_membership)
+        GroupIndex._cache[key] = index
+        if len(GroupIndex._cache) > GroupIndex._cache_size:
+            GroupIndex._cache.popitem(last=False)
+    else:
+        GroupIndex._cache.move_to_end(key)
+    return index
@@ -0,0 +1,145 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Group metrics at every decision threshold from one sort of the scores.
+
+A sample is predicted positive at threshold ``t`` when its score is at
+least ``t``. Once the thresholds are sorted, each sample is assigned the
+position of the greatest threshold not above its score, and the positives
+and negatives of every group at every position are counted with a single
+:func:`numpy.bincount`. A cumulative sum over the thresholds, from the
+greatest down, then gives the confusion counts of every group at every
+threshold, from which the metrics are derived.
+"""
+
+import numpy as np
+
+from ._binary_classification_metrics import (
+    _CONFUSION_COUNT_METRICS, _is_zero_one, _TN, _FP, _FN, _TP, _N_CELLS)
+from ._group_index import _get_group_index
+from ._group_metric_result import GroupMetricResult
+from ._input_manipulations import _convert_to_ndarray_and_squeeze
+from ._metrics_engine import _check_array_sizes
+
+_Y_TRUE_NOT_0_1 = "Only 0 and 1 are allowed in y_true"
+_SCORES_NOT_FINITE = "All scores must be finite"
+_UNKNOWN_CURVE_METRIC = "Unknown metric {0}; must be one of {1}"
+
+_DEFAULT_CURVE_METRICS = ("selection_rate", "recall_score", "fallout_rate")
+
+
+def _threshold_counts(threshold_codes, positive, weights, group_codes, n_groups, n_thresholds):
+    """Compute the confusion counts of every group at every threshold.
+
+    :param threshold_codes: For each sample, the position in the ascending
+        thresholds of the greatest threshold not above its score, or ``-1`` if
+        its score is below every threshold
+
+    :return: Array of shape ``(n_groups, n_thresholds, 4)`` holding the counts
+        of true negatives, false positives, false negatives and true positives
+    """
+    above = threshold_codes >= 0
+    keys = ((group_codes[above] * n_thresholds + threshold_codes[above]) * 2
+            + positive[above])
+    w = None if weights is None else weights[above]
+    at = np.bincount(keys, weights=w, minlength=n_groups * n_thresholds * 2)
+    at = at.reshape(n_groups, n_thresholds, 2)
+    # The samples predicted positive at a threshold are those assigned to it
+    # or to any greater threshold
+    predicted = np.cumsum(at[:, ::-1, :], axis=1)[:, ::-1, :]
+
+    class_totals = np.bincount(group_codes * 2 + positive, weights=weights,
+                               minlength=n_groups * 2).reshape(n_groups, 1, 2)
+
+    counts = np.empty((n_groups, n_thresholds, _N_CELLS), dtype=predicted.dtype)
+    counts[..., _FP] = predicted[..., 0]
+    counts[..., _TP] = predicted[..., 1]
+    counts[..., _TN] = class_totals[..., 0] - predicted[..., 0]
+    counts[..., _FN] = class_totals[..., 1] - predicted[..., 1]
+    return counts
+
+
+def group_metric_curves(y_true, scores, group_membership, sample_weight=None,
+                        thresholds=None, metric_names=_DEFAULT_CURVE_METRICS):
+    """Compute binary classification group metrics at many decision thresholds.
+
+    At a threshold ``t``, the samples with a score of at least ``t`` are
+    predicted to be positive. The scores are sorted once, and the metrics of
+    every group at every threshold are derived from cumulative confusion
+    counts, so that the cost is ``O(n log n + G T)`` for ``n`` samples,
+    ``G`` groups and ``T`` thresholds. The values match those of the
+    corresponding ``group_*`` functions called with the thresholded
+    predictions.
+
+    :param y_true: Array of ground-truth values, all of which must be 0 or 1
+
+    :param scores: Array of scores, where greater scores are more likely to be positive
+
+    :param group_membership: Array indicating the group to which each input value belongs
+
+    :param sample_weight: Optional weights to apply to each input value
+
+    :param thresholds: Optional array of thresholds at which to evaluate the metrics.
+        By default, every distinct score is used, in descending order
+    :type thresholds: array-like
+
+    :param metric_names: The metrics to compute, from those returned by
+        :func:`group_binary_classification_metrics`. By default,
+        ``selection_rate``, ``recall_score`` and ``fallout_rate``
+    :type metric_names: list[str]
+
+    :return: Tuple of the thresholds, and a dictionary mapping the name of
+        each metric to a :class:`GroupMetricResult`. The ``overall`` value and
+        the value for each group are arrays with one entry per threshold
+    :rtype: tuple
+    """
+    _check_array_sizes(y_true, scores, 'y_true', 'scores')
+    _check_array_sizes(y_true, group_membership, 'y_true', 'group_membership')
+    if sample_weight is not None:
+        _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
+    for name in metric_names:
+        if name not in _CONFUSION_COUNT_METRICS:
+            raise ValueError(_UNKNOWN_CURVE_METRIC.format(
+                name, sorted(_CONFUSION_COUNT_METRICS.keys())))
+
+    y_a = _convert_to_ndarray_and_squeeze(y_true)
+    s = _convert_to_ndarray_and_squeeze(scores).astype(float)
+    s_w = None
+    if sample_weight is not None:
+        s_w = _convert_to_ndarray_and_squeeze(sample_weight).astype(float)
+    if not _is_zero_one(y_a):
+        raise ValueError(_Y_TRUE_NOT_0_1)
+    if not np.all(np.isfinite(s)):
+        raise ValueError(_SCORES_NOT_FINITE)
+
+    if thresholds is None:
+        # The distinct scores, and the position of each sample's score among them
+        ascending, threshold_codes = np.unique(s, return_inverse=True)
+        threshold_codes = threshold_codes.reshape(-1)
+        result_order = np.arange(len(ascending) - 1, -1, -1)
+        thresholds = ascending[::-1]
+    else:
+        thresholds = np.asarray(thresholds, dtype=float).reshape(-1)
+        result_order = np.argsort(thresholds, kind='stable')
+        ascending = thresholds[result_order]
+        threshold_codes = np.searchsorted(ascending, s, side='right') - 1
+        # Put the counts back in the order in which the thresholds were given
+        result_order = np.argsort(result_order, kind='stable')
+
+    index = _get_group_index(group_membership)
+    groups, group_codes = index.labels, index.codes
+    counts = _threshold_counts(threshold_codes, y_a.astype(np.intp), s_w,
+                               group_codes, len(groups), len(ascending))
+    counts = counts[:, result_order, :]
+    overall_counts = counts.sum(axis=0)
+
+    curves = dict()
+    for name in metric_names:
+        derive = _CONFUSION_COUNT_METRICS[name]
+        group_values = derive(counts)
+        result = GroupMetricResult()
+        result.overall = derive(overall_counts)
+        for g, group in enumerate(groups):
+            result.by_group[group] = group_values[g]
+        curves[name] = result
+    return thresholds, curves
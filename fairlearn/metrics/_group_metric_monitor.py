@@ -0,0 +1,273 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+
+from ._decomposable_metrics import _get_decomposable_metric, _result_from_sums
+from ._group_partition import _encode_groups_1d
+from ._input_manipulations import _convert_to_ndarray_1d
+from ._metrics_engine import _check_array_sizes
+from ._streaming_group_metric import _NO_DATA
+
+_METRICS_NOT_DICT = "metric_functions must be a dictionary of metric functions"
+_WINDOW_AND_DECAY = "Only one of window and decay can be given"
+_BAD_WINDOW = "window must be a positive integer"
+_BAD_DECAY = "decay must be in the interval (0, 1]"
+
+# The decayed sums are rescaled before their scale factor underflows
+_MIN_SCALE = 1e-100
+
+
+class GroupMetricMonitor:
+    """Track grouped metrics over a stream of events.
+
+    Events can be supplied one at a time or in micro-batches with
+    :meth:`observe`, and the metrics evaluated at any point with
+    :meth:`snapshot`. The metrics can be restricted to the most recent
+    events in one of two ways:
+
+    * With a ``window`` of ``N``, only the last ``N`` events are used. These
+      are held in a ring buffer, and the statistics of the events which fall
+      out of the window are subtracted from the group sums.
+    * With a ``decay`` factor, the weight of each event is multiplied by
+      ``decay`` whenever a later event is observed.
+
+    If neither is given, all the events are used, as with
+    :class:`StreamingGroupMetric`. In every case, the cost of
+    :meth:`observe` is proportional to the number of events supplied
+    (amortized over the stream), not to the size of the window.
+    Only the metrics which :class:`StreamingGroupMetric` computes from sums
+    of per-sample statistics can be tracked, and metrics which share the
+    same statistics (such as :py:func:`selection_rate`,
+    :py:func:`sklearn.metrics.recall_score` and :py:func:`fallout_rate`)
+    also share their state.
+
+    :param metric_functions: Dictionary of the metric functions to track
+    :type metric_functions: dict
+
+    :param window: The number of most recent events over which the metrics
+        are evaluated
+    :type window: int
+
+    :param decay: The factor applied to the weight of every event each time a
+        new event is observed
+    :type decay: float
+
+    :raises ValueError: If any of the metrics is not supported
+    """
+
+    def __init__(self, metric_functions, *, window=None, decay=None):
+        if not isinstance(metric_functions, dict):
+            raise ValueError(_METRICS_NOT_DICT)
+        if window is not None and decay is not None:
+            raise ValueError(_WINDOW_AND_DECAY)
+        if window is not None and (not isinstance(window, int) or window < 1):
+            raise ValueError(_BAD_WINDOW)
+        if decay is not None and not 0 < decay <= 1:
+            raise ValueError(_BAD_DECAY)
+
+        self._metric_functions = dict(metric_functions)
+        self._metrics = {name: _get_decomposable_metric(f)
+                         for name, f in metric_functions.items()}
+        self._window = window
+        self._decay = decay
+
+        self._labels = []
+        self._codes = {}
+        # The weighted statistic sums of each group, for each distinct
+        # set of statistics
+        self._sums = {metric.sums_key: np.zeros((0, metric.n_statistics))
+                      for metric in self._metrics.values()}
+        # The number of events of each group which are currently counted
+        self._counts = np.zeros(0, dtype=np.int64)
+
+        # With a window, the group and the weighted statistics of each
+        # event in the window are kept in ring buffers
+        self._size = 0
+        self._position = 0
+        if window is not None:
+            self._ring_codes = np.zeros(window, dtype=np.intp)
+            self._ring_statistics = {key: np.zeros((window, sums.shape[1]))
+                                     for key, sums in self._sums.items()}
+
+        # With decay, the decayed sums are self._sums multiplied by self._scale
+        self._scale = 1.0
+
+    @property
+    def metric_functions(self):
+        """Return the dictionary of metrics being tracked."""
+        return dict(self._metric_functions)
+
+    @property
+    def window(self):
+        """Return the number of events in the sliding window, if any."""
+        return self._window
+
+    @property
+    def decay(self):
+        """Return the decay factor, if any."""
+        return self._decay
+
+    def observe(self, y_true, y_pred, group_membership, sample_weight=None):
+        """Add a single event, or a batch of events, to the monitor.
+
+        :param y_true: Ground-truth value, or array of them
+
+        :param y_pred: Predicted value, or array of them
+
+        :param group_membership: The group of the event, or array of them
+
+        :param sample_weight: Optional weight of each event
+
+        :return: This object
+        """
+        if np.ndim(y_true) == 0:
+            y_true, y_pred, group_membership = [y_true], [y_pred], [group_membership]
+            if sample_weight is not None:
+                sample_weight = [sample_weight]
+
+        _check_array_sizes(y_true, y_pred, 'y_true', 'y_pred')
+        _check_array_sizes(y_true, group_membership, 'y_true', 'group_membership')
+        if sample_weight is not None:
+            _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
+        if len(y_true) == 0:
+            return self
+
+        y_a = _convert_to_ndarray_1d(y_true)
+        y_p = _convert_to_ndarray_1d(y_pred)
+        s_w = None
+        if sample_weight is not None:
+            s_w = _convert_to_ndarray_1d(sample_weight).astype(float)
+
+        statistics = dict()
+        for metric in self._metrics.values():
+            metric.validate(y_a, y_p)
+            if metric.sums_key not in statistics:
+                stats = metric.statistics(y_a, y_p).astype(float)
+                if s_w is not None:
+                    stats *= s_w[:, np.newaxis]
+                statistics[metric.sums_key] = stats
+
+        chunk_labels, chunk_codes = _encode_groups_1d(group_membership)
+        codes = self._codes_for(chunk_labels)[chunk_codes]
+
+        if self._window is not None:
+            self._observe_window(codes, statistics)
+        elif self._decay is not None:
+            self._observe_decay(codes, statistics)
+        else:
+            self._add(codes, statistics, 1)
+        return self
+
+    def snapshot(self):
+        """Evaluate the metrics over the events currently being tracked.
+
+        Groups which have no events in the window are omitted, and a metric
+        which is undefined for the events of a group (such as
+        :py:func:`balanced_root_mean_squared_error` when only one class is
+        present) is NaN.
+
+        :return: Dictionary with the same keys as ``metric_functions``, holding
+            the value of each metric
+        :rtype: dict
+        """
+        present = np.flatnonzero(self._counts > 0)
+        if len(present) == 0:
+            raise ValueError(_NO_DATA)
+
+        # Report the groups in sorted order, as metric_by_group does
+        order = sorted(present, key=lambda i: self._labels[i])
+        groups = [self._labels[i] for i in order]
+        result = dict()
+        for name, metric in self._metrics.items():
+            sums = self._sums[metric.sums_key][order] * self._scale
+            result[name] = _result_from_sums(metric, sums, groups, strict=False)
+        return result
+
+    def _add(self, codes, statistics, sign):
+        """Add (or subtract) the statistics of some events to the group sums."""
+        n_groups = len(self._labels)
+        if len(codes) < n_groups:
+            # For small batches, only touch the groups which are present
+            for key, stats in statistics.items():
+                np.add.at(self._sums[key], codes, sign * stats)
+            np.add.at(self._counts, codes, sign)
+            return
+        for key, stats in statistics.items():
+            sums = self._sums[key]
+            for j in range(sums.shape[1]):
+                sums[:, j] += sign * np.bincount(codes, weights=stats[:, j],
+                                                 minlength=n_groups)
+        self._counts += sign * np.bincount(codes, minlength=n_groups)
+
+    def _observe_window(self, codes, statistics):
+        window = self._window
+        # Only the last events of a batch larger than the window are kept
+        if len(codes) > window:
+            codes = codes[-window:]
+            statistics = {key: stats[-window:] for key, stats in statistics.items()}
+        n = len(codes)
+
+        # The events are written in order, wrapping around the ring. Once
+        # the ring is full, the oldest events are the ones being overwritten
+        positions = (self._position + np.arange(n)) % window
+        n_evicted = max(0, self._size + n - window)
+        if n_evicted > 0:
+            evicted = positions[n - n_evicted:]
+            self._add(self._ring_codes[evicted],
+                      {key: ring[evicted] for key, ring in self._ring_statistics.items()},
+                      -1)
+
+        self._ring_codes[positions] = codes
+        for key, stats in statistics.items():
+            self._ring_statistics[key][positions] = stats
+        self._add(codes, statistics, 1)
+
+        wrapped = self._position + n >= window
+        self._position = (self._position + n) % window
+        self._size = min(window, self._size + n)
+
+        if wrapped:
+            # Recompute the sums from the ring once per pass through it, so
+            # that rounding errors from the subtractions do not accumulate
+            for key in self._sums:
+                self._sums[key][:] = 0
+            self._counts[:] = 0
+            self._add(self._ring_codes, self._ring_statistics, 1)
+
+    def _observe_decay(self, codes, statistics):
+        n = len(codes)
+        # Decaying the earlier events only changes the scale factor, except
+        # when it becomes so small that the sums have to be rescaled
+        scale = self._scale * self._decay ** n
+        if scale < _MIN_SCALE:
+            for sums in self._sums.values():
+                sums *= scale
+            scale = 1.0
+        self._scale = scale
+
+        # The most recent event has weight one, and the earlier events
+        # in the batch have already decayed
+        event_weights = self._decay ** np.arange(n - 1, -1, -1, dtype=float) / self._scale
+        self._add(codes,
+                  {key: stats * event_weights[:, np.newaxis]
+                   for key, stats in statistics.items()},
+                  1)
+
+    def _codes_for(self, labels):
+        """Look up the code of each label, assigning codes to new labels."""
+        result = np.empty(len(labels), dtype=np.intp)
+        for i, label in enumerate(labels):
+            code = self._codes.get(label)
+            if code is None:
+                code = len(self._labels)
+                self._codes[label] = code
+                self._labels.append(label)
+            result[i] = code
+
+        n_new = len(self._labels) - len(self._counts)
+        if n_new > 0:
+            for key, sums in self._sums.items():
+                self._sums[key] = np.vstack((sums, np.zeros((n_new, sums.shape[1]))))
+            self._counts = np.concatenate((self._counts, np.zeros(n_new, dtype=np.int64)))
+        return result
@@ -1,7 +1,39 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+from collections.abc import Mapping
+
 import numpy as np
+import pandas as pd
+
+
+class _ByGroupView(Mapping):
+    """Read-only mapping from group labels to the values in an array.
+
+    The index from labels to positions is only built when a value is
+    looked up by label.
+    """
+
+    __slots__ = ('_labels', '_values', '_index')
+
+    def __init__(self, labels, values):
+        self._labels = labels
+        self._values = values
+        self._index = None
+
+    def __getitem__(self, key):
+        if self._index is None:
+            self._index = {label: i for i, label in enumerate(self._labels)}
+        return self._values[self._index[key]]
+
+    def __iter__(self):
+        return iter(self._labels)
+
+    def __len__(self):
+        return len(self._labels)
+
+    def __repr__(self):
+        return repr(dict(self))
 
 
 class GroupMetricResult:
@@ -9,14 +41,49 @@ class GroupMetricResult:
 
     Grouped metrics are produced by the :func:`metric_by_group`
     function.
+
+    When the metric is a scalar, the values for the groups are held in a
+    single array, and ``by_group`` is a read-only view of it. The
+    reductions such as ``minimum`` and ``argmin_set`` are then computed
+    once, and cached. Otherwise, ``by_group`` is a dictionary.
     """
 
+    __slots__ = ('_overall', '_by_group', '_groups', '_values', '_cache', '_range_ratio')
+
     def __init__(self):
         # The 'overall' property is the given metric evaluated without regard to group
         self._overall = None
         # The 'by_group' dictionary contains the metric for each group found in the
         # input
         self._by_group = {}
+        # For scalar metrics, the group labels and the array of values
+        self._groups = None
+        self._values = None
+        self._cache = None
+
+    @classmethod
+    def _from_arrays(cls, overall, groups, values):
+        """Create a result backed by an array of values for the groups.
+
+        :param overall: The metric evaluated on the entire dataset
+
+        :param groups: Sequence of group labels
+
+        :param values: One dimensional numeric array with the value for each group.
+            This is made read-only, and is not copied
+        """
+        result = cls()
+        result.overall = overall
+        result._set_arrays(groups, values)
+        return result
+
+    def _set_arrays(self, groups, values):
+        values = np.asarray(values)
+        values.setflags(write=False)
+        self._groups = groups
+        self._values = values
+        self._by_group = _ByGroupView(groups, values)
+        self._cache = dict()
 
     @property
     def overall(self):
@@ -31,25 +98,50 @@ class GroupMetricResult:
     def by_group(self):
         """Return the metric calculated for each sub-group in the dataset.
 
-        This is a dictionary whose keys are the unique members of
+        This is a mapping whose keys are the unique members of
         the ``group_membership`` data. The corresponding values are
         the result of applying the metric function to the set of
-        ``y_true`` and ``y_pred`` entries for each key.
+        ``y_true`` and ``y_pred`` entries for each key. For scalar metrics
+        this is a read-only view of the stored values, and
+        ``dict(result.by_group)`` gives a dictionary which can be modified
+        or serialized.
         """
         return self._by_group
 
     @by_group.setter
     def by_group(self, value):
-        self._by_group = value
+        if isinstance(value, _ByGroupView):
+            self._set_arrays(value._labels, value._values)
+        else:
+            self._groups = None
+            self._values = None
+            self._cache = None
+            self._by_group = value
+
+    def _cached(self, name, compute):
+        if self._cache is None:
+            return compute()
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
+
+    def _set_of_groups_equal_to(self, target):
+        if self._values is not None:
+            return set(self._groups[i] for i in np.flatnonzero(self._values == target))
+        return set([k for k, v in self.by_group.items() if v == target])
 
     @property
     def minimum(self):
         """Return the minimum value of the metric in the ``by_group`` dictionary."""
+        if self._values is not None:
+            return self._cached('minimum', self._values.min)
         return min(self.by_group.values())
 
     @property
     def maximum(self):
         """Return the maximum value of the metric in the ``by_group`` dictionary."""
+        if self._values is not None:
+            return self._cached('maximum', self._values.max)
         return max(self.by_group.values())
 
     @property
@@ -58,7 +150,8 @@ class GroupMetricResult:
 
         This will be a set of keys to tbe ``by_group`` dictionary.
         """
-        return set([k for k, v in self.by_group.items() if v == self.minimum])
+        return self._cached('argmin_set',
+                            lambda: self._set_of_groups_equal_to(self.minimum))
 
     @property
     def argmax_set(self):
@@ -66,12 +159,13 @@ class GroupMetricResult:
 
         This will be a set of keys to the ``by_group`` dictionary.
         """
-        return set([k for k, v in self.by_group.items() if v == self.maximum])
+        return self._cached('argmax_set',
+                            lambda: self._set_of_groups_equal_to(self.maximum))
 
     @property  # noqa: A003
     def range(self):  # noqa: A003
         """Return the value of :code:`maximum-minimum`."""
-        return self.maximum - self.minimum
+        return self._cached('range', lambda: self.maximum - self.minimum)
 
     @property
     def range_ratio(self):
@@ -79,17 +173,58 @@ class GroupMetricResult:
 
         This is only set if the metric is a scalar.
         """
-        if self.minimum < 0:
+        return self._cached('range_ratio', self._compute_range_ratio)
+
+    @range_ratio.setter
+    def range_ratio(self, value):
+        self._range_ratio = value
+
+    def _compute_range_ratio(self):
+        minimum = self.minimum
+        maximum = self.maximum
+        if minimum < 0:
             return np.nan
-        elif self.maximum == 0:
+        elif maximum == 0:
             # We have min=max=0
             return 1
         else:
-            return self.minimum / self.maximum
+            return minimum / maximum
 
-    @range_ratio.setter
-    def range_ratio(self, value):
-        self._range_ratio = value
+    @property
+    def groups(self):
+        """Return the group labels, in the same order as ``by_group``.
+
+        For scalar metrics, this is the sequence of labels held by the
+        result (which is usually a :class:`numpy.ndarray`), rather than a copy.
+        """
+        if self._groups is not None:
+            return self._groups
+        return list(self.by_group.keys())
+
+    def to_numpy(self):
+        """Return the value of the metric for each group as a :class:`numpy.ndarray`.
+
+        The values are in the same order as :attr:`groups`. For scalar
+        metrics this is a read-only view of the stored values, rather than
+        a copy.
+
+        :rtype: numpy.ndarray
+        """
+        if self._values is not None:
+            return self._values
+        return np.asarray(list(self.by_group.values()))
+
+    def to_pandas(self):
+        """Return the value of the metric for each group as a :class:`pandas.Series`.
+
+        The series is indexed by the group labels. For scalar metrics the
+        series shares the stored array of values, rather than copying it.
+
+        :rtype: pandas.Series
+        """
+        if self._values is not None:
+            return pd.Series(self._values, index=pd.Index(self._groups), copy=False)
+        return pd.Series(dict(self.by_group))
 
     def __eq__(self, other):
         """Compare two `GroupMetricResult` objects for equality."""
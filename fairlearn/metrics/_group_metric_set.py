@@ -1,9 +1,16 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import numpy as np
 
 from . import group_accuracy_score, group_balanced_root_mean_squared_error
+from . import group_expected_calibration_error, group_max_calibration_error
 from . import group_fallout_rate, group_max_error
 from . import group_mean_absolute_error, group_mean_overprediction
 from . import group_mean_squared_error, group_mean_squared_log_error
@@ -12,6 +19,10 @@ from . import group_mean_prediction
 from . import group_miss_rate, group_precision_score, group_r2_score
 from . import group_recall_score, group_roc_auc_score, group_root_mean_squared_error
 from . import group_selection_rate, group_specificity_score, group_zero_one_loss
+from ._binary_classification_metrics import _binary_classification_metrics_for_models
+from ._binary_classification_metrics import _is_zero_one
+from ._group_index import _get_group_index
+from ._input_manipulations import _convert_to_ndarray_and_squeeze
 
 _GROUP_NAMES_MSG = "The sensitive_feature_names property must be a list of strings"
 _METRICS_KEYS_MSG = "Keys for metrics dictionary must be strings"
@@ -37,6 +48,12 @@ _VERSION = 'schemaVersion'
 
 _UNSUPPORTED_MODEL_TYPE = "The specified model_type of '{0}' is not supported"
 _DICT_TOO_MANY_Y_PRED = 'Too many y_pred values in dictionary'
+_BAD_N_JOBS = "n_jobs must be a positive integer or -1"
+_PROBAS_NOT_MATCHING = "y_probas must hold one array of probabilities for each of the y_preds"
+
+# Names of the entries in the .npz form of a group metric set
+_NPZ_METADATA = 'metadata'
+_NPZ_BIN_VECTOR = 'binVector_{0}'
 
 BINARY_CLASSIFICATION = 'binary_classification'
 REGRESSION = 'regression'
@@ -47,7 +64,9 @@ _allowed_model_types = frozenset([BINARY_CLASSIFICATION, REGRESSION])
 # Issue 269 is about unifying the two sets
 GROUP_ACCURACY_SCORE = "accuracy_score"
 GROUP_BALANCED_ROOT_MEAN_SQUARED_ERROR = "balanced_root_mean_squared_error"
+GROUP_EXPECTED_CALIBRATION_ERROR = "expected_calibration_error"
 GROUP_FALLOUT_RATE = "fallout_rate"
+GROUP_MAX_CALIBRATION_ERROR = "max_calibration_error"
 GROUP_MAX_ERROR = "max_error"
 GROUP_MEAN_ABSOLUTE_ERROR = "mean_absolute_error"
 GROUP_MEAN_OVERPREDICTION = "overprediction"
@@ -78,6 +97,27 @@ BINARY_CLASSIFICATION_METRICS[GROUP_ROC_AUC_SCORE] = group_roc_auc_score
 BINARY_CLASSIFICATION_METRICS[GROUP_SELECTION_RATE] = group_selection_rate
 BINARY_CLASSIFICATION_METRICS[GROUP_SPECIFICITY_SCORE] = group_specificity_score
 
+# Binary classification metrics of the predicted probabilities, which are
+# only computed when these are given
+CALIBRATION_METRICS = {}
+CALIBRATION_METRICS[GROUP_EXPECTED_CALIBRATION_ERROR] = group_expected_calibration_error
+CALIBRATION_METRICS[GROUP_MAX_CALIBRATION_ERROR] = group_max_calibration_error
+
+# Binary classification metrics which can all be derived from
+# a single set of confusion counts, mapped to the corresponding
+# key in the output of _binary_classification_metrics_for_models
+_CONFUSION_COUNT_METRICS = {}
+_CONFUSION_COUNT_METRICS[GROUP_ACCURACY_SCORE] = "accuracy_score"
+_CONFUSION_COUNT_METRICS[GROUP_FALLOUT_RATE] = "fallout_rate"
+_CONFUSION_COUNT_METRICS[GROUP_MEAN_OVERPREDICTION] = "mean_overprediction"
+_CONFUSION_COUNT_METRICS[GROUP_MEAN_UNDERPREDICTION] = "mean_underprediction"
+_CONFUSION_COUNT_METRICS[GROUP_MISS_RATE] = "miss_rate"
+_CONFUSION_COUNT_METRICS[GROUP_PRECISION_SCORE] = "precision_score"
+_CONFUSION_COUNT_METRICS[GROUP_RECALL_SCORE] = "recall_score"
+_CONFUSION_COUNT_METRICS[GROUP_SELECTION_RATE] = "selection_rate"
+_CONFUSION_COUNT_METRICS[GROUP_SPECIFICITY_SCORE] = "specificity_score"
+_CONFUSION_COUNT_METRICS[GROUP_ZERO_ONE_LOSS] = "zero_one_loss"
+
 REGRESSION_METRICS = {}
 REGRESSION_METRICS[GROUP_BALANCED_ROOT_MEAN_SQUARED_ERROR] = group_balanced_root_mean_squared_error  # noqa:E501
 REGRESSION_METRICS[GROUP_MAX_ERROR] = group_max_error
@@ -93,14 +133,128 @@ REGRESSION_METRICS[GROUP_ROOT_MEAN_SQUARED_ERROR] = group_root_mean_squared_erro
 REGRESSION_METRICS[GROUP_ZERO_ONE_LOSS] = group_zero_one_loss
 
 
+class _SharedArray:
+    """An array saved to a ``.npy`` file, which is pickled as the file name.
+
+    When unpickled (for example, in a worker process) the file is memory
+    mapped, so that the data are shared through the page cache rather than
+    being copied into every task.
+    """
+
+    def __init__(self, array, path):
+        np.save(path, array)
+        self._path = path
+        self._array = array
+
+    def __getstate__(self):
+        return self._path
+
+    def __setstate__(self, path):
+        self._path = path
+        self._array = None
+
+    @property
+    def array(self):
+        if self._array is None:
+            self._array = np.load(self._path, mmap_mode='r')
+        return self._array
+
+
+def _share(array, directory, name):
+    # Object arrays cannot be memory mapped, so these have to be pickled
+    if directory is None or array.dtype.hasobject:
+        return array
+    return _SharedArray(array, os.path.join(directory, name + '.npy'))
+
+
+def _unshare(array):
+    return array.array if isinstance(array, _SharedArray) else array
+
+
+def _metric_entry(gmr):
+    return {_GLOBAL: gmr.overall, _BINS: list(gmr.by_group.values())}
+
+
+def _evaluate_cell(metric_functions, y_true, y_preds, m, groups):
+    """Evaluate the metrics for a single model and sensitive feature."""
+    y_true = _unshare(y_true)
+    y_pred = _unshare(y_preds)[:, m]
+    groups = _unshare(groups)
+    return {metric_key: _metric_entry(metric_func(y_true, y_pred, groups))
+            for metric_key, metric_func in metric_functions.items()}
+
+
+def _evaluate_cells(cell_functions, y_true, y_preds, group_codes, n_jobs, executor):
+    """Evaluate the metrics for every (sensitive feature, model) pair.
+
+    :return: Dictionary keyed by the ``(g, m)`` indices of each cell
+    """
+    cells = [(g, m) for g in range(len(group_codes)) for m in range(y_preds.shape[1])
+             if cell_functions[g]]
+
+    if executor is None and n_jobs in (None, 1):
+        return {(g, m): _evaluate_cell(cell_functions[g], y_true, y_preds, m, group_codes[g])
+                for g, m in cells}
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs)
+    # Threads share memory already, so only other executors need the files
+    directory = None
+    if not isinstance(executor, ThreadPoolExecutor):
+        directory = tempfile.mkdtemp()
+    try:
+        # Store each model's predictions contiguously
+        y_true = _share(y_true, directory, 'y_true')
+        y_preds = _share(np.asfortranarray(y_preds), directory, 'y_preds')
+        group_codes = [_share(groups, directory, 'groups_{0}'.format(g))
+                       for g, groups in enumerate(group_codes)]
+        futures = {(g, m): executor.submit(_evaluate_cell, cell_functions[g],
+                                           y_true, y_preds, m, group_codes[g])
+                   for g, m in cells}
+        return {cell: future.result() for cell, future in futures.items()}
+    finally:
+        if own_executor:
+            executor.shutdown()
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
 def create_group_metric_set(model_type,
                             y_true,
                             y_preds,
                             sensitive_features,
                             model_titles=None,
                             sensitive_feature_names=None,
-                            extra_metrics=None):
-    """Create a dictionary matching the Dashboard's cache."""
+                            extra_metrics=None,
+                            *, compact=False, n_jobs=None, executor=None,
+                            y_probas=None):
+    """Create a dictionary matching the Dashboard's cache.
+
+    By default, the arrays of true values, predictions and group indices
+    are stored as lists, so that the dictionary can be serialized as JSON.
+    If ``compact`` is ``True``, they are kept as typed :class:`numpy.ndarray`
+    objects instead, which avoids building a Python object for every sample.
+    The result can then be written with :func:`save_group_metric_set`.
+
+    The metrics for each combination of sensitive feature and model are
+    independent, and can be evaluated concurrently by passing ``n_jobs``
+    (the number of worker processes, or -1 for one per CPU) or an
+    ``executor``. The data are then saved once to memory mapped files which
+    the workers open, rather than being sent to every task. The result does
+    not depend on the order in which the tasks complete.
+
+    For binary classification, ``y_probas`` may hold the predicted
+    probabilities of the positive class for each model, in the same order
+    as ``y_preds``. The per-group calibration metrics
+    (``expected_calibration_error`` and ``max_calibration_error``) are then
+    added to the metrics of each model.
+    """
+    if y_probas is not None and len(y_probas) != len(y_preds):
+        raise ValueError(_PROBAS_NOT_MATCHING)
+    if n_jobs is not None and n_jobs != -1 and (not isinstance(n_jobs, int) or n_jobs < 1):
+        raise ValueError(_BAD_N_JOBS)
+
     if extra_metrics is not None:
         raise NotImplementedError("No support for extra_metrics yet")
 
@@ -124,41 +278,129 @@ def create_group_metric_set(model_type,
     else:
         raise NotImplementedError("No support yet for regression")
 
-    _yt = np.asarray(y_true)
-    result[_Y_TRUE] = _yt.tolist()
+    def _output(a):
+        return a if compact else a.tolist()
 
-    result[_Y_PRED] = []
-    result[_PRECOMPUTED_METRICS] = []
-    result[_PRECOMPUTED_BINS] = []
+    result[_Y_TRUE] = _output(np.asarray(y_true))
+    _yt = _convert_to_ndarray_and_squeeze(y_true)
+
+    # Stack the predictions into an (n_samples, n_models) matrix, so that
+    # the metrics which allow it can be evaluated for every model at once
+    _yps = np.empty((len(_yt), 0))
+    if len(y_preds) > 0:
+        _yps = np.column_stack([_convert_to_ndarray_and_squeeze(model_pred)
+                                for model_pred in y_preds])
+    _all_zero_one = model_type == BINARY_CLASSIFICATION and \
+        _is_zero_one(_yt) and _is_zero_one(_yps)
+
+    result[_Y_PRED] = [_output(np.asarray(model_pred)) for model_pred in y_preds]
     result[_MODEL_NAMES] = []
+    if model_titles is not None:
+        result[_MODEL_NAMES] = [model_titles[m] for m in range(len(y_preds))]
+    result[_PRECOMPUTED_BINS] = []
+
+    group_codes = []
+    confusion_metrics = []
     for g, group_membership in enumerate(sensitive_features):
-        _gm = np.asarray(group_membership).tolist()
-        _unique_groups = sorted(list(np.unique(_gm)))
+        index = _get_group_index(group_membership)
+        _unique_groups, groups = index.labels, index.codes
         group_names = [str(x) for x in _unique_groups]
-        groups = [_unique_groups.index(x) for x in _gm]
-        bin_dict = {_BIN_VECTOR: groups, _BIN_LABELS: group_names}
+        bin_dict = {_BIN_VECTOR: _output(groups), _BIN_LABELS: group_names}
         if sensitive_feature_names is not None:
             bin_dict[_FEATURE_BIN_NAME] = sensitive_feature_names[g]
         result[_PRECOMPUTED_BINS].append(bin_dict)
+        group_codes.append(groups)
 
-        model_list = []
-        for m, model_pred in enumerate(y_preds):
-            _yp = np.asarray(model_pred).tolist()
+        # When the data are binary, compute all the metrics which depend
+        # only on the confusion counts for all the models in one pass
+        if _all_zero_one:
+            confusion_metrics.append(
+                _binary_classification_metrics_for_models(_yt, _yps, groups))
+        else:
+            confusion_metrics.append(None)
+
+    # The remaining metrics are evaluated separately for each
+    # (sensitive feature, model) cell
+    cell_functions = [dict() for _ in group_codes]
+    for g in range(len(group_codes)):
+        for metric_key, metric_func in function_dict.items():
+            if metric_key not in _CONFUSION_COUNT_METRICS or confusion_metrics[g] is None:
+                cell_functions[g][metric_key] = metric_func
+    cells = _evaluate_cells(cell_functions, _yt, _yps, group_codes, n_jobs, executor)
 
-            # Only record each y_pred and model name once
-            if g == 0:
-                result[_Y_PRED].append(_yp)
-                if model_titles is not None:
-                    result[_MODEL_NAMES].append(model_titles[m])
+    calibration_functions = dict()
+    if y_probas is not None:
+        calibration_functions = CALIBRATION_METRICS
+        _y_probas = [_convert_to_ndarray_and_squeeze(model_proba) for model_proba in y_probas]
 
+    result[_PRECOMPUTED_METRICS] = []
+    for g in range(len(group_codes)):
+        model_list = []
+        for m in range(len(y_preds)):
             metric_dict = dict()
-            for metric_key, metric_func in function_dict.items():
-                gmr = metric_func(_yt, _yp, groups)
-                curr_dict = dict()
-                curr_dict[_GLOBAL] = gmr.overall
-                curr_dict[_BINS] = list(gmr.by_group.values())
-                metric_dict[metric_key] = curr_dict
+            for metric_key in function_dict:
+                if metric_key in cell_functions[g]:
+                    metric_dict[metric_key] = cells[g, m][metric_key]
+                else:
+                    gmr = confusion_metrics[g][m][_CONFUSION_COUNT_METRICS[metric_key]]
+                    metric_dict[metric_key] = _metric_entry(gmr)
+            # The calibration metrics are computed with one bincount each
+            for metric_key, metric_func in calibration_functions.items():
+                metric_dict[metric_key] = _metric_entry(
+                    metric_func(_yt, _y_probas[m], group_codes[g]))
             model_list.append(metric_dict)
         result[_PRECOMPUTED_METRICS].append(model_list)
 
     return result
+
+
+def save_group_metric_set(file, group_metric_set):
+    """Write a group metric set to a compact ``.npz`` file.
+
+    The true values, predictions and group indices are stored as typed
+    arrays, rather than as nested lists. Everything else (which has a size
+    independent of the number of samples) is stored as JSON.
+
+    :param file: File name or file object to which the data are written
+
+    :param group_metric_set: Dictionary returned by :func:`create_group_metric_set`
+    :type group_metric_set: dict
+    """
+    metadata = dict(group_metric_set)
+    arrays = dict()
+    arrays[_Y_TRUE] = np.asarray(metadata.pop(_Y_TRUE))
+    arrays[_Y_PRED] = np.asarray(metadata.pop(_Y_PRED))
+    metadata[_PRECOMPUTED_BINS] = []
+    for g, bin_dict in enumerate(group_metric_set[_PRECOMPUTED_BINS]):
+        bin_dict = dict(bin_dict)
+        arrays[_NPZ_BIN_VECTOR.format(g)] = np.asarray(bin_dict.pop(_BIN_VECTOR))
+        metadata[_PRECOMPUTED_BINS].append(bin_dict)
+
+    arrays[_NPZ_METADATA] = np.array(json.dumps(metadata, default=_json_default))
+    np.savez_compressed(file, **arrays)
+
+
+def load_group_metric_set(file):
+    """Read a group metric set written by :func:`save_group_metric_set`.
+
+    :param file: File name or file object from which the data are read
+
+    :return: Dictionary in the format of :func:`create_group_metric_set`, where
+        the true values, predictions and group indices are :class:`numpy.ndarray`
+        objects
+    :rtype: dict
+    """
+    with np.load(file) as data:
+        result = json.loads(str(data[_NPZ_METADATA]))
+        result[_Y_TRUE] = data[_Y_TRUE]
+        result[_Y_PRED] = list(data[_Y_PRED])
+        for g, bin_dict in enumerate(result[_PRECOMPUTED_BINS]):
+            bin_dict[_BIN_VECTOR] = data[_NPZ_BIN_VECTOR.format(g)]
+    return result
+
+
+def _json_default(value):
+    # Metric values may be numpy scalars or arrays
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError("Object of type {0} is not JSON serializable".format(type(value).__name__))
@@ -0,0 +1,174 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pandas as pd
+
+from ._input_manipulations import _convert_to_ndarray_1d, _convert_to_ndarray_and_squeeze
+
+
+def _encode_groups(group_membership):
+    """Encode an array of group labels as integer codes.
+
+    :param group_membership: One dimensional `numpy.ndarray` of group labels
+
+    :return: A tuple ``(labels, codes)``. The ``labels`` are the sorted unique
+        values of ``group_membership`` (exactly as returned by :func:`numpy.unique`)
+        and ``codes`` is an integer array such that
+        ``labels[codes]`` reproduces ``group_membership``
+    """
+    labels, codes = np.unique(group_membership, return_inverse=True)
+    return labels, codes.reshape(-1)
+
+
+def _encode_categorical(values):
+    """Encode the groups of a categorical or dictionary encoded column from its codes.
+
+    A :class:`pandas.Categorical` (or a :class:`pandas.Series` holding one), and
+    a ``pyarrow`` ``DictionaryArray`` or ``ChunkedArray`` of dictionary type,
+    already hold an integer code for each sample and a small array of
+    categories. These are used directly, so that only the categories which
+    are present are sorted, rather than every sample's label.
+
+    :return: A tuple ``(labels, codes)`` as for :func:`_encode_groups`, or ``None``
+        if ``values`` is not categorical, or has missing values
+    """
+    if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.array
+    if isinstance(values, pd.Categorical):
+        categories, codes = values.categories.to_numpy(), values.codes
+    else:
+        dictionary = _arrow_dictionary(values)
+        if dictionary is None:
+            return None
+        categories, codes = dictionary
+
+    if codes.ndim != 1 or len(codes) == 0 or codes.min() < 0:
+        return None
+
+    # Number the categories which are present in sorted order, as
+    # numpy.unique would
+    present = np.flatnonzero(np.bincount(codes, minlength=len(categories)))
+    order = np.argsort(categories[present], kind='stable')
+    recode = np.empty(len(categories), dtype=np.intp)
+    recode[present[order]] = np.arange(len(present))
+    return categories[present[order]], recode[codes]
+
+
+def _arrow_dictionary(values):
+    """Find the dictionary and indices of a ``pyarrow`` dictionary encoded array.
+
+    ``pyarrow`` is not a dependency, so the array types are recognised
+    without importing it.
+
+    :return: A tuple ``(dictionary, indices)`` of :class:`numpy.ndarray`, or ``None``
+    """
+    if type(values).__module__.split('.')[0] != 'pyarrow':
+        return None
+    if not hasattr(values.type, 'index_type') or values.null_count > 0:
+        return None
+
+    if type(values).__name__ == 'ChunkedArray':
+        if values.num_chunks == 0:
+            return None
+        # Afterwards, every chunk refers to the same dictionary
+        values = values.unify_dictionaries()
+        dictionary = values.chunk(0).dictionary
+        indices = np.concatenate([chunk.indices.to_numpy(zero_copy_only=False)
+                                  for chunk in values.chunks])
+    else:
+        dictionary = values.dictionary
+        indices = values.indices.to_numpy(zero_copy_only=False)
+    return dictionary.to_numpy(zero_copy_only=False), indices
+
+
+def _encode_column(column):
+    """Encode a single column of group labels, using its codes if it is categorical."""
+    encoded = _encode_categorical(column)
+    if encoded is None:
+        encoded = _encode_groups(_convert_to_ndarray_and_squeeze(column))
+    return encoded
+
+
+def _encode_groups_1d(group_membership):
+    """Encode a vector of group labels, which must have a single dimension."""
+    encoded = _encode_categorical(group_membership)
+    if encoded is None:
+        encoded = _encode_groups(_convert_to_ndarray_1d(group_membership))
+    return encoded
+
+
+def _encode_group_membership(group_membership):
+    """Encode the group membership of each sample as integer codes.
+
+    The ``group_membership`` can be a single vector of labels, or a two
+    dimensional array or :class:`pandas.DataFrame` with one column for each
+    sensitive feature. In the latter case, each column is encoded separately,
+    and the codes are combined in mixed radix to give a single code for each
+    combination of labels. The combinations are only decoded into tuples for
+    the groups which are present. Categorical columns are encoded from their
+    existing codes, as in :func:`_encode_categorical`.
+
+    :param group_membership: Array-like of group labels, with one row per sample
+
+    :return: A tuple ``(labels, codes)`` as for :func:`_encode_groups`. For
+        several columns, ``labels`` is a list of tuples in lexicographic order
+    """
+    encoded = _encode_categorical(group_membership)
+    if encoded is not None:
+        return encoded
+
+    if isinstance(group_membership, pd.DataFrame):
+        columns = [group_membership.iloc[:, j] for j in range(group_membership.shape[1])]
+    else:
+        g_d = np.asarray(group_membership)
+        columns = list(g_d.T) if g_d.ndim == 2 else [group_membership]
+
+    if len(columns) == 1:
+        return _encode_column(columns[0])
+
+    column_labels = []
+    column_codes = []
+    for column in columns:
+        labels, codes = _encode_column(column)
+        column_labels.append(labels.tolist())
+        column_codes.append(codes)
+
+    radices = [len(labels) for labels in column_labels]
+    if np.prod(radices, dtype=float) < np.iinfo(np.int64).max:
+        combined = np.zeros(len(column_codes[0]), dtype=np.int64)
+        for radix, codes in zip(radices, column_codes):
+            combined = combined * radix + codes
+        present, codes = np.unique(combined, return_inverse=True)
+        present_codes = np.unravel_index(present, radices)
+    else:
+        # Too many combinations to number them all, so find the
+        # distinct rows of codes instead
+        present, codes = np.unique(np.column_stack(column_codes),
+                                   axis=0, return_inverse=True)
+        present_codes = present.T
+
+    labels = list(zip(*[[column_labels[j][c] for c in present_codes[j]]
+                        for j in range(len(columns))]))
+    return labels, codes.reshape(-1)
+
+
+def _partition(codes, n_groups):
+    """Compute a permutation which makes each group contiguous.
+
+    The sort is stable, so within each group the samples keep their original
+    relative order.
+
+    :param codes: Integer array of group codes in the range ``[0, n_groups)``
+
+    :param n_groups: The number of distinct groups
+
+    :return: A tuple ``(order, offsets)``. After applying ``order`` to an array,
+        the members of group ``i`` are found in the slice
+        ``offsets[i]:offsets[i+1]``
+    """
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes, minlength=n_groups)
+    offsets = np.zeros(n_groups + 1, dtype=np.intp)
+    np.cumsum(counts, out=offsets[1:])
+    return order, offsets
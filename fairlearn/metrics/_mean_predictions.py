@@ -13,11 +13,11 @@ def mean_prediction(y_true, y_pred, sample_weight=None):
     to maintain a consistent interface
     """
     y_p = _convert_to_ndarray_and_squeeze(y_pred)
-    s_w = np.ones(len(y_p))
+    s_w = None
     if sample_weight is not None:
         s_w = _convert_to_ndarray_and_squeeze(sample_weight)
 
-    return np.dot(y_p, s_w) / s_w.sum()
+    return np.average(y_p, weights=s_w)
 
 
 def mean_overprediction(y_true, y_pred, sample_weight=None):
@@ -28,14 +28,14 @@ def mean_overprediction(y_true, y_pred, sample_weight=None):
     """
     y_t = _convert_to_ndarray_and_squeeze(y_true)
     y_p = _convert_to_ndarray_and_squeeze(y_pred)
-    s_w = np.ones(len(y_p))
+    s_w = None
     if sample_weight is not None:
         s_w = _convert_to_ndarray_and_squeeze(sample_weight)
 
     err = y_p - y_t
     err[err < 0] = 0
 
-    return np.dot(err, s_w) / s_w.sum()
+    return np.average(err, weights=s_w)
 
 
 def mean_underprediction(y_true, y_pred, sample_weight=None):
@@ -48,7 +48,7 @@ def mean_underprediction(y_true, y_pred, sample_weight=None):
     """
     y_t = _convert_to_ndarray_and_squeeze(y_true)
     y_p = _convert_to_ndarray_and_squeeze(y_pred)
-    s_w = np.ones(len(y_p))
+    s_w = None
     if sample_weight is not None:
         s_w = _convert_to_ndarray_and_squeeze(sample_weight)
 
@@ -56,4 +56,4 @@ def mean_underprediction(y_true, y_pred, sample_weight=None):
     err[err > 0] = 0
 
     # Error metrics should decrease to 0 so have to flip sign
-    return -np.dot(err, s_w) / s_w.sum()
+    return -np.average(err, weights=s_w)
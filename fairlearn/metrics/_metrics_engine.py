@@ -1,10 +1,14 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import functools
+
 import numpy as np
 
 from ._group_metric_result import GroupMetricResult
+from ._group_index import _get_group_index
 from ._input_manipulations import _convert_to_ndarray_and_squeeze
+from ._order_statistics import _order_statistic_by_group
 
 _MESSAGE_SIZE_MISMATCH = "Array {0} is not the same size as {1}"
 
@@ -21,7 +25,11 @@ def metric_by_group(metric_function,
 
     :param y_pred: Array of predicted values
 
-    :param group_membership: Array Indicating the group to which each input value belongs
+    :param group_membership: Array Indicating the group to which each input value belongs.
+        This may also be a two dimensional array or :class:`pandas.DataFrame` with a
+        column for each sensitive feature, in which case the groups are the combinations
+        of values which occur, labelled by tuples. A :class:`GroupIndex` built from
+        any of these can be passed instead, to avoid encoding the groups again
 
     :param sample_weight: Optional weights to apply to each input value
 
@@ -37,18 +45,91 @@ def metric_by_group(metric_function,
     if sample_weight is not None:
         _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
 
-    result = GroupMetricResult()
-
     # Make everything a numpy array
     # This allows for fast slicing of the groups
     y_a = _convert_to_ndarray_and_squeeze(y_true)
     y_p = _convert_to_ndarray_and_squeeze(y_pred)
-    g_d = _convert_to_ndarray_and_squeeze(group_membership)
 
     s_w = None
     if sample_weight is not None:
         s_w = _convert_to_ndarray_and_squeeze(sample_weight)
 
+    # Encode the groups once, and find the permutation which makes
+    # each group contiguous. This avoids building a boolean mask
+    # over the entire dataset for every group
+    index = _get_group_index(group_membership)
+    groups, group_codes = index.labels, index.codes
+
+    # Imported here since the decomposed metrics depend on the group
+    # metric wrappers, which in turn depend on this module
+    from ._decomposable_metrics import _find_default_fast_path
+    metric = _find_default_fast_path(metric_function, y_a, y_p, kwargs)
+    if metric is not None:
+        return _metric_by_group_sums(metric_function, metric,
+                                     (y_a, y_p, s_w), groups, group_codes)
+    result = _order_statistic_by_group(metric_function, y_a, y_p, s_w,
+                                       groups, group_codes, kwargs)
+    if result is not None:
+        return result
+
+    order, offsets = index.order, index.offsets
+
+    data = (y_a, y_p, s_w)
+    return _metric_by_partition(metric_function, data, _sort_data(data, order),
+                                groups, offsets, kwargs)
+
+
+def _sort_data(data, order):
+    """Gather each array (which may be ``None``) so that every group is contiguous."""
+    return tuple(None if a is None else a[order] for a in data)
+
+
+def _metric_by_group_sums(metric_function, metric, data, groups, group_codes):
+    """Apply a decomposable metric to the entire dataset, and to each group.
+
+    The values for all the groups are computed at once from the weighted
+    sums of the per-sample statistics in each group.
+
+    :param metric: The decomposed form of ``metric_function``
+
+    :param data: Tuple ``(y_true, y_pred, sample_weight)`` of `numpy.ndarray`
+        objects, where ``sample_weight`` may be ``None``
+
+    :param groups: The group labels, as returned by :func:`_encode_groups`
+
+    :param group_codes: The group codes, as returned by :func:`_encode_groups`
+    """
+    y_a, y_p, s_w = data
+
+    if s_w is not None:
+        overall = metric_function(y_a, y_p, sample_weight=s_w)
+    else:
+        overall = metric_function(y_a, y_p)
+
+    sums = metric.group_sums(group_codes, len(groups), y_a, y_p, s_w)
+    metric.check(sums)
+    return GroupMetricResult._from_arrays(overall, groups, metric.finalize(sums))
+
+
+def _metric_by_partition(metric_function, data, sorted_data, groups, offsets, kwargs):
+    """Apply a metric to the entire dataset, and to each group of a partition.
+
+    :param data: Tuple ``(y_true, y_pred, sample_weight)`` of `numpy.ndarray`
+        objects, where ``sample_weight`` may be ``None``
+
+    :param sorted_data: The same arrays, permuted by :func:`_sort_data`
+
+    :param groups: The group labels, as returned by :func:`_encode_groups`
+
+    :param offsets: The group offsets, as returned by :func:`_partition`
+
+    :param kwargs: Dictionary of extra arguments for the ``metric_function``
+    """
+    y_a, y_p, s_w = data
+    y_a_sorted, y_p_sorted, s_w_sorted = sorted_data
+
+    result = GroupMetricResult()
+
     # Evaluate the overall metric with the numpy arrays
     # This ensures consistency in how metric_function is called
     if s_w is not None:
@@ -56,14 +137,12 @@ def metric_by_group(metric_function,
     else:
         result.overall = metric_function(y_a, y_p, **kwargs)
 
-    groups = np.unique(group_membership)
-    for group in groups:
-        group_indices = (group == g_d)
-        group_actual = y_a[group_indices]
-        group_predict = y_p[group_indices]
-        group_weight = None
-        if s_w is not None:
-            group_weight = s_w[group_indices]
+    for i, group in enumerate(groups):
+        group_slice = slice(offsets[i], offsets[i+1])
+        group_actual = y_a_sorted[group_slice]
+        group_predict = y_p_sorted[group_slice]
+        if s_w_sorted is not None:
+            group_weight = s_w_sorted[group_slice]
             result.by_group[group] = metric_function(group_actual,
                                                      group_predict,
                                                      sample_weight=group_weight,
@@ -73,6 +152,13 @@ def metric_by_group(metric_function,
                                                      group_predict,
                                                      **kwargs)
 
+    # Scalar metrics are stored as an array, which is faster to summarize
+    values = list(result.by_group.values())
+    if all(np.ndim(v) == 0 for v in values):
+        values = np.asarray(values)
+        if values.dtype.kind in 'iuf':
+            result.by_group = GroupMetricResult._from_arrays(None, groups, values).by_group
+
     return result
 
 
@@ -84,23 +170,42 @@ def make_group_metric(metric_function):
     :type metric_function: func
 
     :return: A wrapped version of the supplied metric_function. It will have
-        signature ``(y_true, y_pred, group_membership, sample_weight, **kwargs)``
+        signature ``(y_true, y_pred, group_membership, sample_weight, **kwargs)``,
+        and an ``approximate`` attribute which estimates the metric from a sample
+        of each group, as :func:`approximate_metric_by_group` does
     :rtype: func
     """
-    def wrapper(y_true, y_pred, group_membership, sample_weight=None, **kwargs):
-        return metric_by_group(metric_function,
-                               y_true,
-                               y_pred,
-                               group_membership,
-                               sample_weight,
-                               **kwargs)
+    # A partial application (unlike a closure) can be pickled, so the
+    # wrapped metrics can be sent to worker processes
+    wrapper = functools.partial(metric_by_group, metric_function)
 
     # Improve the name of the returned function
     wrapper.__name__ = "group_{0}".format(metric_function.__name__)
+    wrapper.approximate = _make_approximate(metric_function)
 
     return wrapper
 
 
+def _approximate_metric_by_group(metric_function, y_true, y_pred, group_membership,
+                                 sample_weight=None, **kwargs):
+    # Imported here since the approximation depends on the decomposed
+    # metrics, which in turn depend on this module
+    from ._approximate_metric_by_group import approximate_metric_by_group
+    return approximate_metric_by_group(metric_function,
+                                       y_true,
+                                       y_pred,
+                                       group_membership,
+                                       sample_weight,
+                                       **kwargs)
+
+
+def _make_approximate(metric_function):
+    """Bind :func:`approximate_metric_by_group` to a metric function."""
+    approximate = functools.partial(_approximate_metric_by_group, metric_function)
+    approximate.__name__ = "approximate_group_{0}".format(metric_function.__name__)
+    return approximate
+
+
 def _check_array_sizes(a, b, a_name, b_name):
     if len(a) != len(b):
         raise ValueError(_MESSAGE_SIZE_MISMATCH.format(b_name, a_name))
@@ -0,0 +1,83 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+from ._decomposable_metrics import _find_fast_path, _result_from_sums
+from ._group_index import _get_group_index
+from ._input_manipulations import _convert_to_ndarray_and_squeeze
+from ._metrics_engine import _check_array_sizes, _metric_by_partition, _sort_data
+
+_METRICS_NOT_DICT = "metric_functions must be a dictionary of metric functions"
+
+
+def metrics_by_group(metric_functions,
+                     y_true, y_pred, group_membership,
+                     sample_weight=None):
+    r"""Apply several metrics to each subgroup of a set of data.
+
+    This is equivalent to calling :func:`metric_by_group` once for each of
+    the ``metric_functions``, but the input checks, conversions and the
+    partitioning of the data into groups are only performed once.
+    Metrics which can be computed from sums of per-sample statistics
+    (such as :py:func:`sklearn.metrics.accuracy_score` or
+    :py:func:`sklearn.metrics.mean_squared_error`) are evaluated for all
+    groups at once; metrics which share the same statistics (such as
+    :py:func:`sklearn.metrics.precision_score` and
+    :py:func:`sklearn.metrics.recall_score`) share that computation.
+    Other metrics are called on a contiguous slice of data for each group.
+
+    :param metric_functions: Dictionary of functions
+        ``(y_true, y_pred, sample_weight=None)``, each of which is evaluated
+    :type metric_functions: dict
+
+    :param y_true: Array of ground-truth values
+
+    :param y_pred: Array of predicted values
+
+    :param group_membership: Array indicating the group to which each input value belongs
+
+    :param sample_weight: Optional weights to apply to each input value
+
+    :return: Dictionary with the same keys as ``metric_functions``, holding
+        the result of each metric
+    :rtype: dict
+    """
+    if not isinstance(metric_functions, dict):
+        raise ValueError(_METRICS_NOT_DICT)
+
+    _check_array_sizes(y_true, y_pred, 'y_true', 'y_pred')
+    _check_array_sizes(y_true, group_membership, 'y_true', 'group_membership')
+    if sample_weight is not None:
+        _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
+
+    y_a = _convert_to_ndarray_and_squeeze(y_true)
+    y_p = _convert_to_ndarray_and_squeeze(y_pred)
+    s_w = None
+    if sample_weight is not None:
+        s_w = _convert_to_ndarray_and_squeeze(sample_weight)
+
+    index = _get_group_index(group_membership)
+    groups, group_codes = index.labels, index.codes
+    data = (y_a, y_p, s_w)
+
+    # The sorted data and group sums are computed lazily, since they
+    # might not be needed
+    partition = None
+    group_sums = dict()
+
+    result = dict()
+    for name, metric_function in metric_functions.items():
+        metric = _find_fast_path(metric_function, y_a, y_p, {})
+        if metric is not None:
+            if metric.sums_key not in group_sums:
+                group_sums[metric.sums_key] = metric.group_sums(group_codes, len(groups),
+                                                                y_a, y_p, s_w)
+            result[name] = _result_from_sums(metric, group_sums[metric.sums_key], groups)
+        else:
+            if partition is None:
+                order, offsets = index.order, index.offsets
+                partition = (_sort_data(data, order), offsets)
+            sorted_data, offsets = partition
+            result[name] = _metric_by_partition(metric_function, data, sorted_data,
+                                                groups, offsets, {})
+
+    return result
@@ -0,0 +1,77 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+
+from ._decomposable_metrics import _find_fast_path, _result_from_sums
+from ._group_index import _get_group_index
+from ._input_manipulations import _convert_to_ndarray_and_squeeze
+from ._metrics_engine import _check_array_sizes, _metric_by_partition, _sort_data
+
+_Y_PREDS_NOT_2D = "y_preds must be a two dimensional array of shape (n_samples, n_models)"
+
+
+def metric_by_group_for_models(metric_function,
+                               y_true, y_preds, group_membership,
+                               sample_weight=None,
+                               **kwargs):
+    r"""Apply a metric to each subgroup, for the predictions of several models.
+
+    This is equivalent to calling :func:`metric_by_group` once for each
+    column of ``y_preds``, but the groups are only encoded once.
+    When ``metric_function`` can be computed from sums of per-sample
+    statistics (for example :py:func:`sklearn.metrics.accuracy_score` or
+    :py:func:`sklearn.metrics.mean_squared_error`) and no ``kwargs``
+    are given, all the models are evaluated in a single vectorized pass.
+
+    :param metric_function: Function ``(y_true, y_pred, sample_weight=None, \*\*kwargs)``
+
+    :param y_true: Array of ground-truth values
+
+    :param y_preds: Array of predicted values, with shape ``(n_samples, n_models)``
+
+    :param group_membership: Array indicating the group to which each input value belongs
+
+    :param sample_weight: Optional weights to apply to each input value
+
+    :param \*\*kwargs: Optional arguments to be passed to the `metric_function`
+
+    :return: One result for each model (that is, each column of ``y_preds``)
+    :rtype: list[:class:`GroupMetricResult`]
+    """
+    y_ps = np.asarray(y_preds)
+    if y_ps.ndim == 1:
+        y_ps = y_ps[:, np.newaxis]
+    if y_ps.ndim != 2:
+        raise ValueError(_Y_PREDS_NOT_2D)
+
+    _check_array_sizes(y_true, y_ps, 'y_true', 'y_preds')
+    _check_array_sizes(y_true, group_membership, 'y_true', 'group_membership')
+    if sample_weight is not None:
+        _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
+
+    y_a = _convert_to_ndarray_and_squeeze(y_true)
+    s_w = None
+    if sample_weight is not None:
+        s_w = _convert_to_ndarray_and_squeeze(sample_weight)
+
+    index = _get_group_index(group_membership)
+    groups, group_codes = index.labels, index.codes
+
+    metric = _find_fast_path(metric_function, y_a, y_ps, kwargs)
+    if metric is not None:
+        sums = metric.model_group_sums(group_codes, len(groups), y_a, y_ps, s_w)
+        return [_result_from_sums(metric, model_sums, groups) for model_sums in sums]
+
+    # Share the partition, and the permuted y_true and sample_weight,
+    # between all the models
+    order, offsets = index.order, index.offsets
+    y_a_sorted, _, s_w_sorted = _sort_data((y_a, None, s_w), order)
+    results = []
+    for m in range(y_ps.shape[1]):
+        y_p = _convert_to_ndarray_and_squeeze(y_ps[:, m])
+        results.append(_metric_by_partition(metric_function,
+                                            (y_a, y_p, s_w),
+                                            (y_a_sorted, y_p[order], s_w_sorted),
+                                            groups, offsets, kwargs))
+    return results
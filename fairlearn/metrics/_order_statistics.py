@@ -0,0 +1,72 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Per-group order statistics of the absolute error from a single sort.
+
+The absolute errors are sorted once, and the sorted buffer is then stably
+partitioned by group, so that each group is a contiguous segment which
+is still in order. This is equivalent to a :func:`numpy.lexsort` on the
+group and the error, but faster. The median and maximum of the whole
+dataset and of every group can then be read directly from the sorted
+buffers, rather than sorting each group separately.
+"""
+
+import numpy as np
+import sklearn.metrics as skm
+
+from ._group_metric_result import GroupMetricResult
+from ._group_partition import _partition
+
+
+def _median(sorted_errors, starts, counts):
+    # Matches numpy.median, which averages the two middle values for
+    # groups with an even number of elements
+    lower = sorted_errors[starts + (counts - 1) // 2]
+    upper = sorted_errors[starts + counts // 2]
+    return (lower + upper) / 2
+
+
+def _maximum(sorted_errors, starts, counts):
+    return sorted_errors[starts + counts - 1]
+
+
+# Keyed by the scalar metric. Each function reduces segments of a sorted buffer
+_ORDER_STATISTIC_METRICS = {
+    skm.median_absolute_error: _median,
+    skm.max_error: _maximum
+}
+
+
+def _order_statistic_by_group(metric_function, y_true, y_pred, sample_weight,
+                              groups, group_codes, kwargs):
+    """Evaluate an order statistic of the absolute error for every group at once.
+
+    :return: A :class:`GroupMetricResult`, or ``None`` if the ``metric_function``
+        has to be called for each group (because it is not an order statistic
+        of the absolute error, or the arguments are not supported here)
+    """
+    try:
+        reduction = _ORDER_STATISTIC_METRICS.get(metric_function)
+    except TypeError:
+        return None
+    if reduction is None or kwargs or sample_weight is not None:
+        return None
+    if y_true.ndim != 1 or y_pred.ndim != 1 or len(y_true) == 0:
+        return None
+    if not (np.issubdtype(y_true.dtype, np.number) and np.issubdtype(y_pred.dtype, np.number)):
+        return None
+
+    errors = np.abs(y_pred.astype(float) - y_true.astype(float))
+    if not np.all(np.isfinite(errors)):
+        # Let sklearn report the invalid input
+        return None
+
+    # The order of tied errors does not matter, so the sort need not be stable
+    by_error = np.argsort(errors)
+    group_order, offsets = _partition(group_codes[by_error], len(groups))
+    sorted_errors = errors[by_error]
+    group_sorted_errors = sorted_errors[group_order]
+
+    return GroupMetricResult._from_arrays(
+        float(reduction(sorted_errors, 0, len(sorted_errors))),
+        groups, reduction(group_sorted_errors, offsets[:-1], np.diff(offsets)))
@@ -0,0 +1,191 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Mergeable quantile sketches for streaming order statistics.
+
+A KLL sketch (Karnin, Lang and Liberty, "Optimal Quantile Approximation
+in Streams", 2016) keeps a hierarchy of buffers, where each item held at
+level ``h`` stands for ``2**h`` of the original values. When a buffer
+exceeds its capacity it is sorted, and every other item is promoted to the
+next level. The capacities shrink geometrically towards the lower levels,
+so the size of the sketch grows only with the logarithm of the number of
+values, while the error in the rank of any quantile is roughly
+``1.7 / k`` of the number of values (for the default ``k`` of 200, under
+one percent). Two sketches are merged by concatenating their buffers, so
+sketches of separate parts of a dataset can be combined in any order.
+
+Until the first compaction the sketch holds every value, so quantiles of
+small groups are exact. The minimum and maximum are always tracked exactly.
+"""
+
+import math
+
+import numpy as np
+import sklearn.metrics as skm
+
+_DEFAULT_SKETCH_SIZE = 200
+_BAD_SKETCH_SIZE = "sketch_size must be an integer of at least 8"
+_SKETCH_SIZE_MISMATCH = "Cannot merge sketches of different sizes"
+
+# The ratio of the capacities of consecutive levels
+_CAPACITY_RATIO = 2 / 3
+
+
+class _KLLSketch:
+    """Approximate the quantiles of a stream of values."""
+
+    __slots__ = ('_k', '_levels', '_n', '_min', '_max', '_offsets')
+
+    def __init__(self, k=_DEFAULT_SKETCH_SIZE):
+        if not isinstance(k, int) or k < 8:
+            raise ValueError(_BAD_SKETCH_SIZE)
+        self._k = k
+        self._levels = [np.empty(0)]
+        self._n = 0
+        self._min = np.inf
+        self._max = -np.inf
+        # Alternate which half of each level is promoted, so that the
+        # errors of successive compactions cancel out
+        self._offsets = [0]
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    @property
+    def n(self):
+        """Return the number of values added to the sketch."""
+        return self._n
+
+    @property
+    def is_exact(self):
+        """Return whether the sketch still holds every value."""
+        return len(self._levels) == 1
+
+    def update(self, values):
+        """Add an array of values to the sketch."""
+        values = np.asarray(values, dtype=float).reshape(-1)
+        if len(values) == 0:
+            return self
+        self._n += len(values)
+        self._min = min(self._min, values.min())
+        self._max = max(self._max, values.max())
+        self._levels[0] = np.concatenate((self._levels[0], values))
+        self._compress()
+        return self
+
+    def copy(self):
+        """Return an independent copy of the sketch."""
+        result = _KLLSketch(self._k)
+        result.__setstate__(self.__getstate__())
+        result._levels = list(self._levels)
+        result._offsets = list(self._offsets)
+        return result
+
+    def merge(self, other):
+        """Combine this sketch with another, returning a new sketch."""
+        if other._k != self._k:
+            raise ValueError(_SKETCH_SIZE_MISMATCH)
+        merged = _KLLSketch(self._k)
+        n_levels = max(len(self._levels), len(other._levels))
+        merged._levels = [np.concatenate([s._levels[h] for s in (self, other)
+                                          if h < len(s._levels)])
+                          for h in range(n_levels)]
+        merged._offsets = (self._offsets + other._offsets[len(self._offsets):])[:n_levels]
+        merged._n = self._n + other._n
+        merged._min = min(self._min, other._min)
+        merged._max = max(self._max, other._max)
+        merged._compress()
+        return merged
+
+    def quantile(self, q):
+        """Estimate a quantile of the values added so far.
+
+        While the sketch is exact, this matches :func:`numpy.quantile`
+        (so the median of an even number of values is the mean of the middle
+        two). Afterwards, it returns a retained value whose estimated rank is
+        closest to ``q`` times the number of values.
+        """
+        if self._n == 0:
+            return np.nan
+        if q <= 0:
+            return self._min
+        if q >= 1:
+            return self._max
+        if self.is_exact:
+            return np.quantile(self._levels[0], q)
+
+        values = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h)
+                                  for h, items in enumerate(self._levels)])
+        order = np.argsort(values, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        index = np.searchsorted(cumulative, q * self._n, side='left')
+        return values[order[min(index, len(values) - 1)]]
+
+    def _capacity(self, level):
+        depth = len(self._levels) - 1 - level
+        return max(2, int(math.ceil(self._k * _CAPACITY_RATIO ** depth)))
+
+    def _compress(self):
+        """Compact the lowest level over capacity until every level fits."""
+        while True:
+            for level, items in enumerate(self._levels):
+                if len(items) > self._capacity(level):
+                    self._compact(level)
+                    break
+            else:
+                return
+
+    def _compact(self, level):
+        if level + 1 == len(self._levels):
+            self._levels.append(np.empty(0))
+            self._offsets.append(0)
+        items = np.sort(self._levels[level])
+        # With an odd number of items, the largest stays at this level
+        n_paired = len(items) - len(items) % 2
+        offset = self._offsets[level]
+        self._offsets[level] = 1 - offset
+        self._levels[level] = items[n_paired:]
+        self._levels[level + 1] = np.concatenate((self._levels[level + 1],
+                                                  items[offset:n_paired:2]))
+
+
+def _absolute_error(y_true, y_pred):
+    return np.abs(y_pred.astype(float) - y_true.astype(float))
+
+
+class _SketchedMetric:
+    """A metric which is a quantile of a per-sample quantity.
+
+    :param per_sample: Function ``(y_true, y_pred)`` returning the quantity for
+        each sample
+
+    :param q: The quantile of the quantity which gives the metric
+    """
+
+    def __init__(self, per_sample, q):
+        self.per_sample = per_sample
+        self.q = q
+
+    def finalize(self, sketch):
+        """Compute the metric from a sketch of the per-sample quantity."""
+        return sketch.quantile(self.q)
+
+
+# The metrics which StreamingGroupMetric evaluates with quantile sketches
+_SKETCHED_METRICS = {
+    skm.median_absolute_error: _SketchedMetric(_absolute_error, 0.5),
+    skm.max_error: _SketchedMetric(_absolute_error, 1.0)
+}
+
+
+def _get_sketched_metric(metric_function):
+    """Look up the sketched form of a metric, or return ``None``."""
+    try:
+        return _SKETCHED_METRICS.get(metric_function)
+    except TypeError:
+        return None
@@ -0,0 +1,244 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Group metrics of rankings, evaluated over many queries at once.
+
+Each query ranks its own items by descending score. The items of every
+query are laid out as a row of a ``(queries, items)`` table, padded with
+``-inf``, so that the top ``k`` of every query are found together with
+:func:`numpy.argpartition`, and only those are sorted. When the queries
+have very different lengths, and so the table would be mostly padding, the
+items are instead sorted within each query.
+
+Items with equal scores may appear in any order, so each is given the
+average of what it would receive at each of the positions they share (the
+expected value over random tie-breaking). In particular, the results do
+not depend on how :func:`numpy.argpartition` breaks ties.
+"""
+
+import numpy as np
+
+from ._group_index import _get_group_index
+from ._group_metric_result import GroupMetricResult
+from ._group_partition import _encode_groups_1d, _partition
+from ._input_manipulations import _convert_to_ndarray_1d
+from ._metrics_engine import _check_array_sizes
+
+_BAD_K = "k must be a positive integer"
+_SCORES_NOT_FINITE = "All scores must be finite"
+_NO_ITEMS = "At least one item must be ranked"
+
+# The table of queries is used while it has at most this many cells per item
+_MAX_PADDING = 4
+
+
+def _discount(positions):
+    """Return the exposure of each (zero based) position in a ranking."""
+    return 1 / np.log2(positions + 2.0)
+
+
+def _top_k_table(scores, query_codes, order, offsets, k):
+    """Find the top ``k`` items of every query, in descending order of score.
+
+    :param order: Permutation which makes the items of each query contiguous
+
+    :param offsets: The start of each query in the permuted items, followed by the total
+
+    :param k: The number of items to rank for each query, or ``None`` for all of them
+
+    :return: Tuple ``(items, n_top)``, where ``items`` has a row for each
+        query holding the indices of its top items (padded with ``-1``), and
+        ``n_top`` is the number of items in each row
+    """
+    lengths = np.diff(offsets)
+    n_queries, width = len(lengths), lengths.max()
+    depth = width if k is None else min(k, width)
+    n_top = np.minimum(lengths, depth)
+    rows = np.repeat(np.arange(n_queries), lengths)
+    columns = np.arange(len(scores)) - offsets[rows]
+
+    if n_queries * width <= _MAX_PADDING * len(scores):
+        table = np.full((n_queries, width), -np.inf)
+        table[rows, columns] = scores[order]
+        if depth < width:
+            candidates = np.argpartition(-table, depth - 1, axis=1)[:, :depth]
+        else:
+            candidates = np.broadcast_to(np.arange(width), (n_queries, width))
+        ranking = np.argsort(-np.take_along_axis(table, candidates, axis=1),
+                             axis=1, kind='stable')
+        top_columns = np.take_along_axis(candidates, ranking, axis=1)
+    else:
+        # Reorder the items of each query by descending score
+        order = np.lexsort((-scores, query_codes))
+        top_columns = np.broadcast_to(np.arange(depth), (n_queries, depth))
+
+    valid = np.arange(depth) < n_top[:, np.newaxis]
+    positions = offsets[:-1, np.newaxis] + np.where(valid, top_columns, 0)
+    items = np.where(valid, order[positions], -1)
+    return items, n_top
+
+
+def _boundary_ties(scores, query_codes, items, n_top):
+    """Count the items of each query above and tied with its lowest ranked score.
+
+    :return: Tuple ``(boundary, n_above, n_tied)`` with one entry per query
+    """
+    n_queries = len(n_top)
+    boundary = scores[items[np.arange(n_queries), n_top - 1]]
+    item_boundary = boundary[query_codes]
+    n_above = np.bincount(query_codes, weights=scores > item_boundary, minlength=n_queries)
+    n_tied = np.bincount(query_codes, weights=scores == item_boundary, minlength=n_queries)
+    return boundary, n_above, n_tied
+
+
+def _rank_queries(scores, query_ids, k):
+    """Encode the queries and find the top ``k`` items of each."""
+    if not np.all(np.isfinite(scores)):
+        raise ValueError(_SCORES_NOT_FINITE)
+    if len(scores) == 0:
+        raise ValueError(_NO_ITEMS)
+    if query_ids is None:
+        query_codes = np.zeros(len(scores), dtype=np.intp)
+        n_queries = 1
+    else:
+        query_labels, query_codes = _encode_groups_1d(query_ids)
+        n_queries = len(query_labels)
+    order, offsets = _partition(query_codes, n_queries)
+    items, n_top = _top_k_table(scores, query_codes, order, offsets, k)
+    return query_codes, items, n_top
+
+
+def _check_k(k, allow_none):
+    if k is None and allow_none:
+        return
+    if isinstance(k, bool) or not isinstance(k, (int, np.integer)) or k < 1:
+        raise ValueError(_BAD_K)
+
+
+def _check_ranking_sizes(scores, group_membership, query_ids, relevance=None):
+    _check_array_sizes(scores, group_membership, 'scores', 'group_membership')
+    if query_ids is not None:
+        _check_array_sizes(scores, query_ids, 'scores', 'query_ids')
+    if relevance is not None:
+        _check_array_sizes(scores, relevance, 'scores', 'relevance')
+
+
+def _group_means(values, group_membership, denominators=None):
+    """Average a per-item quantity over each group and over all the items."""
+    index = _get_group_index(group_membership)
+    groups, group_codes = index.labels, index.codes
+    if denominators is None:
+        denominators = np.ones(len(values))
+    totals = np.bincount(group_codes, weights=values, minlength=len(groups))
+    sizes = np.bincount(group_codes, weights=denominators, minlength=len(groups))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        group_values = totals / sizes
+        overall = values.sum() / denominators.sum()
+    return GroupMetricResult._from_arrays(overall, groups, group_values)
+
+
+def group_top_k_selection_rate(scores, group_membership, k, query_ids=None):
+    """Compute the fraction of each group's items which are ranked in the top ``k``.
+
+    The items of each query (or all the items, if no ``query_ids`` are given)
+    are ranked by descending score. When the items tied at the ``k``-th
+    position extend beyond it, each of them counts as the fraction of the
+    tied items which fit in the top ``k``. Queries with at most ``k`` items
+    have all of them selected.
+
+    :param scores: Array of scores, where greater scores are ranked higher
+
+    :param group_membership: Array indicating the group to which each item belongs
+
+    :param k: The number of items selected from each query
+    :type k: int
+
+    :param query_ids: Optional array indicating the query in which each item is ranked
+
+    :return: The selection rate of each group, and of all the items
+    :rtype: :class:`GroupMetricResult`
+    """
+    _check_ranking_sizes(scores, group_membership, query_ids)
+    _check_k(k, allow_none=False)
+
+    s = _convert_to_ndarray_1d(scores).astype(float)
+    query_codes, items, n_top = _rank_queries(s, query_ids, k)
+    boundary, n_above, n_tied = _boundary_ties(s, query_codes, items, n_top)
+
+    item_boundary = boundary[query_codes]
+    tied_share = ((n_top - n_above) / n_tied)[query_codes]
+    selected = np.where(s > item_boundary, 1.0,
+                        np.where(s == item_boundary, tied_share, 0.0))
+    return _group_means(selected, group_membership)
+
+
+def group_exposure(scores, group_membership, k=None, query_ids=None, relevance=None):
+    """Compute the average position-discounted exposure of each group's items.
+
+    The items of each query (or all the items, if no ``query_ids`` are given)
+    are ranked by descending score, and the item at position ``i`` (counting
+    from one) receives an exposure of ``1 / log2(1 + i)``, as in the
+    discounted cumulative gain. Items ranked below the top ``k`` receive no
+    exposure, and items with equal scores share the exposure of their
+    positions equally (their expected exposure under random tie-breaking).
+
+    If ``relevance`` is given, the total exposure of each group is divided by
+    its total relevance instead of its number of items, so that groups which
+    receive exposure in proportion to their relevance have equal values.
+    Disparities in exposure can be read from the ``range`` and ``range_ratio``
+    of the result.
+
+    :param scores: Array of scores, where greater scores are ranked higher
+
+    :param group_membership: Array indicating the group to which each item belongs
+
+    :param k: Optional number of top positions of each query which receive exposure
+    :type k: int
+
+    :param query_ids: Optional array indicating the query in which each item is ranked
+
+    :param relevance: Optional array of the relevance of each item
+
+    :return: The mean exposure (or exposure per unit of relevance) of each
+        group, and of all the items
+    :rtype: :class:`GroupMetricResult`
+    """
+    _check_ranking_sizes(scores, group_membership, query_ids, relevance)
+    _check_k(k, allow_none=True)
+
+    s = _convert_to_ndarray_1d(scores).astype(float)
+    query_codes, items, n_top = _rank_queries(s, query_ids, k)
+    boundary, _, n_tied = _boundary_ties(s, query_codes, items, n_top)
+
+    # The ranked items of all the queries, one query after another
+    valid = items >= 0
+    ranked = items[valid]
+    ranked_queries = query_codes[ranked]
+    discounts = np.broadcast_to(_discount(np.arange(items.shape[1])), items.shape)[valid]
+
+    # Each run of equal scores within a query shares the exposure of its positions
+    ranked_scores = s[ranked]
+    new_run = np.ones(len(ranked), dtype=bool)
+    new_run[1:] = (ranked_scores[1:] != ranked_scores[:-1]) | \
+        (ranked_queries[1:] != ranked_queries[:-1])
+    starts = np.flatnonzero(new_run)
+    run_lengths = np.diff(np.append(starts, len(ranked)))
+    run_queries = ranked_queries[starts]
+    # The last run of each query holds the items tied at the boundary, some
+    # of which may be below the top k
+    last_runs = np.flatnonzero(np.append(run_queries[1:] != run_queries[:-1], True))
+    run_sizes = run_lengths.astype(float)
+    run_sizes[last_runs] = n_tied[run_queries[last_runs]]
+    run_values = np.add.reduceat(discounts, starts) / run_sizes
+
+    exposure = np.zeros(len(s))
+    exposure[ranked] = np.repeat(run_values, run_lengths)
+    boundary_value = np.empty(len(n_top))
+    boundary_value[run_queries[last_runs]] = run_values[last_runs]
+    tied = s == boundary[query_codes]
+    exposure[tied] = boundary_value[query_codes[tied]]
+
+    if relevance is None:
+        return _group_means(exposure, group_membership)
+    r = _convert_to_ndarray_1d(relevance).astype(float)
+    return _group_means(exposure, group_membership, r)
@@ -0,0 +1,152 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Per-group ROC AUC from a single sort of the scores.
+
+The area under the ROC curve equals the (weighted) Mann-Whitney statistic:
+the probability that a randomly chosen positive sample has a higher score
+than a randomly chosen negative one, with ties counting one half. Once the
+samples are ordered by score within each group, this only needs the
+cumulative weight of the negatives below each block of tied scores, which
+is computed for every group at once. The overall value is computed from
+the same ordering, with the trapezoidal rule used by scikit-learn.
+"""
+
+import numpy as np
+import sklearn.metrics as skm
+
+from ._group_metric_result import GroupMetricResult
+from ._group_index import _get_group_index
+from ._group_partition import _partition
+from ._input_manipulations import _convert_to_ndarray_and_squeeze
+from ._metrics_engine import _check_array_sizes, metric_by_group
+
+
+def _mann_whitney_auc(scores, positive, weights, group_codes, n_groups):
+    """Compute the AUC of each group from data sorted by group, then by score.
+
+    :param scores: Array of scores, ascending within each group
+
+    :param positive: Boolean array which is ``True`` for the positive samples
+
+    :param weights: Array of sample weights
+
+    :param group_codes: Array of group codes, which must be non-decreasing
+
+    :param n_groups: The number of groups
+
+    :return: Array of shape ``(n_groups,)``
+    """
+    # Each block holds the samples of one group which share a score
+    new_block = np.empty(len(scores), dtype=bool)
+    new_block[0] = True
+    new_block[1:] = (scores[1:] != scores[:-1]) | (group_codes[1:] != group_codes[:-1])
+    starts = np.flatnonzero(new_block)
+    block_groups = group_codes[starts]
+
+    positive_weight = np.add.reduceat(np.where(positive, weights, 0), starts)
+    negative_weight = np.add.reduceat(np.where(positive, 0, weights), starts)
+
+    group_negatives = np.bincount(block_groups, negative_weight, minlength=n_groups)
+    group_positives = np.bincount(block_groups, positive_weight, minlength=n_groups)
+
+    # The weight of the negatives with lower scores in the same group
+    negatives_below = np.cumsum(negative_weight) - negative_weight
+    negatives_below -= (np.cumsum(group_negatives) - group_negatives)[block_groups]
+
+    wins = np.bincount(block_groups,
+                       positive_weight * (negatives_below + 0.5 * negative_weight),
+                       minlength=n_groups)
+    return wins / (group_positives * group_negatives)
+
+
+def _trapezoidal_auc(scores, positive, weights):
+    """Compute the AUC of data sorted by descending score, as sklearn does.
+
+    This follows the arithmetic of :py:func:`sklearn.metrics.roc_curve` and
+    :py:func:`sklearn.metrics.auc`, including the removal of collinear
+    points, so that the result rounds exactly as
+    :py:func:`sklearn.metrics.roc_auc_score` does.
+    """
+    # The last sample of each run of equal scores is a threshold
+    thresholds = np.append(np.flatnonzero(np.diff(scores)), len(scores) - 1)
+    tps = np.cumsum(np.where(positive, weights, 0.0))[thresholds]
+    fps = np.cumsum(np.where(positive, 0.0, weights))[thresholds]
+
+    if len(fps) > 2:
+        corners = np.concatenate(([True],
+                                  np.logical_or(np.diff(fps, 2), np.diff(tps, 2)),
+                                  [True]))
+        tps, fps = tps[corners], fps[corners]
+
+    tpr = np.append(0.0, tps) / tps[-1]
+    fpr = np.append(0.0, fps) / fps[-1]
+    return np.add.reduce(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2.0)
+
+
+def _roc_auc_fast_path(y_true, y_pred, group_codes, n_groups, sample_weight):
+    """Compute the overall and per-group AUC, if this matches sklearn.
+
+    :return: Tuple ``(overall, by_group)``, or ``None`` if
+        :py:func:`sklearn.metrics.roc_auc_score` has to be called directly
+        (for example, to raise an error because a group has a single class)
+    """
+    if y_true.ndim != 1 or y_pred.ndim != 1 or len(y_true) == 0:
+        return None
+    if not np.issubdtype(y_pred.dtype, np.number) or not np.all(np.isfinite(y_pred)):
+        return None
+    labels, y_codes = np.unique(y_true, return_inverse=True)
+    if len(labels) != 2:
+        return None
+    # As in sklearn, the greater label is the positive class
+    positive = y_codes.reshape(-1) == 1
+
+    class_counts = np.bincount(group_codes * 2 + positive, minlength=2 * n_groups)
+    if np.any(class_counts == 0):
+        return None
+
+    weights = np.ones(len(y_true)) if sample_weight is None else sample_weight
+
+    # Sort by score once, then (stably) by group so that the samples of
+    # each group remain in score order
+    by_score = np.argsort(y_pred, kind='stable')
+    group_order, _ = _partition(group_codes[by_score], n_groups)
+    by_group = by_score[group_order]
+
+    by_group_values = _mann_whitney_auc(y_pred[by_group], positive[by_group],
+                                        weights[by_group], group_codes[by_group], n_groups)
+    descending = by_score[::-1]
+    overall = _trapezoidal_auc(y_pred[descending], positive[descending], weights[descending])
+    return overall, by_group_values
+
+
+def group_roc_auc_score(y_true, y_pred, group_membership, sample_weight=None, **kwargs):
+    r"""Wrap the :py:func:`sklearn.metrics.roc_auc_score` routine.
+
+    The arguments remain the same, with `group_membership` added.
+    For binary ``y_true`` with both classes present in every group, and no
+    ``kwargs``, the scores are sorted once and the AUC of every group is
+    computed from that single ordering. Otherwise, ``roc_auc_score`` is
+    called on each group in turn.
+    """
+    _check_array_sizes(y_true, y_pred, 'y_true', 'y_pred')
+    _check_array_sizes(y_true, group_membership, 'y_true', 'group_membership')
+    if sample_weight is not None:
+        _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
+
+    if not kwargs:
+        y_a = _convert_to_ndarray_and_squeeze(y_true)
+        y_p = _convert_to_ndarray_and_squeeze(y_pred)
+        s_w = None
+        if sample_weight is not None:
+            s_w = _convert_to_ndarray_and_squeeze(sample_weight).astype(float)
+
+        index = _get_group_index(group_membership)
+        groups, group_codes = index.labels, index.codes
+        aucs = _roc_auc_fast_path(y_a, y_p, group_codes, len(groups), s_w)
+        if aucs is not None:
+            return GroupMetricResult._from_arrays(aucs[0], groups, aucs[1])
+
+    return metric_by_group(skm.roc_auc_score,
+                           y_true, y_pred, group_membership, sample_weight,
+                           **kwargs)
@@ -3,7 +3,7 @@
 
 import numpy as np
 
-from ._metrics_engine import metric_by_group
+from ._metrics_engine import _make_approximate, metric_by_group
 
 
 def selection_rate(y_true, y_pred, *, pos_label=1, sample_weight=None):
@@ -24,7 +24,9 @@ def group_selection_rate(y_true, y_pred, group_membership,
     """Wrap :func:`selection_rate` as a group metric.
 
     The arguments are the same, with the addition of the
-    `group_membership` array.
+    `group_membership` array. The ``approximate`` attribute estimates
+    the selection rate from a sample of each group, as
+    :func:`approximate_metric_by_group` does, with a `pos_label` of 1.
     """
     def internal_sel_wrapper(y_true, y_pred, sample_weight=None):
         return selection_rate(y_true, y_pred, pos_label=pos_label, sample_weight=sample_weight)
@@ -32,3 +34,6 @@ def group_selection_rate(y_true, y_pred, group_membership,
     return metric_by_group(internal_sel_wrapper,
                            y_true, y_pred, group_membership,
                            sample_weight=sample_weight)
+
+
+group_selection_rate.approximate = _make_approximate(selection_rate)
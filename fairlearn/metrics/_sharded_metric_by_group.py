@@ -0,0 +1,100 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+import numpy as np
+
+from ._input_manipulations import _convert_to_ndarray_1d
+from ._metrics_engine import _check_array_sizes
+from ._streaming_group_metric import StreamingGroupMetric, _NO_DATA
+
+_BAD_N_SHARDS = "n_shards must be a positive integer"
+
+
+def _evaluate_shard(metric_function, y_true, y_pred, group_membership, sample_weight):
+    """Accumulate the state of a metric over a single shard of the data."""
+    return StreamingGroupMetric(metric_function).update(y_true, y_pred,
+                                                        group_membership, sample_weight)
+
+
+def sharded_metric_by_group(metric_function,
+                            y_true, y_pred, group_membership,
+                            sample_weight=None,
+                            *, n_shards=None, executor=None):
+    """Evaluate a grouped metric by splitting the data into shards.
+
+    Each shard is evaluated separately (by default in a separate process),
+    producing a :class:`StreamingGroupMetric` state. The states are then
+    merged to give the final result. Only the metrics supported by
+    :class:`StreamingGroupMetric` can be evaluated in this way.
+
+    :param metric_function: The metric to evaluate
+    :type metric_function: func
+
+    :param y_true: Array of ground-truth values
+
+    :param y_pred: Array of predicted values
+
+    :param group_membership: Array indicating the group to which each input value belongs
+
+    :param sample_weight: Optional weights to apply to each input value
+
+    :param n_shards: The number of shards into which the data are split. Defaults
+        to the number of CPUs
+    :type n_shards: int
+
+    :param executor: The :class:`concurrent.futures.Executor` used to evaluate the
+        shards. If not given, a :class:`concurrent.futures.ProcessPoolExecutor` is
+        created for the duration of the call
+    :type executor: concurrent.futures.Executor
+
+    :return: The same result as :func:`metric_by_group` would produce, except
+        for :py:func:`sklearn.metrics.median_absolute_error`, which is
+        approximated with a quantile sketch. This is exact for groups of up
+        to 200 samples, and for larger groups the rank of the reported error
+        is typically within about 0.85 percent of one half
+    :rtype: :class:`GroupMetricResult`
+    """
+    # Fail early for unsupported metrics, before starting any workers
+    initial_state = StreamingGroupMetric(metric_function)
+
+    _check_array_sizes(y_true, y_pred, 'y_true', 'y_pred')
+    _check_array_sizes(y_true, group_membership, 'y_true', 'group_membership')
+    if sample_weight is not None:
+        _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
+    if len(y_true) == 0:
+        raise ValueError(_NO_DATA)
+
+    if n_shards is None:
+        n_shards = os.cpu_count() or 1
+    if not isinstance(n_shards, int) or n_shards < 1:
+        raise ValueError(_BAD_N_SHARDS)
+
+    y_a = _convert_to_ndarray_1d(y_true)
+    y_p = _convert_to_ndarray_1d(y_pred)
+    g_d = _convert_to_ndarray_1d(group_membership)
+    s_w = None
+    if sample_weight is not None:
+        s_w = _convert_to_ndarray_1d(sample_weight)
+
+    boundaries = np.linspace(0, len(y_a), min(n_shards, len(y_a)) + 1).astype(int)
+    shards = [slice(start, end) for start, end in zip(boundaries[:-1], boundaries[1:])]
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=len(shards))
+    try:
+        futures = [executor.submit(_evaluate_shard,
+                                   metric_function,
+                                   y_a[shard], y_p[shard], g_d[shard],
+                                   None if s_w is None else s_w[shard])
+                   for shard in shards]
+        states = [f.result() for f in futures]
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return reduce(lambda a, b: a.merge(b), states, initial_state).result()
@@ -1,17 +1,16 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import numpy as np
 import sklearn.metrics as skm
 from math import sqrt
+from ._group_metric_result import GroupMetricResult
 from ._metrics_engine import make_group_metric, metric_by_group
 
 
 group_accuracy_score = make_group_metric(skm.accuracy_score)
 """A grouped wrapper around the :py:func:`sklearn.metrics.accuracy_score` routine."""
 
-group_confusion_matrix = make_group_metric(skm.confusion_matrix)
-"""A grouped wrapper around the :py:func:`sklearn.metrics.confusion_matrix` routine."""
-
 group_precision_score = make_group_metric(skm.precision_score)
 """A grouped wrapper around the :py:func:`sklearn.metrics.precision_score` routine
 """
@@ -20,10 +19,6 @@ group_recall_score = make_group_metric(skm.recall_score)
 """A grouped wrapper around the :py:func:`sklearn.metrics.recall_score` routine
 """
 
-group_roc_auc_score = make_group_metric(skm.roc_auc_score)
-"""A grouped wrapper around the :py:func:`sklearn.metrics.roc_auc_score` routine
-"""
-
 group_zero_one_loss = make_group_metric(skm.zero_one_loss)
 """A grouped wrapper around the :py:func:`sklearn.metrics.zero_one_loss` routine
 """
@@ -44,13 +39,24 @@ def group_root_mean_squared_error(y_true, y_pred, group_membership, *,
     `y_pred` and `group_membership`.
     All others must be specified by name.
     """
-    def internal_rmse_wrapper(y_true, y_pred, sample_weight=None):
-        return sqrt(skm.mean_squared_error(y_true, y_pred,
-                                           multioutput=multioutput,
-                                           sample_weight=sample_weight))
-
-    return metric_by_group(internal_rmse_wrapper,
-                           y_true, y_pred, group_membership, sample_weight=sample_weight)
+    # Only pass multioutput when required, so that the mean squared
+    # error of every group can be computed at once
+    kwargs = dict()
+    if multioutput != 'uniform_average':
+        kwargs['multioutput'] = multioutput
+    mse = metric_by_group(skm.mean_squared_error,
+                          y_true, y_pred, group_membership, sample_weight=sample_weight,
+                          **kwargs)
+
+    values = mse.to_numpy()
+    if values.ndim == 1:
+        return GroupMetricResult._from_arrays(sqrt(mse.overall), mse.groups, np.sqrt(values))
+
+    result = GroupMetricResult()
+    result.overall = sqrt(mse.overall)
+    for group, value in mse.by_group.items():
+        result.by_group[group] = sqrt(value)
+    return result
 
 
 group_r2_score = make_group_metric(skm.r2_score)
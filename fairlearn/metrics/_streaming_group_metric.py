@@ -0,0 +1,242 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+
+from ._decomposable_metrics import _get_decomposable_metric, _result_from_sums
+from ._group_partition import _encode_groups_1d
+from ._input_manipulations import _convert_to_ndarray_1d
+from ._group_metric_result import GroupMetricResult
+from ._metrics_engine import _check_array_sizes
+from ._quantile_sketch import _DEFAULT_SKETCH_SIZE, _KLLSketch, _get_sketched_metric
+
+_NO_DATA = "No data have been supplied"
+_BAD_CHUNK = "Each chunk must be a tuple (y_true, y_pred, group_membership[, sample_weight])"
+_MERGE_TYPE = "Can only merge with another StreamingGroupMetric"
+_MERGE_METRIC_MISMATCH = "Cannot merge states accumulated for different metrics"
+_SKETCH_WEIGHTS = "Sample weights are not supported for {0}"
+
+
+class StreamingGroupMetric:
+    """Accumulate a grouped metric over a sequence of chunks of data.
+
+    This is intended for datasets which are too large to be held in
+    memory at once, or which are split across several processes. Only
+    metrics which can be computed from sums of per-sample statistics
+    are supported (for example,
+    :py:func:`sklearn.metrics.accuracy_score`,
+    :py:func:`sklearn.metrics.mean_squared_error` or
+    :py:func:`selection_rate`). For these, the state kept for each group
+    has a constant size, regardless of how much data are supplied.
+
+    In addition, :py:func:`sklearn.metrics.median_absolute_error` and
+    :py:func:`sklearn.metrics.max_error` are supported (without sample
+    weights) by keeping a mergeable quantile sketch of the absolute errors
+    of each group. The maximum error is exact. The median is exact for
+    groups with up to ``sketch_size`` samples, and beyond that the rank of
+    the reported error is typically within about ``1.7 / sketch_size`` of
+    one half (under one percent for the default size of 200), with each
+    group's sketch holding a few hundred values.
+
+    Objects of this class can be pickled, and the states accumulated
+    over separate parts of a dataset can be combined with :meth:`merge`.
+
+    :param metric_function: The metric to accumulate. This must be one of the
+        supported metric functions, called with its default arguments
+    :type metric_function: func
+
+    :param sketch_size: The size parameter of the quantile sketches, for the
+        metrics which use them. Larger sketches are more accurate
+    :type sketch_size: int
+
+    :raises ValueError: If ``metric_function`` is not supported
+    """
+
+    def __init__(self, metric_function, *, sketch_size=_DEFAULT_SKETCH_SIZE):
+        self._metric_function = metric_function
+        self._sketch_size = sketch_size
+        self._metric = _get_streaming_metric(metric_function)
+        self._is_sketched = _get_sketched_metric(metric_function) is not None
+        self._labels = []
+        self._codes = {}
+        if self._is_sketched:
+            # Check the sketch size before any data are supplied
+            self._sketches = []
+            _KLLSketch(sketch_size)
+        else:
+            self._sums = np.zeros((0, self._metric.n_statistics))
+
+    @property
+    def metric_function(self):
+        """Return the metric being accumulated."""
+        return self._metric_function
+
+    @property
+    def n_groups(self):
+        """Return the number of groups seen so far."""
+        return len(self._labels)
+
+    def update(self, y_true, y_pred, group_membership, sample_weight=None):
+        """Add a chunk of data to the accumulated state.
+
+        :param y_true: Array of ground-truth values
+
+        :param y_pred: Array of predicted values
+
+        :param group_membership: Array indicating the group to which each input value belongs
+
+        :param sample_weight: Optional weights to apply to each input value
+
+        :return: This object
+        """
+        _check_array_sizes(y_true, y_pred, 'y_true', 'y_pred')
+        _check_array_sizes(y_true, group_membership, 'y_true', 'group_membership')
+        if sample_weight is not None:
+            _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
+        if len(y_true) == 0:
+            return self
+
+        y_a = _convert_to_ndarray_1d(y_true)
+        y_p = _convert_to_ndarray_1d(y_pred)
+        s_w = None
+        if sample_weight is not None:
+            if self._is_sketched:
+                raise ValueError(_SKETCH_WEIGHTS.format(self._metric_function.__name__))
+            s_w = _convert_to_ndarray_1d(sample_weight)
+        if not self._is_sketched:
+            self._metric.validate(y_a, y_p)
+
+        # Map the groups in this chunk onto the groups seen so far
+        chunk_labels, chunk_codes = _encode_groups_1d(group_membership)
+        codes = self._codes_for(chunk_labels)[chunk_codes]
+
+        if self._is_sketched:
+            values = self._metric.per_sample(y_a, y_p)
+            order = np.argsort(chunk_codes, kind='stable')
+            offsets = np.searchsorted(chunk_codes[order], np.arange(len(chunk_labels) + 1))
+            for i, code in enumerate(codes[order[offsets[:-1]]]):
+                self._sketches[code].update(values[order[offsets[i]:offsets[i + 1]]])
+        else:
+            self._sums += self._metric.group_sums(codes, self.n_groups, y_a, y_p, s_w)
+        return self
+
+    def update_from_chunks(self, chunks):
+        """Add every chunk yielded by an iterable to the accumulated state.
+
+        Each chunk is consumed and discarded before the next is requested, so
+        a generator which reads a large file piece by piece can be used to
+        evaluate the metric with memory bounded by the chunk size.
+
+        :param chunks: Iterable of tuples
+            ``(y_true, y_pred, group_membership)`` or
+            ``(y_true, y_pred, group_membership, sample_weight)``
+
+        :return: This object
+        """
+        for chunk in chunks:
+            if len(chunk) not in (3, 4):
+                raise ValueError(_BAD_CHUNK)
+            self.update(*chunk)
+        return self
+
+    def merge(self, other):
+        """Combine the state of this object with that of another.
+
+        The merge is associative and commutative, so the states for
+        any number of parts of a dataset can be combined in any order.
+        Neither of the inputs is modified.
+
+        :param other: State accumulated for the same metric over other data
+        :type other: :class:`StreamingGroupMetric`
+
+        :return: A new object holding the combined state
+        :rtype: :class:`StreamingGroupMetric`
+        """
+        if not isinstance(other, StreamingGroupMetric):
+            raise ValueError(_MERGE_TYPE)
+        if other._metric_function is not self._metric_function:
+            raise ValueError(_MERGE_METRIC_MISMATCH)
+
+        merged = StreamingGroupMetric(self._metric_function, sketch_size=self._sketch_size)
+        merged._labels = list(self._labels)
+        merged._codes = dict(self._codes)
+        if self._is_sketched:
+            merged._sketches = [sketch.copy() for sketch in self._sketches]
+            other_codes = merged._codes_for(other._labels)
+            for code, sketch in zip(other_codes, other._sketches):
+                merged._sketches[code] = merged._sketches[code].merge(sketch)
+        else:
+            merged._sums = self._sums.copy()
+            other_codes = merged._codes_for(other._labels)
+            np.add.at(merged._sums, other_codes, other._sums)
+        return merged
+
+    def result(self):
+        """Compute the metric from the accumulated state.
+
+        :return: Object containing the metric evaluated over all the data
+            supplied so far, and for each group
+        :rtype: :class:`GroupMetricResult`
+        """
+        if self.n_groups == 0:
+            raise ValueError(_NO_DATA)
+
+        # Report the groups in sorted order, as metric_by_group does
+        order = sorted(range(self.n_groups), key=lambda i: self._labels[i])
+        if self._is_sketched:
+            overall = self._sketches[0]
+            for sketch in self._sketches[1:]:
+                overall = overall.merge(sketch)
+            return GroupMetricResult._from_arrays(
+                self._metric.finalize(overall),
+                [self._labels[i] for i in order],
+                np.array([self._metric.finalize(self._sketches[i]) for i in order]))
+        return _result_from_sums(self._metric, self._sums[order],
+                                 [self._labels[i] for i in order])
+
+    def __getstate__(self):
+        """Return the state for pickling.
+
+        The decomposed form of the metric is looked up again on unpickling,
+        so only the metric function and the accumulated sums are stored.
+        """
+        state = self.__dict__.copy()
+        del state['_metric']
+        return state
+
+    def __setstate__(self, state):
+        """Restore the state after unpickling."""
+        self.__dict__.update(state)
+        self._metric = _get_streaming_metric(self._metric_function)
+
+    def _codes_for(self, labels):
+        """Look up the code of each label, assigning codes to new labels."""
+        result = np.empty(len(labels), dtype=np.intp)
+        for i, label in enumerate(labels):
+            code = self._codes.get(label)
+            if code is None:
+                code = len(self._labels)
+                self._codes[label] = code
+                self._labels.append(label)
+            result[i] = code
+
+        if self._is_sketched:
+            while len(self._sketches) < self.n_groups:
+                self._sketches.append(_KLLSketch(self._sketch_size))
+            return result
+
+        n_new = self.n_groups - self._sums.shape[0]
+        if n_new > 0:
+            self._sums = np.vstack((self._sums, np.zeros((n_new, self._metric.n_statistics))))
+        return result
+
+
+def _get_streaming_metric(metric_function):
+    """Look up the form of a metric which can be accumulated over chunks.
+
+    :raises ValueError: If the metric is not supported
+    """
+    sketched = _get_sketched_metric(metric_function)
+    if sketched is not None:
+        return sketched
+    return _get_decomposable_metric(metric_function)
@@ -0,0 +1,255 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+"""Best and worst groups of a metric, for sensitive features with very many values.
+
+The groups are encoded with a hash table (:func:`pandas.factorize`) rather
+than by sorting their labels, and the metric of every group is computed at
+once from the sums of its per-sample statistics. Only the groups with
+enough samples are ranked, with :func:`numpy.argpartition`, and the labels
+are only looked up for the ``k`` best and ``k`` worst of them. The memory
+used is proportional to the number of samples and of groups, and no
+per-group Python objects are created.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ._decomposable_metrics import _get_decomposable_metric
+from ._group_index import GroupIndex
+from ._input_manipulations import _convert_to_ndarray_and_squeeze
+from ._metrics_engine import _check_array_sizes
+
+_BAD_K = "k must be a positive integer"
+_BAD_MIN_SUPPORT = "min_support must be a positive integer"
+
+_RANKING_COLUMNS = ['value', 'support']
+
+
+class TopKGroupMetricResult:
+    """Class to hold the best and worst groups of a metric, with summary statistics.
+
+    These are produced by the :func:`metric_by_group_top_k` function.
+    Only the groups with at least ``min_support`` samples, and for which
+    the metric is defined, are ranked.
+    """
+
+    def __init__(self):
+        self._overall = None
+        self._best = None
+        self._worst = None
+        self._summary = None
+        self._n_groups = None
+        self._n_ranked_groups = None
+
+    @property
+    def overall(self):
+        """Return the metric calculated over the entire dataset."""
+        return self._overall
+
+    @property
+    def best(self):
+        """Return the best groups, best first.
+
+        This is a :class:`pandas.DataFrame` indexed by the group labels, with
+        the columns ``value`` (of the metric) and ``support`` (the number of samples).
+        """
+        return self._best
+
+    @property
+    def worst(self):
+        """Return the worst groups, worst first, in the same form as :attr:`best`."""
+        return self._worst
+
+    @property
+    def summary(self):
+        """Return summary statistics of the metric over the ranked groups.
+
+        This is a :class:`pandas.Series` holding the ``mean``, ``std``,
+        ``min``, ``25%``, ``50%``, ``75%`` and ``max`` of the values of the
+        ranked groups, as from :meth:`pandas.Series.describe`.
+        """
+        return self._summary
+
+    @property
+    def n_groups(self):
+        """Return the number of distinct groups in the data."""
+        return self._n_groups
+
+    @property
+    def n_ranked_groups(self):
+        """Return the number of groups which were ranked."""
+        return self._n_ranked_groups
+
+
+def _factorize(values):
+    """Encode values as integer codes, in order of first appearance.
+
+    Missing values are given a code of their own.
+
+    :return: Tuple ``(codes, n_codes)``
+    """
+    codes, uniques = pd.factorize(values)
+    if np.any(codes < 0):
+        codes, uniques = pd.factorize(np.where(codes < 0, len(uniques), codes))
+    return codes.astype(np.intp), len(uniques)
+
+
+def _hash_encode(group_membership):
+    """Encode the group of each sample without sorting the group labels.
+
+    :return: Tuple ``(codes, n_groups, first)``, where ``first`` holds the
+        index of the first sample of each group
+    """
+    if isinstance(group_membership, pd.DataFrame):
+        columns = [group_membership.iloc[:, j] for j in range(group_membership.shape[1])]
+    elif isinstance(group_membership, pd.Series):
+        columns = [group_membership]
+    else:
+        g_d = np.asarray(group_membership)
+        columns = list(g_d.T) if g_d.ndim == 2 else [g_d.reshape(-1)]
+
+    codes, n_groups = _factorize(columns[0])
+    for column in columns[1:]:
+        column_codes, n_values = _factorize(column)
+        # The combined keys have at most n_samples**2 values, so fit in 64 bits
+        codes, n_groups = _factorize(codes.astype(np.int64) * n_values + column_codes)
+
+    # The codes are in order of first appearance, so the first sample of each
+    # group is where the running maximum of the codes increases
+    running = np.maximum.accumulate(codes)
+    new = np.ones(len(codes), dtype=bool)
+    new[1:] = running[1:] > running[:-1]
+    return codes, n_groups, np.flatnonzero(new)
+
+
+def _sample_labels(group_membership, rows):
+    """Look up the group labels of some of the samples.
+
+    As in :func:`metric_by_group`, the labels are tuples when there are
+    several sensitive features.
+    """
+    if isinstance(group_membership, pd.DataFrame):
+        selected = group_membership.iloc[rows].to_numpy()
+    elif isinstance(group_membership, pd.Series):
+        selected = group_membership.iloc[rows].to_numpy()
+    else:
+        selected = np.asarray(group_membership)[rows]
+    if selected.ndim == 2 and selected.shape[1] > 1:
+        return [tuple(row) for row in selected]
+    return selected.reshape(-1).tolist()
+
+
+def _select(keys, ties, k):
+    """Find the positions of the ``k`` greatest keys, greatest first.
+
+    Equal keys are ordered by ascending ``ties``.
+    """
+    if len(keys) > k:
+        candidates = np.argpartition(-keys, k - 1)[:k]
+    else:
+        candidates = np.arange(len(keys))
+    return candidates[np.lexsort((ties[candidates], -keys[candidates]))]
+
+
+def _check_positive_integer(value, message):
+    if isinstance(value, bool) or not isinstance(value, (int, np.integer)) or value < 1:
+        raise ValueError(message)
+
+
+def metric_by_group_top_k(metric_function, y_true, y_pred, group_membership, k=10, *,
+                          min_support=1, sample_weight=None, greater_is_better=True):
+    """Find the best and worst groups of a metric, without keeping every group.
+
+    This is intended for sensitive features with very many distinct values
+    (such as postal codes), where a full ``by_group`` dictionary from
+    :func:`metric_by_group` would be large, and mostly made of small groups.
+    Only metrics which :class:`StreamingGroupMetric` computes from sums of
+    per-sample statistics are supported, and the values of the groups match
+    those from :func:`metric_by_group`. Groups with fewer than
+    ``min_support`` samples still count towards ``overall``, but are not
+    ranked, and neither are groups for which the metric is undefined.
+    Groups with equal values are ranked by their first appearance in the
+    data.
+
+    :param metric_function: Function ``(y_true, y_pred, sample_weight=None)``
+
+    :param y_true: Array of ground-truth values
+
+    :param y_pred: Array of predicted values
+
+    :param group_membership: Array indicating the group to which each input value
+        belongs. This may also have a column for each sensitive feature, or be a
+        :class:`GroupIndex`
+
+    :param k: The number of best, and of worst, groups to report
+    :type k: int
+
+    :param min_support: The number of samples a group needs in order to be ranked
+    :type min_support: int
+
+    :param sample_weight: Optional weights to apply to each input value
+
+    :param greater_is_better: Whether greater values of the metric are better
+    :type greater_is_better: bool
+
+    :raises ValueError: If the metric is not supported, or is undefined for
+        the data as a whole
+
+    :rtype: :class:`TopKGroupMetricResult`
+    """
+    _check_array_sizes(y_true, y_pred, 'y_true', 'y_pred')
+    _check_array_sizes(y_true, group_membership, 'y_true', 'group_membership')
+    if sample_weight is not None:
+        _check_array_sizes(y_true, sample_weight, 'y_true', 'sample_weight')
+    _check_positive_integer(k, _BAD_K)
+    _check_positive_integer(min_support, _BAD_MIN_SUPPORT)
+    metric = _get_decomposable_metric(metric_function)
+
+    y_a = _convert_to_ndarray_and_squeeze(y_true)
+    y_p = _convert_to_ndarray_and_squeeze(y_pred)
+    s_w = None
+    if sample_weight is not None:
+        s_w = _convert_to_ndarray_and_squeeze(sample_weight).astype(float)
+    metric.validate(y_a, y_p)
+
+    if isinstance(group_membership, GroupIndex):
+        codes, n_groups = group_membership.codes, group_membership.n_groups
+        # The codes of an index are already in the order of the sorted labels
+        ties = np.arange(n_groups)
+
+        def labels(positions):
+            return [group_membership.labels[i] for i in positions]
+    else:
+        codes, n_groups, first = _hash_encode(group_membership)
+        ties = first
+
+        def labels(positions):
+            return _sample_labels(group_membership, first[positions])
+
+    sums = metric.group_sums(codes, n_groups, y_a, y_p, s_w)
+    # Only raise if the metric is undefined overall, since the groups for
+    # which it is undefined are simply not ranked
+    overall_sums = sums.sum(axis=0)
+    metric.check(overall_sums)
+    values = metric.finalize(sums)
+    support = np.bincount(codes, minlength=n_groups)
+
+    ranked = np.flatnonzero((support >= min_support) & ~np.isnan(values))
+    ranked_values = values[ranked]
+    keys = ranked_values if greater_is_better else -ranked_values
+
+    def table(positions):
+        groups = ranked[positions]
+        return pd.DataFrame({'value': values[groups], 'support': support[groups]},
+                            index=pd.Index(labels(groups)), columns=_RANKING_COLUMNS)
+
+    result = TopKGroupMetricResult()
+    result._overall = metric.finalize(overall_sums)[()]
+    result._best = table(_select(keys, ties[ranked], k))
+    result._worst = table(_select(-keys, ties[ranked], k))
+
+    result._n_groups = n_groups
+    result._n_ranked_groups = len(ranked)
+    result._summary = pd.Series(ranked_values).describe().drop('count')
+    return result
@@ -11,6 +11,8 @@ from fairlearn.metrics import group_accuracy_score, group_precision_score,\
     group_balanced_root_mean_squared_error, group_mean_overprediction, group_r2_score, \
     group_mean_underprediction, group_mean_prediction, group_roc_auc_score,\
     group_root_mean_squared_error
+from fairlearn.metrics import group_expected_calibration_error, group_max_calibration_error
+from fairlearn.metrics import GroupIndex
 from IPython.display import display
 from scipy.sparse import issparse
 import copy
@@ -24,6 +26,7 @@ class FairlearnDashboard(object):
     :param sensitive_features:  A matrix of feature vector examples (# examples x # features),
         these can be from the initial dataset, or reserved from training.
     :type sensitive_features: numpy.array or list[][] or pandas.DataFrame or pandas.Series
+        or fairlearn.metrics.GroupIndex
     :param y_true: The true labels or values for the provided dataset.
     :type y_true: numpy.array or list[]
     :param y_pred: Array of output predictions from models to be evaluated. Can be a single
@@ -95,6 +98,14 @@ class FairlearnDashboard(object):
                 "model_type": ["probability"],
                 "function": group_roc_auc_score
             },
+            "expected_calibration_error": {
+                "model_type": ["probability"],
+                "function": group_expected_calibration_error
+            },
+            "max_calibration_error": {
+                "model_type": ["probability"],
+                "function": group_max_calibration_error
+            },
             "root_mean_squared_error": {
                 "model_type": ["regression", "probability"],
                 "function": group_root_mean_squared_error
@@ -144,6 +155,8 @@ class FairlearnDashboard(object):
         probability_methods = [method[0] for method in self._metric_methods.items()
                                if "probability" in method[1]["model_type"]]
 
+        if isinstance(sensitive_features, GroupIndex):
+            sensitive_features = sensitive_features.decode()
         dataset = self._sanitize_data_shape(sensitive_features)
         model_names = None
         if isinstance(y_pred, dict):
@@ -201,7 +214,7 @@ class FairlearnDashboard(object):
                             binVector)
                         response[id] = {
                                 "global": prediction.overall,
-                                "bins": prediction.by_group
+                                "bins": dict(prediction.by_group)
                                 }
                 except Exception as ed:
                     response[id] = {
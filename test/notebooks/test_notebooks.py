@@ -84,7 +84,7 @@ def test_group_metrics_notebook():
     test_values = {}
     test_values[overall_recall_key] = ScrapSpec("group_metrics.overall", 0.5)
     test_values[by_groups_key] = ScrapSpec(
-        "results.by_group", {'a': 0.0, 'b': 0.5, 'c': 0.75, 'd': 0.0})
+        "recall_by_groups", {'a': 0.0, 'b': 0.5, 'c': 0.75, 'd': 0.0})
 
     assay_one_notebook("Group Metrics", test_values)
 
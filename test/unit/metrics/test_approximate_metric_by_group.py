@@ -0,0 +1,214 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pytest
+import sklearn.metrics as skm
+
+import fairlearn.metrics as metrics
+from test.unit.input_convertors import conversions_for_1d
+
+# ======================================================
+
+Y_true = [0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 0, 1]
+Y_pred = [1, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1]
+groups = ['d', 'e', 'b', 'a', 'a', 'a', 'd', 'c', 'a', 'b',
+          'c', 'd', 'e', 'a', 'b', 'c', 'd', 'e', 'f', 'f']
+weight = [1, 2, 3, 1, 2, 3, 4, 2, 3, 3, 2, 1, 2, 3, 1, 2, 3, 4, 1, 2]
+
+# ======================================================
+
+
+def _random_data(n, n_groups, seed):
+    rng = np.random.default_rng(seed)
+    group_ids = rng.integers(0, n_groups, n)
+    y_true = rng.normal(size=n)
+    y_pred = y_true + rng.normal(size=n) * (1 + group_ids)
+    return y_true, y_pred, group_ids, rng.random(n)
+
+
+@pytest.mark.parametrize("transform_gid", conversions_for_1d)
+@pytest.mark.parametrize("sample_weight", [None, weight])
+def test_full_sample_is_exact(transform_gid, sample_weight):
+    expected = metrics.metric_by_group(skm.accuracy_score, Y_true, Y_pred, groups,
+                                       sample_weight=sample_weight)
+
+    result = metrics.approximate_metric_by_group(skm.accuracy_score, Y_true, Y_pred,
+                                                 transform_gid(groups),
+                                                 sample_weight=sample_weight,
+                                                 max_samples_per_group=10)
+
+    assert isinstance(result, metrics.ApproximateGroupMetricResult)
+    assert result.overall == pytest.approx(expected.overall)
+    assert result.overall_standard_error == 0
+    assert result.sample_size == len(groups)
+    for group in expected.by_group:
+        assert result.by_group[group] == pytest.approx(expected.by_group[group])
+        assert result.by_group_standard_error[group] == 0
+        assert result.by_group_sample_size[group] == groups.count(group)
+
+
+def test_allocation():
+    group_ids = np.repeat([0, 1, 2], [1000, 100, 3])
+    y = np.zeros(len(group_ids))
+
+    capped = metrics.approximate_metric_by_group(skm.mean_squared_error, y, y, group_ids,
+                                                 max_samples_per_group=50)
+    assert dict(capped.by_group_sample_size) == {0: 50, 1: 50, 2: 3}
+
+    proportional = metrics.approximate_metric_by_group(skm.mean_squared_error, y, y,
+                                                       group_ids, sampling_fraction=0.05)
+    # The small groups are given at least ten samples, or all of them
+    assert dict(proportional.by_group_sample_size) == {0: 50, 1: 10, 2: 3}
+
+    both = metrics.approximate_metric_by_group(skm.mean_squared_error, y, y, group_ids,
+                                               sampling_fraction=0.5,
+                                               max_samples_per_group=200,
+                                               min_samples_per_group=60)
+    assert dict(both.by_group_sample_size) == {0: 200, 1: 60, 2: 3}
+
+
+def test_sampled_rows_within_groups():
+    # Each sample's prediction identifies its group, so any row drawn from
+    # the wrong group would show up in the values
+    group_ids = np.repeat(np.arange(5), 200)
+    result = metrics.group_mean_prediction.approximate(np.zeros(1000), group_ids.astype(float),
+                                                       group_ids, max_samples_per_group=7,
+                                                       random_state=3)
+
+    assert list(result.to_numpy()) == [0, 1, 2, 3, 4]
+    assert result.overall == pytest.approx(2)
+
+
+def test_random_state():
+    y_true, y_pred, group_ids, _ = _random_data(1000, 4, 0)
+
+    first = metrics.approximate_metric_by_group(skm.mean_absolute_error, y_true, y_pred,
+                                                group_ids, max_samples_per_group=20,
+                                                random_state=5)
+    second = metrics.approximate_metric_by_group(skm.mean_absolute_error, y_true, y_pred,
+                                                 group_ids, max_samples_per_group=20,
+                                                 random_state=5)
+
+    assert first == second
+    assert first.overall_standard_error == second.overall_standard_error
+
+
+def test_standard_errors_match_spread():
+    y_true, y_pred, group_ids, sample_weight = _random_data(3000, 3, 1)
+    index = metrics.GroupIndex(group_ids)
+    expected = metrics.metric_by_group(skm.mean_squared_error, y_true, y_pred, index,
+                                       sample_weight=sample_weight)
+
+    estimates, errors = [], []
+    for seed in range(200):
+        result = metrics.approximate_metric_by_group(skm.mean_squared_error, y_true, y_pred,
+                                                     index, sample_weight=sample_weight,
+                                                     max_samples_per_group=200,
+                                                     random_state=seed)
+        estimates.append([result.overall] + list(result.to_numpy()))
+        errors.append([result.overall_standard_error] +
+                      list(result.by_group_standard_error.values()))
+    estimates, errors = np.asarray(estimates), np.asarray(errors)
+
+    # The estimates are close to unbiased, and spread as their standard errors say
+    truth = np.concatenate(([expected.overall], expected.to_numpy()))
+    assert np.all(np.abs(estimates.mean(axis=0) - truth) < 4 * errors.mean(axis=0) / np.sqrt(200))
+    assert estimates.std(axis=0) == pytest.approx(errors.mean(axis=0), rel=0.2)
+
+
+def test_group_metric_wrappers():
+    rng = np.random.default_rng(2)
+    group_ids = rng.integers(0, 3, 5000)
+    y_true = rng.integers(0, 2, 5000)
+    y_pred = np.where(rng.random(5000) < 0.2, 1 - y_true, y_true)
+
+    for group_metric, metric_function in [(metrics.group_recall_score, skm.recall_score),
+                                          (metrics.group_selection_rate,
+                                           metrics.selection_rate)]:
+        expected = metrics.approximate_metric_by_group(metric_function, y_true, y_pred,
+                                                       group_ids, sampling_fraction=0.1,
+                                                       random_state=0)
+        result = group_metric.approximate(y_true, y_pred, group_ids,
+                                          sampling_fraction=0.1, random_state=0)
+        assert result == expected
+
+        exact = group_metric(y_true, y_pred, group_ids)
+        for group in exact.by_group:
+            assert abs(result.by_group[group] - exact.by_group[group]) < \
+                5 * result.by_group_standard_error[group]
+
+
+def test_single_sample_standard_error():
+    result = metrics.approximate_metric_by_group(skm.mean_squared_error,
+                                                 [0, 1, 2, 3], [0, 0, 0, 0], ['a', 'a', 'a', 'b'],
+                                                 max_samples_per_group=1)
+
+    assert np.isnan(result.by_group_standard_error['a'])
+    assert result.by_group_standard_error['b'] == 0
+
+
+def test_sample_missing_a_class():
+    # Group 'a' has a single positive sample, which is not drawn
+    y_true = [0] * 20 + [1] + [0, 1, 1]
+    y_pred = [0.1 * (i % 10) for i in range(24)]
+    group_ids = ['a'] * 21 + ['b'] * 3
+
+    result = metrics.approximate_metric_by_group(metrics.balanced_root_mean_squared_error,
+                                                 y_true, y_pred, group_ids,
+                                                 max_samples_per_group=3, random_state=0)
+
+    assert np.isnan(result.by_group['a'])
+    assert np.isnan(result.by_group_standard_error['a'])
+    expected = metrics.balanced_root_mean_squared_error(y_true[21:], y_pred[21:])
+    assert result.by_group['b'] == pytest.approx(expected)
+    assert result.by_group_standard_error['b'] == 0
+
+
+def test_unsupported_metric():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_max_error.approximate(Y_true, Y_pred, groups, max_samples_per_group=2)
+    expected = "The metric max_error cannot be computed from sums of per-sample statistics"
+    assert exception_context.value.args[0] == expected
+
+
+def test_no_allocation():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.approximate_metric_by_group(skm.accuracy_score, Y_true, Y_pred, groups)
+    expected = "One of max_samples_per_group and sampling_fraction must be given"
+    assert exception_context.value.args[0] == expected
+
+
+@pytest.mark.parametrize("max_samples_per_group", [0, 2.5, True])
+def test_bad_max_samples(max_samples_per_group):
+    with pytest.raises(ValueError) as exception_context:
+        metrics.approximate_metric_by_group(skm.accuracy_score, Y_true, Y_pred, groups,
+                                            max_samples_per_group=max_samples_per_group)
+    expected = "max_samples_per_group must be a positive integer"
+    assert exception_context.value.args[0] == expected
+
+
+@pytest.mark.parametrize("sampling_fraction", [0, -0.5, 1.5])
+def test_bad_fraction(sampling_fraction):
+    with pytest.raises(ValueError) as exception_context:
+        metrics.approximate_metric_by_group(skm.accuracy_score, Y_true, Y_pred, groups,
+                                            sampling_fraction=sampling_fraction)
+    expected = "sampling_fraction must be greater than 0 and at most 1"
+    assert exception_context.value.args[0] == expected
+
+
+def test_bad_min_samples():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.approximate_metric_by_group(skm.accuracy_score, Y_true, Y_pred, groups,
+                                            sampling_fraction=0.5, min_samples_per_group=0)
+    expected = "min_samples_per_group must be a positive integer"
+    assert exception_context.value.args[0] == expected
+
+
+def test_multioutput_not_supported():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.approximate_metric_by_group(skm.mean_squared_error, [[0, 1], [1, 1]],
+                                            [[0, 0], [1, 0]], ['a', 'b'],
+                                            max_samples_per_group=1)
+    expected = "Approximate metrics require one dimensional y_true and y_pred"
+    assert exception_context.value.args[0] == expected
@@ -0,0 +1,91 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pytest
+
+import fairlearn.metrics as metrics
+from test.unit.input_convertors import conversions_for_1d
+from test.unit.utility_functions import assert_results_match
+
+# ======================================================
+
+Y_true = [0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+Y_pred = [1, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+groups = [3, 4, 1, 0, 0, 0, 3, 2, 0, 1, 2, 3, 4, 0, 1, 2, 3, 4]
+weight = [1, 2, 3, 1, 2, 3, 4, 2, 3, 3, 2, 1, 2, 3, 1, 2, 3, 4]
+
+group_metric_functions = {
+    "accuracy_score": metrics.group_accuracy_score,
+    "fallout_rate": metrics.group_fallout_rate,
+    "mean_overprediction": metrics.group_mean_overprediction,
+    "mean_underprediction": metrics.group_mean_underprediction,
+    "miss_rate": metrics.group_miss_rate,
+    "precision_score": metrics.group_precision_score,
+    "recall_score": metrics.group_recall_score,
+    "selection_rate": metrics.group_selection_rate,
+    "specificity_score": metrics.group_specificity_score,
+    "zero_one_loss": metrics.group_zero_one_loss
+}
+
+# ======================================================
+
+
+@pytest.mark.parametrize("transform_gid", conversions_for_1d)
+@pytest.mark.parametrize("transform_y_p", conversions_for_1d)
+@pytest.mark.parametrize("transform_y_t", conversions_for_1d)
+def test_matches_group_metrics(transform_y_t, transform_y_p, transform_gid):
+    y_t = transform_y_t(Y_true)
+    y_p = transform_y_p(Y_pred)
+    gid = transform_gid(groups)
+
+    result = metrics.group_binary_classification_metrics(y_t, y_p, gid)
+
+    assert sorted(result.keys()) == sorted(group_metric_functions.keys())
+    for name, group_metric_function in group_metric_functions.items():
+        expected = group_metric_function(Y_true, Y_pred, groups)
+        assert_results_match(expected, result[name])
+
+
+def test_matches_group_metrics_weighted():
+    result = metrics.group_binary_classification_metrics(Y_true, Y_pred, groups,
+                                                         sample_weight=weight)
+
+    for name, group_metric_function in group_metric_functions.items():
+        expected = group_metric_function(Y_true, Y_pred, groups, sample_weight=weight)
+        assert_results_match(expected, result[name])
+
+
+def test_degenerate_groups():
+    y_t = [0, 1, 0, 1, 1]
+    y_p = [0, 0, 1, 1, 0]
+    gid = ['a', 'a', 'b', 'c', 'c']
+
+    result = metrics.group_binary_classification_metrics(y_t, y_p, gid)
+
+    # Group 'a' has no predicted positives, which sklearn reports as zero
+    assert result['precision_score'].by_group['a'] == 0
+    assert result['recall_score'].by_group['a'] == 0
+    assert result['miss_rate'].by_group['a'] == 1
+    # Group 'b' has no true positives
+    assert result['recall_score'].by_group['b'] == 0
+    assert result['specificity_score'].by_group['b'] == 0
+    # Group 'c' has no true negatives, so the specificity is undefined
+    assert np.isnan(result['specificity_score'].by_group['c'])
+    assert np.isnan(result['fallout_rate'].by_group['c'])
+
+
+def test_non_binary_values():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_binary_classification_metrics([0, 1, 2], [0, 1, 1], [0, 0, 1])
+
+    expected = "Only 0 and 1 are allowed in y_true and y_pred"
+    assert exception_context.value.args[0] == expected
+
+
+def test_length_mismatch():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_binary_classification_metrics([0, 1, 1], [0, 1], [0, 0, 1])
+
+    expected = "Array y_pred is not the same size as y_true"
+    assert exception_context.value.args[0] == expected
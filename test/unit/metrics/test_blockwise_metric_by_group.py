@@ -0,0 +1,125 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pytest
+import sklearn.metrics as skm
+
+import fairlearn.metrics as metrics
+from test.unit.utility_functions import assert_results_match
+
+# ======================================================
+
+Y_true = [0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+Y_pred = [1, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+groups = ['d', 'e', 'b', 'a', 'a', 'a', 'd', 'c', 'a', 'b', 'c', 'd', 'e', 'a', 'b', 'c', 'd', 'e']
+weight = [1, 2, 3, 1, 2, 3, 4, 2, 3, 3, 2, 1, 2, 3, 1, 2, 3, 4]
+
+supported_metrics = [skm.accuracy_score,
+                     skm.recall_score,
+                     skm.mean_squared_error,
+                     metrics.selection_rate]
+
+# ======================================================
+
+
+@pytest.mark.parametrize("metric_function", supported_metrics)
+@pytest.mark.parametrize("block_size", [1, 4, 100])
+def test_arrays(metric_function, block_size):
+    expected = metrics.metric_by_group(metric_function, Y_true, Y_pred, groups,
+                                       sample_weight=weight)
+
+    actual = metrics.blockwise_metric_by_group(metric_function, Y_true, Y_pred, groups,
+                                               sample_weight=weight, block_size=block_size)
+
+    assert_results_match(expected, actual)
+
+
+@pytest.mark.parametrize("metric_function", supported_metrics)
+def test_npy_files(metric_function, tmp_path):
+    paths = []
+    for name, values in [('y_true', Y_true), ('y_pred', Y_pred),
+                         ('groups', groups), ('weight', weight)]:
+        path = tmp_path / (name + '.npy')
+        np.save(path, np.asarray(values))
+        paths.append(path)
+
+    expected = metrics.metric_by_group(metric_function, Y_true, Y_pred, groups,
+                                       sample_weight=weight)
+
+    actual = metrics.blockwise_metric_by_group(metric_function, *paths[:3],
+                                               sample_weight=paths[3], block_size=5)
+
+    assert_results_match(expected, actual)
+
+
+@pytest.mark.parametrize("compressed", [True, False])
+def test_npz_files(compressed, tmp_path):
+    save = np.savez_compressed if compressed else np.savez
+    y_true_path = str(tmp_path / 'y_true.npz')
+    groups_path = str(tmp_path / 'groups.npz')
+    save(y_true_path, np.asarray(Y_true)[:, np.newaxis])
+    save(groups_path, groups=np.asarray(groups))
+
+    expected = metrics.metric_by_group(skm.accuracy_score, Y_true, Y_pred, groups)
+
+    actual = metrics.blockwise_metric_by_group(skm.accuracy_score,
+                                               y_true_path, Y_pred, groups_path,
+                                               block_size=7)
+
+    assert_results_match(expected, actual)
+
+
+def test_memmap(tmp_path):
+    path = str(tmp_path / 'y_pred.dat')
+    y_pred = np.memmap(path, dtype=np.float64, mode='w+', shape=(len(Y_pred),))
+    y_pred[:] = Y_pred
+    y_pred.flush()
+    y_pred = np.memmap(path, dtype=np.float64, mode='r', shape=(len(Y_pred),))
+
+    expected = metrics.metric_by_group(skm.mean_absolute_error, Y_true, Y_pred, groups)
+
+    actual = metrics.blockwise_metric_by_group(skm.mean_absolute_error,
+                                               Y_true, y_pred, groups, block_size=3)
+
+    assert_results_match(expected, actual)
+
+
+def test_length_mismatch(tmp_path):
+    path = tmp_path / 'y_pred.npy'
+    np.save(path, np.asarray(Y_pred[:-1]))
+
+    with pytest.raises(ValueError) as exception_context:
+        metrics.blockwise_metric_by_group(skm.accuracy_score, Y_true, path, groups)
+
+    expected = "Array y_pred is not the same size as y_true"
+    assert exception_context.value.args[0] == expected
+
+
+def test_npz_with_several_arrays(tmp_path):
+    path = str(tmp_path / 'data.npz')
+    np.savez(path, Y_true, Y_pred)
+
+    with pytest.raises(ValueError) as exception_context:
+        metrics.blockwise_metric_by_group(skm.accuracy_score, path, Y_pred, groups)
+
+    expected = "The file {0} must contain exactly one array".format(path)
+    assert exception_context.value.args[0] == expected
+
+
+def test_unsupported_file():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.blockwise_metric_by_group(skm.accuracy_score, 'y_true.csv', Y_pred, groups)
+
+    expected = "Unsupported file y_true.csv. Only .npy and .npz files can be read"
+    assert exception_context.value.args[0] == expected
+
+
+@pytest.mark.parametrize("block_size", [0, -1, 2.5])
+def test_bad_block_size(block_size):
+    with pytest.raises(ValueError) as exception_context:
+        metrics.blockwise_metric_by_group(skm.accuracy_score, Y_true, Y_pred, groups,
+                                          block_size=block_size)
+
+    expected = "block_size must be a positive integer"
+    assert exception_context.value.args[0] == expected
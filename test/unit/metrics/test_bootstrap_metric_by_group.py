@@ -0,0 +1,226 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pytest
+import sklearn.metrics as skm
+from concurrent.futures import ThreadPoolExecutor
+
+import fairlearn.metrics as metrics
+
+# ======================================================
+
+Y_true = [0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+Y_pred = [1, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+groups = ['d', 'e', 'b', 'a', 'a', 'a', 'd', 'c', 'a', 'b', 'c', 'd', 'e', 'a', 'b', 'c', 'd', 'e']
+weight = [1, 2, 3, 1, 2, 3, 4, 2, 3, 3, 2, 1, 2, 3, 1, 2, 3, 4]
+
+# The first set are evaluated as matrix products, the remainder on each resample
+bootstrap_metrics = [skm.accuracy_score,
+                     skm.recall_score,
+                     skm.mean_squared_error,
+                     metrics.mean_prediction,
+                     metrics.balanced_root_mean_squared_error,
+                     skm.balanced_accuracy_score,
+                     skm.median_absolute_error]
+
+methods = ["poisson", "multinomial"]
+
+# ======================================================
+
+
+def _large_data():
+    rng = np.random.default_rng(13)
+    n = 4000
+    y_true = rng.integers(0, 2, n)
+    y_pred = np.where(rng.random(n) < 0.8, y_true, 1 - y_true)
+    group_membership = rng.choice(['p', 'q', 'r'], n)
+    return y_true, y_pred, group_membership
+
+
+def _assert_interval_contains(interval, value):
+    lower, upper = interval
+    assert lower <= value <= upper
+
+
+@pytest.mark.parametrize("metric_function", bootstrap_metrics)
+@pytest.mark.parametrize("method", methods)
+def test_point_estimates_and_intervals(metric_function, method):
+    y_true, y_pred, group_membership = _large_data()
+    expected = metrics.metric_by_group(metric_function, y_true, y_pred, group_membership)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = metrics.bootstrap_metric_by_group(metric_function,
+                                                   y_true, y_pred, group_membership,
+                                                   n_bootstrap=200, method=method,
+                                                   random_state=7, executor=executor)
+
+    assert isinstance(result, metrics.BootstrapGroupMetricResult)
+    assert result.n_bootstrap == 200
+    assert result.confidence_level == 0.95
+    assert result.overall == expected.overall
+    assert result.by_group == expected.by_group
+    assert result.by_group_interval.keys() == result.by_group.keys()
+    _assert_interval_contains(result.overall_interval, result.overall)
+    for k, v in result.by_group.items():
+        _assert_interval_contains(result.by_group_interval[k], v)
+    _assert_interval_contains(result.range_interval, result.range)
+    _assert_interval_contains(result.range_ratio_interval, result.range_ratio)
+
+
+@pytest.mark.parametrize("metric_function", bootstrap_metrics)
+@pytest.mark.parametrize("method", methods)
+def test_small_weighted_data(metric_function, method):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = metrics.bootstrap_metric_by_group(metric_function,
+                                                   Y_true, Y_pred, groups,
+                                                   sample_weight=weight,
+                                                   n_bootstrap=50, method=method,
+                                                   random_state=0, executor=executor)
+
+    expected = metrics.metric_by_group(metric_function, Y_true, Y_pred, groups,
+                                       sample_weight=weight)
+    assert result.overall == expected.overall
+    assert result.by_group == expected.by_group
+    lower, upper = result.overall_interval
+    assert lower <= upper
+
+
+@pytest.mark.parametrize("metric_function", [skm.accuracy_score, skm.balanced_accuracy_score])
+@pytest.mark.parametrize("method", methods)
+def test_random_state_reproducible(metric_function, method):
+    y_true, y_pred, group_membership = _large_data()
+
+    results = []
+    for n_workers in [1, 3]:
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            results.append(metrics.bootstrap_metric_by_group(
+                metric_function, y_true, y_pred, group_membership,
+                n_bootstrap=30, method=method, random_state=3, executor=executor))
+
+    assert results[0].overall_interval == results[1].overall_interval
+    assert results[0].by_group_interval == results[1].by_group_interval
+    assert results[0].range_interval == results[1].range_interval
+
+
+def test_fast_path_agrees_with_resampling():
+    y_true, y_pred, group_membership = _large_data()
+
+    fast = metrics.bootstrap_metric_by_group(skm.accuracy_score,
+                                             y_true, y_pred, group_membership,
+                                             n_bootstrap=400, random_state=1)
+    # Passing an argument disables the matrix product evaluation
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        slow = metrics.bootstrap_metric_by_group(skm.accuracy_score,
+                                                 y_true, y_pred, group_membership,
+                                                 n_bootstrap=400, random_state=1,
+                                                 executor=executor, normalize=True)
+
+    for k in fast.by_group_interval.keys():
+        fast_width = fast.by_group_interval[k][1] - fast.by_group_interval[k][0]
+        slow_width = slow.by_group_interval[k][1] - slow.by_group_interval[k][0]
+        assert fast_width == pytest.approx(slow_width, rel=0.25)
+
+
+def test_resampled_class_missing():
+    rng = np.random.default_rng(4)
+    y_true = np.repeat([0, 1], [195, 5])
+    y_pred = rng.random(200)
+    group_membership = np.tile(['p', 'q'], 100)
+
+    result = metrics.bootstrap_metric_by_group(metrics.balanced_root_mean_squared_error,
+                                               y_true, y_pred, group_membership,
+                                               n_bootstrap=100, random_state=0)
+
+    # Some replicates lack the positive class, and are left out of the intervals
+    expected = metrics.metric_by_group(metrics.balanced_root_mean_squared_error,
+                                       y_true, y_pred, group_membership)
+    assert result.by_group == expected.by_group
+    _assert_interval_contains(result.overall_interval, result.overall)
+    for k, v in result.by_group.items():
+        _assert_interval_contains(result.by_group_interval[k], v)
+
+
+def test_kwargs_passed_through():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = metrics.bootstrap_metric_by_group(skm.precision_score,
+                                                   Y_true, Y_pred, groups,
+                                                   n_bootstrap=10, random_state=0,
+                                                   executor=executor, pos_label=0)
+
+    expected = metrics.group_precision_score(Y_true, Y_pred, groups, pos_label=0)
+    assert result.overall == expected.overall
+    assert result.by_group == expected.by_group
+
+
+@pytest.mark.parametrize("n_bootstrap", [0, -1, 2.5])
+def test_bad_n_bootstrap(n_bootstrap):
+    with pytest.raises(ValueError) as exception_context:
+        metrics.bootstrap_metric_by_group(skm.accuracy_score, Y_true, Y_pred, groups,
+                                          n_bootstrap=n_bootstrap)
+
+    expected = "n_bootstrap must be a positive integer"
+    assert exception_context.value.args[0] == expected
+
+
+@pytest.mark.parametrize("confidence_level", [0, 1, 1.5])
+def test_bad_confidence_level(confidence_level):
+    with pytest.raises(ValueError) as exception_context:
+        metrics.bootstrap_metric_by_group(skm.accuracy_score, Y_true, Y_pred, groups,
+                                          confidence_level=confidence_level)
+
+    expected = "confidence_level must be strictly between 0 and 1"
+    assert exception_context.value.args[0] == expected
+
+
+def test_bad_method():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.bootstrap_metric_by_group(skm.accuracy_score, Y_true, Y_pred, groups,
+                                          method="jackknife")
+
+    expected = "method must be one of ['poisson', 'multinomial']"
+    assert exception_context.value.args[0] == expected
+
+
+def test_length_mismatch():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.bootstrap_metric_by_group(skm.accuracy_score, Y_true, Y_pred[:-1], groups)
+
+    expected = "Array y_pred is not the same size as y_true"
+    assert exception_context.value.args[0] == expected
+
+
+def test_default_in_process():
+    # Metrics which cannot be pickled are evaluated without worker processes
+    def unpicklable(y_true, y_pred):
+        return skm.balanced_accuracy_score(y_true, y_pred)
+
+    result = metrics.bootstrap_metric_by_group(unpicklable, Y_true, Y_pred, groups,
+                                               n_bootstrap=20, random_state=0)
+    expected = metrics.bootstrap_metric_by_group(skm.balanced_accuracy_score,
+                                                 Y_true, Y_pred, groups,
+                                                 n_bootstrap=20, random_state=0)
+
+    assert result.overall_interval == expected.overall_interval
+    assert result.by_group_interval == expected.by_group_interval
+
+
+def test_n_jobs_matches_in_process():
+    expected = metrics.bootstrap_metric_by_group(skm.balanced_accuracy_score,
+                                                 Y_true, Y_pred, groups,
+                                                 n_bootstrap=20, random_state=0)
+    result = metrics.bootstrap_metric_by_group(skm.balanced_accuracy_score,
+                                               Y_true, Y_pred, groups,
+                                               n_bootstrap=20, random_state=0, n_jobs=2)
+
+    assert result.overall_interval == expected.overall_interval
+    assert result.by_group_interval == expected.by_group_interval
+    assert result.range_interval == expected.range_interval
+
+
+@pytest.mark.parametrize("n_jobs", [0, -2, 1.5])
+def test_bad_n_jobs(n_jobs):
+    with pytest.raises(ValueError) as exception_context:
+        metrics.bootstrap_metric_by_group(skm.balanced_accuracy_score, Y_true, Y_pred, groups,
+                                          n_jobs=n_jobs)
+    assert exception_context.value.args[0] == "n_jobs must be a positive integer or -1"
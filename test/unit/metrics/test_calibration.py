@@ -0,0 +1,108 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pytest
+from sklearn.calibration import calibration_curve
+
+import fairlearn.metrics as metrics
+from test.unit.input_convertors import conversions_for_1d
+
+# ======================================================
+
+Y_true = [0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+Y_prob = [0.1, 0.3, 0.6, 0.4, 0.9, 0.2, 0.1, 0.6, 0.35, 0.2, 0.55, 0.1,
+          0.25, 0.7, 0.8, 0.6, 0.95, 0.5]
+groups = [3, 4, 1, 0, 0, 0, 3, 2, 0, 1, 2, 3, 4, 0, 1, 2, 3, 4]
+weight = [1, 2, 3, 1, 2, 3, 4, 2, 3, 3, 2, 1, 2, 3, 1, 2, 3, 4]
+
+# ======================================================
+
+
+def _bins(n_bins, y_prob):
+    edges = np.linspace(0, 1, n_bins + 1)
+    return np.searchsorted(edges[1:-1], y_prob)
+
+
+def _expected_ece(y_true, y_prob, sample_weight, n_bins):
+    y_true, y_prob = np.asarray(y_true), np.asarray(y_prob)
+    w = np.ones(len(y_true)) if sample_weight is None else np.asarray(sample_weight, float)
+    bins = _bins(n_bins, y_prob)
+    total = 0
+    for b in np.unique(bins):
+        members = bins == b
+        total += abs(np.sum(w[members] * y_true[members]) - np.sum(w[members] * y_prob[members]))
+    return total / w.sum()
+
+
+def _expected_mce(y_true, y_prob, n_bins):
+    y_true, y_prob = np.asarray(y_true), np.asarray(y_prob)
+    bins = _bins(n_bins, y_prob)
+    return max(abs(y_true[bins == b].mean() - y_prob[bins == b].mean())
+               for b in np.unique(bins))
+
+
+@pytest.mark.parametrize("transform_gid", conversions_for_1d)
+@pytest.mark.parametrize("sample_weight", [None, weight])
+@pytest.mark.parametrize("n_bins", [1, 4, 10])
+def test_expected_calibration_error(transform_gid, sample_weight, n_bins):
+    result = metrics.group_expected_calibration_error(Y_true, Y_prob, transform_gid(groups),
+                                                      sample_weight=sample_weight,
+                                                      n_bins=n_bins)
+
+    assert result.overall == pytest.approx(_expected_ece(Y_true, Y_prob, sample_weight, n_bins))
+    for g in range(5):
+        members = np.asarray(groups) == g
+        s_w = None if sample_weight is None else np.asarray(sample_weight)[members]
+        assert result.by_group[g] == pytest.approx(
+            _expected_ece(np.asarray(Y_true)[members], np.asarray(Y_prob)[members], s_w, n_bins))
+
+
+@pytest.mark.parametrize("n_bins", [2, 5])
+def test_max_calibration_error(n_bins):
+    result = metrics.group_max_calibration_error(Y_true, Y_prob, groups, n_bins=n_bins)
+
+    assert result.overall == pytest.approx(_expected_mce(Y_true, Y_prob, n_bins))
+    for g in range(5):
+        members = np.asarray(groups) == g
+        assert result.by_group[g] == pytest.approx(
+            _expected_mce(np.asarray(Y_true)[members], np.asarray(Y_prob)[members], n_bins))
+
+
+def test_reliability_table_matches_sklearn():
+    result = metrics.group_reliability_table(Y_true, Y_prob, groups, n_bins=4)
+
+    prob_true, prob_pred = calibration_curve(Y_true, Y_prob, n_bins=4)
+    assert list(result.overall.columns) == ['bin_lower', 'bin_upper', 'weight',
+                                            'mean_predicted_probability',
+                                            'fraction_of_positives']
+    assert result.overall['fraction_of_positives'].to_numpy() == pytest.approx(prob_true)
+    assert result.overall['mean_predicted_probability'].to_numpy() == pytest.approx(prob_pred)
+    assert result.overall['weight'].sum() == len(Y_true)
+    for g in range(5):
+        members = np.asarray(groups) == g
+        prob_true, prob_pred = calibration_curve(np.asarray(Y_true)[members],
+                                                 np.asarray(Y_prob)[members], n_bins=4)
+        table = result.by_group[g]
+        assert table['fraction_of_positives'].to_numpy() == pytest.approx(prob_true)
+        assert table['mean_predicted_probability'].to_numpy() == pytest.approx(prob_pred)
+
+
+def test_y_true_not_0_1():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_expected_calibration_error([0, 2], [0.1, 0.2], ['a', 'b'])
+    assert exception_context.value.args[0] == "Only 0 and 1 are allowed in y_true"
+
+
+def test_probability_out_of_range():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_max_calibration_error([0, 1], [0.1, 1.2], ['a', 'b'])
+    expected = "All the predicted probabilities must be in the interval [0, 1]"
+    assert exception_context.value.args[0] == expected
+
+
+@pytest.mark.parametrize("n_bins", [0, 2.5, True])
+def test_bad_n_bins(n_bins):
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_reliability_table(Y_true, Y_prob, groups, n_bins=n_bins)
+    assert exception_context.value.args[0] == "n_bins must be a positive integer"
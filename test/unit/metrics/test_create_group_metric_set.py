@@ -1,11 +1,18 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import io
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pytest
 
 from fairlearn.metrics import group_accuracy_score, group_roc_auc_score
+from fairlearn.metrics import group_expected_calibration_error
 from fairlearn.metrics import create_group_metric_set
+from fairlearn.metrics import save_group_metric_set, load_group_metric_set
+from fairlearn.metrics._group_metric_set import _SharedArray
 
 from test.unit.input_convertors import conversions_for_1d
 
@@ -73,6 +80,17 @@ def test_smoke():
     assert gmr.by_group['b'] == pytest.approx(roc_auc['bins'][1])
 
 
+def test_no_models():
+    Y_true = [0, 1, 0, 1]
+    sensitive_features = [['a', 'b', 'b', 'a'], [1, 1, 2, 2]]
+
+    result = create_group_metric_set('binary_classification', Y_true, [], sensitive_features)
+    assert result['predictedY'] == []
+    assert result['modelNames'] == []
+    assert len(result['precomputedFeatureBins']) == 2
+    assert result['precomputedMetrics'] == [[], []]
+
+
 def test_two_models():
     # Two models, single sensitive feature vector, no names
     Y_true = [0, 1, 0, 1, 1, 1, 1, 1, 0, 1, 0, 0, 0, 1, 1]
@@ -465,3 +483,148 @@ def test_argument_types(transform_y_true,
         # Use the fact that the groups are integers
         for j in range(3):
             assert gmr.by_group[j+4] == pytest.approx(accuracy['bins'][j])
+
+
+def test_compact_matches_lists():
+    Y_true = [0, 1, 0, 1, 1, 1, 1, 1, 0, 1, 0]
+    Y_pred = [[0, 1, 1, 1, 0, 0, 0, 0, 1, 1, 1],
+              [1, 1, 1, 0, 0, 1, 0, 1, 1, 0, 1]]
+    Groups = [['a', 'a', 'b', 'b', 'c', 'a', 'b', 'c', 'c', 'a', 'c'],
+              [4, 5, 6, 6, 5, 4, 4, 5, 5, 6, 6]]
+
+    expected = create_group_metric_set('binary_classification', Y_true, Y_pred, Groups)
+    result = create_group_metric_set('binary_classification', Y_true, Y_pred, Groups,
+                                     compact=True)
+
+    assert isinstance(result['trueY'], np.ndarray)
+    assert result['trueY'].tolist() == expected['trueY']
+    assert [p.tolist() for p in result['predictedY']] == expected['predictedY']
+    for actual_bins, expected_bins in zip(result['precomputedFeatureBins'],
+                                          expected['precomputedFeatureBins']):
+        assert isinstance(actual_bins['binVector'], np.ndarray)
+        assert actual_bins['binVector'].tolist() == expected_bins['binVector']
+        assert actual_bins['binLabels'] == expected_bins['binLabels']
+    assert result['precomputedMetrics'] == expected['precomputedMetrics']
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_save_load_round_trip(compact):
+    Y_true = [0, 1, 0, 1, 1, 1, 1, 1, 0, 1, 0]
+    Y_pred = [[0, 1, 1, 1, 0, 0, 0, 0, 1, 1, 1],
+              [1, 1, 1, 0, 0, 1, 0, 1, 1, 0, 1]]
+    Groups = [['a', 'a', 'b', 'b', 'c', 'a', 'b', 'c', 'c', 'a', 'c'],
+              [4, 5, 6, 6, 5, 4, 4, 5, 5, 6, 6]]
+
+    expected = create_group_metric_set('binary_classification', Y_true, Y_pred, Groups,
+                                       model_titles=['First', 'Second'],
+                                       sensitive_feature_names=['Letter', 'Number'],
+                                       compact=compact)
+
+    buffer = io.BytesIO()
+    save_group_metric_set(buffer, expected)
+    buffer.seek(0)
+    result = load_group_metric_set(buffer)
+
+    assert np.array_equal(result['trueY'], Y_true)
+    assert len(result['predictedY']) == 2
+    for actual, original in zip(result['predictedY'], Y_pred):
+        assert np.array_equal(actual, original)
+    assert result['modelNames'] == ['First', 'Second']
+    for actual_bins, expected_bins in zip(result['precomputedFeatureBins'],
+                                          expected['precomputedFeatureBins']):
+        assert np.array_equal(actual_bins['binVector'], expected_bins['binVector'])
+        assert actual_bins['binLabels'] == expected_bins['binLabels']
+        assert actual_bins['featureBinName'] == expected_bins['featureBinName']
+    assert result['precomputedMetrics'] == expected['precomputedMetrics']
+
+
+def _parallel_inputs():
+    rng = np.random.RandomState(7)
+    n = 200
+    Y_true = rng.randint(2, size=n)
+    Y_pred = [rng.randint(2, size=n) for _ in range(3)]
+    Groups = [rng.choice(['a', 'b', 'c'], size=n), rng.randint(4, size=n)]
+    return Y_true, Y_pred, Groups
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2, -1])
+def test_n_jobs_matches_serial(n_jobs):
+    Y_true, Y_pred, Groups = _parallel_inputs()
+
+    expected = create_group_metric_set('binary_classification', Y_true, Y_pred, Groups)
+    result = create_group_metric_set('binary_classification', Y_true, Y_pred, Groups,
+                                     n_jobs=n_jobs)
+    assert result == expected
+
+
+def test_n_jobs_minus_one_one_labels():
+    # Labels other than 0 and 1 send every metric to the worker processes
+    Y_true, Y_pred, Groups = _parallel_inputs()
+    Y_true = 2 * Y_true - 1
+    Y_pred = [2 * y_pred - 1 for y_pred in Y_pred]
+
+    expected = create_group_metric_set('binary_classification', Y_true, Y_pred, Groups)
+    result = create_group_metric_set('binary_classification', Y_true, Y_pred, Groups,
+                                     n_jobs=2)
+    assert result == expected
+
+
+def test_thread_executor_matches_serial():
+    Y_true, Y_pred, Groups = _parallel_inputs()
+
+    expected = create_group_metric_set('binary_classification', Y_true, Y_pred, Groups)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        result = create_group_metric_set('binary_classification', Y_true, Y_pred, Groups,
+                                         executor=executor)
+    assert result == expected
+
+
+@pytest.mark.parametrize("n_jobs", [0, -2, 1.5])
+def test_bad_n_jobs(n_jobs):
+    with pytest.raises(ValueError) as exception_context:
+        create_group_metric_set('binary_classification', [0, 1], [[0, 1]], [['a', 'b']],
+                                n_jobs=n_jobs)
+    expected = "n_jobs must be a positive integer or -1"
+    assert exception_context.value.args[0] == expected
+
+
+def test_calibration_metrics():
+    Y_true, Y_pred, Groups = _parallel_inputs()
+    rng = np.random.RandomState(11)
+    Y_proba = [rng.uniform(size=len(Y_true)) for _ in Y_pred]
+
+    without = create_group_metric_set('binary_classification', Y_true, Y_pred, Groups)
+    result = create_group_metric_set('binary_classification', Y_true, Y_pred, Groups,
+                                     y_probas=Y_proba)
+
+    for g, groups in enumerate(Groups):
+        for m, model_proba in enumerate(Y_proba):
+            metrics = result['precomputedMetrics'][g][m]
+            assert 'max_calibration_error' in metrics
+            expected = group_expected_calibration_error(Y_true, model_proba, groups)
+            ece = metrics['expected_calibration_error']
+            assert ece['global'] == expected.overall
+            assert ece['bins'] == list(expected.by_group.values())
+            # The other metrics are unchanged
+            for key, value in without['precomputedMetrics'][g][m].items():
+                assert metrics[key] == value
+
+
+def test_calibration_probas_not_matching():
+    with pytest.raises(ValueError) as exception_context:
+        create_group_metric_set('binary_classification', [0, 1], [[0, 1], [1, 1]],
+                                [['a', 'b']], y_probas=[[0.2, 0.6]])
+    expected = "y_probas must hold one array of probabilities for each of the y_preds"
+    assert exception_context.value.args[0] == expected
+
+
+def test_shared_array_pickles_file_name(tmp_path):
+    data = np.arange(1000, dtype=float).reshape(500, 2)
+    shared = _SharedArray(np.asfortranarray(data), str(tmp_path / 'data.npy'))
+
+    pickled = pickle.dumps(shared)
+    assert len(pickled) < data.nbytes
+
+    unpickled = pickle.loads(pickled)
+    assert isinstance(unpickled.array, np.memmap)
+    assert np.array_equal(unpickled.array, data)
@@ -0,0 +1,167 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pandas as pd
+import pytest
+import sklearn.metrics as skm
+
+import fairlearn.metrics as metrics
+from fairlearn.metrics._group_index import _get_group_index
+
+from test.unit.input_convertors import conversions_for_1d
+from test.unit.utility_functions import assert_results_match
+
+# ======================================================
+
+Y_true = [0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+Y_pred = [1, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+groups = ['d', 'e', 'b', 'a', 'a', 'a', 'd', 'c', 'a', 'b', 'c', 'd', 'e', 'a', 'b', 'c', 'd', 'e']
+numbers = [1, 2, 1, 2, 1, 2, 1, 2, 1, 2, 1, 2, 1, 2, 1, 2, 1, 2]
+
+# ======================================================
+
+
+@pytest.fixture
+def clean_cache():
+    metrics.GroupIndex.clear_cache()
+    yield
+    metrics.GroupIndex.set_cache_size(0)
+    metrics.GroupIndex.clear_cache()
+
+
+@pytest.mark.parametrize("transform_gid", conversions_for_1d)
+def test_index_members(transform_gid):
+    index = metrics.GroupIndex(transform_gid(groups))
+
+    assert list(index.labels) == ['a', 'b', 'c', 'd', 'e']
+    assert index.n_groups == 5
+    assert len(index) == len(groups)
+    assert list(index.counts) == [5, 3, 3, 4, 3]
+    assert list(index.offsets) == [0, 5, 8, 11, 15, 18]
+    assert list(index.decode()) == groups
+
+    # Each group is contiguous after the permutation, in the original order
+    permuted = np.asarray(groups)[index.order]
+    for g, label in enumerate(index.labels):
+        members = index.order[index.offsets[g]:index.offsets[g + 1]]
+        assert np.all(permuted[index.offsets[g]:index.offsets[g + 1]] == label)
+        assert np.all(np.diff(members) > 0)
+
+    with pytest.raises(ValueError):
+        index.codes[0] = 1
+
+
+def test_index_several_features():
+    index = metrics.GroupIndex(pd.DataFrame({'letter': groups, 'number': numbers}))
+
+    assert index.labels[0] == ('a', 1)
+    assert index.decode().shape == (len(groups), 2)
+    assert [tuple(row) for row in index.decode()] == list(zip(groups, numbers))
+
+
+@pytest.mark.parametrize("metric_function", [metrics.group_accuracy_score,
+                                             metrics.group_recall_score,
+                                             metrics.group_roc_auc_score,
+                                             metrics.group_selection_rate,
+                                             metrics.group_mean_squared_error,
+                                             metrics.group_median_absolute_error,
+                                             metrics.group_confusion_matrix])
+def test_group_metrics_accept_index(metric_function):
+    index = metrics.GroupIndex(groups)
+
+    expected = metric_function(Y_true, Y_pred, groups)
+    actual = metric_function(Y_true, Y_pred, index)
+    assert list(expected.by_group.keys()) == list(actual.by_group.keys())
+    for k in expected.by_group.keys():
+        assert np.array_equal(expected.by_group[k], actual.by_group[k])
+
+
+def test_engine_functions_accept_index():
+    index = metrics.GroupIndex(groups)
+
+    assert_results_match(metrics.metric_by_group(skm.precision_score, Y_true, Y_pred, groups),
+                         metrics.metric_by_group(skm.precision_score, Y_true, Y_pred, index))
+
+    multi = metrics.metrics_by_group({'accuracy': skm.accuracy_score,
+                                      'f1': skm.f1_score}, Y_true, Y_pred, index)
+    assert_results_match(metrics.metric_by_group(skm.f1_score, Y_true, Y_pred, groups),
+                         multi['f1'])
+
+    models = metrics.metric_by_group_for_models(skm.accuracy_score, Y_true,
+                                                np.column_stack([Y_pred, Y_true]), index)
+    assert_results_match(metrics.group_accuracy_score(Y_true, Y_pred, groups), models[0])
+
+    binary = metrics.group_binary_classification_metrics(Y_true, Y_pred, index)
+    assert_results_match(metrics.group_recall_score(Y_true, Y_pred, groups),
+                         binary['recall_score'])
+
+
+def test_create_group_metric_set_accepts_index():
+    expected = metrics.create_group_metric_set('binary_classification',
+                                               Y_true, [Y_pred], [groups, numbers])
+    actual = metrics.create_group_metric_set('binary_classification',
+                                             Y_true, [Y_pred],
+                                             [metrics.GroupIndex(groups),
+                                              metrics.GroupIndex(numbers)])
+    assert actual == expected
+
+
+def test_size_mismatch():
+    index = metrics.GroupIndex(groups[:-1])
+
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_accuracy_score(Y_true, Y_pred, index)
+    expected = "Array group_membership is not the same size as y_true"
+    assert exception_context.value.args[0] == expected
+
+
+def test_cache_disabled_by_default(clean_cache):
+    assert _get_group_index(groups) is not _get_group_index(groups)
+
+
+@pytest.mark.parametrize("transform_gid", conversions_for_1d)
+def test_cache_reuses_index(clean_cache, transform_gid):
+    metrics.GroupIndex.set_cache_size(2)
+
+    first = _get_group_index(transform_gid(groups))
+    assert _get_group_index(transform_gid(groups)) is first
+    assert _get_group_index(transform_gid(list(reversed(groups)))) is not first
+
+
+def test_cache_evicts_least_recently_used(clean_cache):
+    metrics.GroupIndex.set_cache_size(2)
+
+    first = _get_group_index(groups)
+    second = _get_group_index(numbers)
+    assert _get_group_index(groups) is first
+    _get_group_index(Y_true)
+
+    # The numbers were used least recently, so were discarded
+    assert _get_group_index(groups) is first
+    assert _get_group_index(numbers) is not second
+
+
+def test_cache_distinguishes_dtypes(clean_cache):
+    metrics.GroupIndex.set_cache_size(4)
+
+    as_int = _get_group_index(np.array(numbers, dtype=np.int64))
+    as_float = _get_group_index(np.array(numbers, dtype=float))
+    assert as_int is not as_float
+
+
+def test_cache_distinguishes_object_types(clean_cache):
+    metrics.GroupIndex.set_cache_size(4)
+
+    # These hash alike as strings, but have different labels
+    as_int = _get_group_index(pd.Series([1, 2, 1], dtype=object))
+    as_str = _get_group_index(pd.Series(['1', '2', '1']))
+    assert as_int is not as_str
+    assert list(as_str.labels) == ['1', '2']
+
+
+@pytest.mark.parametrize("maxsize", [-1, 1.5])
+def test_bad_cache_size(maxsize):
+    with pytest.raises(ValueError) as exception_context:
+        metrics.GroupIndex.set_cache_size(maxsize)
+    assert exception_context.value.args[0] == "maxsize must be a non-negative integer"
@@ -0,0 +1,80 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pytest
+
+import fairlearn.metrics as metrics
+from test.unit.input_convertors import conversions_for_1d
+
+# ======================================================
+
+Y_true = [0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+scores = [0.3, 0.1, 0.8, 0.4, 0.9, 0.2, 0.1, 0.6, 0.3, 0.2, 0.5, 0.1, 0.2, 0.7, 0.8, 0.6, 0.9, 0.5]
+groups = [3, 4, 1, 0, 0, 0, 3, 2, 0, 1, 2, 3, 4, 0, 1, 2, 3, 4]
+weight = [1, 2, 3, 1, 2, 3, 4, 2, 3, 3, 2, 1, 2, 3, 1, 2, 3, 4]
+
+group_metric_functions = {
+    "fallout_rate": metrics.group_fallout_rate,
+    "precision_score": metrics.group_precision_score,
+    "recall_score": metrics.group_recall_score,
+    "selection_rate": metrics.group_selection_rate
+}
+
+# ======================================================
+
+
+def _assert_curve_matches(expected, curve, position):
+    assert expected.overall == pytest.approx(curve.overall[position], nan_ok=True)
+    assert list(expected.by_group.keys()) == list(curve.by_group.keys())
+    for k in expected.by_group.keys():
+        assert expected.by_group[k] == pytest.approx(curve.by_group[k][position], nan_ok=True)
+
+
+@pytest.mark.parametrize("transform_gid", conversions_for_1d)
+@pytest.mark.parametrize("sample_weight", [None, weight])
+def test_curves_match_group_metrics(transform_gid, sample_weight):
+    thresholds, curves = metrics.group_metric_curves(Y_true, scores, transform_gid(groups),
+                                                     sample_weight=sample_weight,
+                                                     metric_names=group_metric_functions.keys())
+
+    assert list(thresholds) == sorted(set(scores), reverse=True)
+    for position, threshold in enumerate(thresholds):
+        y_pred = [int(s >= threshold) for s in scores]
+        for name, group_metric_function in group_metric_functions.items():
+            expected = group_metric_function(Y_true, y_pred, groups,
+                                             sample_weight=sample_weight)
+            _assert_curve_matches(expected, curves[name], position)
+
+
+def test_curves_at_given_thresholds():
+    grid = [0.5, 1.0, 0.0, 0.25]
+
+    thresholds, curves = metrics.group_metric_curves(Y_true, scores, groups, thresholds=grid)
+
+    assert list(thresholds) == grid
+    assert sorted(curves.keys()) == ["fallout_rate", "recall_score", "selection_rate"]
+    for position, threshold in enumerate(grid):
+        y_pred = [int(s >= threshold) for s in scores]
+        _assert_curve_matches(metrics.group_selection_rate(Y_true, y_pred, groups),
+                              curves["selection_rate"], position)
+        _assert_curve_matches(metrics.group_recall_score(Y_true, y_pred, groups),
+                              curves["recall_score"], position)
+
+
+def test_y_true_not_0_1():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_metric_curves([0, 2, 1], [0.1, 0.2, 0.3], ['a', 'b', 'a'])
+    assert exception_context.value.args[0] == "Only 0 and 1 are allowed in y_true"
+
+
+def test_scores_not_finite():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_metric_curves([0, 1, 1], [0.1, np.nan, 0.3], ['a', 'b', 'a'])
+    assert exception_context.value.args[0] == "All scores must be finite"
+
+
+def test_unknown_metric():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_metric_curves(Y_true, scores, groups, metric_names=["roc_auc_score"])
+    assert exception_context.value.args[0].startswith("Unknown metric roc_auc_score")
@@ -0,0 +1,169 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pytest
+import sklearn.metrics as skm
+
+import fairlearn.metrics as metrics
+from test.unit.utility_functions import assert_results_match
+
+# ======================================================
+
+Y_true = [0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+Y_pred = [1, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+groups = ['d', 'e', 'b', 'a', 'a', 'a', 'd', 'c', 'a', 'b', 'c', 'd', 'e', 'a', 'b', 'c', 'd', 'e']
+weight = [1, 2, 3, 1, 2, 3, 4, 2, 3, 3, 2, 1, 2, 3, 1, 2, 3, 4]
+
+monitored_metrics = {
+    'selection_rate': metrics.selection_rate,
+    'error_rate': skm.zero_one_loss,
+    'true_positive_rate': skm.recall_score,
+    'false_positive_rate': metrics.fallout_rate,
+    'mean_squared_error': skm.mean_squared_error
+}
+
+# ======================================================
+
+
+def _observe_in_chunks(monitor, chunk_size, *arrays):
+    for start in range(0, len(arrays[0]), chunk_size):
+        monitor.observe(*[a[start:start+chunk_size] for a in arrays])
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 100])
+def test_without_window_matches_metric_by_group(chunk_size):
+    monitor = metrics.GroupMetricMonitor(monitored_metrics)
+    _observe_in_chunks(monitor, chunk_size, Y_true, Y_pred, groups)
+
+    snapshot = monitor.snapshot()
+    assert set(snapshot.keys()) == set(monitored_metrics.keys())
+    for name, metric_function in monitored_metrics.items():
+        expected = metrics.metric_by_group(metric_function, Y_true, Y_pred, groups)
+        assert_results_match(expected, snapshot[name], nan_ok=True)
+
+
+@pytest.mark.parametrize("window", [1, 5, 12, 18, 40])
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 100])
+def test_window_matches_recent_events(window, chunk_size):
+    monitor = metrics.GroupMetricMonitor(monitored_metrics, window=window)
+    _observe_in_chunks(monitor, chunk_size, Y_true, Y_pred, groups, weight)
+
+    snapshot = monitor.snapshot()
+    start = max(0, len(Y_true) - window)
+    for name, metric_function in monitored_metrics.items():
+        expected = metrics.StreamingGroupMetric(metric_function).update(
+            Y_true[start:], Y_pred[start:], groups[start:], weight[start:]).result()
+        # Small windows may not contain both classes, giving NaN rates
+        assert_results_match(expected, snapshot[name], nan_ok=True)
+
+
+def test_window_drops_groups_without_events():
+    monitor = metrics.GroupMetricMonitor({'selection_rate': metrics.selection_rate},
+                                         window=3)
+    monitor.observe([0, 1], [1, 1], ['a', 'a'])
+    monitor.observe([0, 1, 1], [0, 1, 0], ['b', 'c', 'c'])
+
+    result = monitor.snapshot()['selection_rate']
+    assert list(result.by_group.keys()) == ['b', 'c']
+    assert result.overall == pytest.approx(1 / 3)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 100])
+@pytest.mark.parametrize("decay", [0.5, 0.9, 1])
+def test_decay_matches_weighted_metric(decay, chunk_size):
+    monitor = metrics.GroupMetricMonitor(monitored_metrics, decay=decay)
+    _observe_in_chunks(monitor, chunk_size, Y_true, Y_pred, groups, weight)
+
+    # The most recent event has its original weight
+    decayed_weight = np.array(weight) * decay ** np.arange(len(weight) - 1, -1, -1)
+    snapshot = monitor.snapshot()
+    for name, metric_function in monitored_metrics.items():
+        expected = metrics.StreamingGroupMetric(metric_function).update(
+            Y_true, Y_pred, groups, decayed_weight).result()
+        assert_results_match(expected, snapshot[name], nan_ok=True)
+
+
+def test_decay_over_long_stream():
+    rng = np.random.RandomState(3)
+    n = 20000
+    y_true = rng.randint(2, size=n)
+    y_pred = rng.randint(2, size=n)
+    group_membership = rng.randint(4, size=n)
+
+    # The weight of the early events underflows, which must not give NaN
+    monitor = metrics.GroupMetricMonitor({'selection_rate': metrics.selection_rate},
+                                         decay=0.9)
+    _observe_in_chunks(monitor, 1000, y_true, y_pred, group_membership)
+
+    decayed_weight = 0.9 ** np.arange(n - 1, -1, -1)
+    expected = metrics.StreamingGroupMetric(metrics.selection_rate).update(
+        y_true[-1000:], y_pred[-1000:], group_membership[-1000:],
+        decayed_weight[-1000:]).result()
+    assert_results_match(expected, monitor.snapshot()['selection_rate'], nan_ok=True)
+
+
+def test_observe_single_events():
+    monitor = metrics.GroupMetricMonitor({'selection_rate': metrics.selection_rate},
+                                         window=4)
+    for y_t, y_p, g in zip(Y_true, Y_pred, groups):
+        monitor.observe(y_t, y_p, g)
+
+    expected = metrics.StreamingGroupMetric(metrics.selection_rate).update(
+        Y_true[-4:], Y_pred[-4:], groups[-4:]).result()
+    assert_results_match(expected, monitor.snapshot()['selection_rate'], nan_ok=True)
+
+
+def test_window_with_single_class_group():
+    monitor = metrics.GroupMetricMonitor(
+        {'balanced_rmse': metrics.balanced_root_mean_squared_error}, window=4)
+    monitor.observe([0, 1, 0, 1, 0, 0], [0.2, 0.9, 0.4, 0.7, 0.1, 0.3],
+                    ['a', 'b', 'a', 'b', 'b', 'a'])
+
+    # Group 'a' only has negative samples in the window
+    result = monitor.snapshot()['balanced_rmse']
+    assert np.isnan(result.by_group['a'])
+    assert result.by_group['b'] == pytest.approx((0.1 + 0.3) / 2)
+    assert result.overall == pytest.approx((np.sqrt((0.16 + 0.01 + 0.09) / 3) + 0.3) / 2)
+
+
+def test_snapshot_without_data():
+    monitor = metrics.GroupMetricMonitor({'selection_rate': metrics.selection_rate})
+    with pytest.raises(ValueError) as exception_context:
+        monitor.snapshot()
+    assert exception_context.value.args[0] == "No data have been supplied"
+
+
+def test_metrics_not_dict():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.GroupMetricMonitor(metrics.selection_rate)
+    expected = "metric_functions must be a dictionary of metric functions"
+    assert exception_context.value.args[0] == expected
+
+
+def test_unsupported_metric():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.GroupMetricMonitor({'median': skm.median_absolute_error})
+    expected = "The metric median_absolute_error cannot be computed from " \
+        "sums of per-sample statistics"
+    assert exception_context.value.args[0] == expected
+
+
+def test_window_and_decay():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.GroupMetricMonitor(monitored_metrics, window=10, decay=0.5)
+    assert exception_context.value.args[0] == "Only one of window and decay can be given"
+
+
+@pytest.mark.parametrize("window", [0, -1, 2.5])
+def test_bad_window(window):
+    with pytest.raises(ValueError) as exception_context:
+        metrics.GroupMetricMonitor(monitored_metrics, window=window)
+    assert exception_context.value.args[0] == "window must be a positive integer"
+
+
+@pytest.mark.parametrize("decay", [0, -0.5, 1.5])
+def test_bad_decay(decay):
+    with pytest.raises(ValueError) as exception_context:
+        metrics.GroupMetricMonitor(monitored_metrics, decay=decay)
+    assert exception_context.value.args[0] == "decay must be in the interval (0, 1]"
@@ -1,6 +1,9 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import numpy as np
+import pytest
+
 from fairlearn.metrics import group_accuracy_score
 from fairlearn.metrics import group_confusion_matrix
 
@@ -55,3 +58,62 @@ class TestComparisons():
         assert not(b == a)
         assert a != b
         assert b != a
+
+
+class TestArrayBackedResult():
+    def test_reductions(self):
+        result = group_accuracy_score(Y_true, Y_pred, [0, 1, 2] * 6 + [3])
+
+        values = result.to_numpy()
+        assert len(values) == 4
+        assert result.minimum == min(result.by_group.values())
+        assert result.maximum == max(result.by_group.values())
+        assert result.range == result.maximum - result.minimum
+        assert result.range_ratio == result.minimum / result.maximum
+        assert result.argmin_set == {k for k, v in result.by_group.items()
+                                     if v == result.minimum}
+
+    def test_ties(self):
+        result = group_accuracy_score([0, 1, 0, 1], [0, 1, 1, 0], ['a', 'b', 'c', 'd'])
+
+        assert result.argmin_set == {'c', 'd'}
+        assert result.argmax_set == {'a', 'b'}
+        assert result.range == 1
+        assert result.range_ratio == 0
+
+    def test_by_group_is_read_only_view(self):
+        result = group_accuracy_score(Y_true, Y_pred, groups)
+
+        assert result.by_group == {0: result.by_group[0], 1: result.by_group[1]}
+        assert list(result.by_group.keys()) == list(result.groups) == [0, 1]
+        with pytest.raises(TypeError):
+            result.by_group[0] = 1
+        with pytest.raises(ValueError):
+            result.to_numpy()[0] = 1
+
+    def test_zero_copy_export(self):
+        result = group_accuracy_score(Y_true, Y_pred, groups)
+
+        values = result.to_numpy()
+        series = result.to_pandas()
+
+        assert np.shares_memory(values, series.to_numpy())
+        assert list(series.index) == [0, 1]
+        assert list(series) == [result.by_group[0], result.by_group[1]]
+
+    def test_non_scalar_metric_uses_dictionary(self):
+        result = group_confusion_matrix(Y_true, Y_pred, groups)
+
+        assert isinstance(result.by_group, dict)
+        assert list(result.groups) == [0, 1]
+        assert list(result.to_pandas().index) == [0, 1]
+
+    def test_assign_dictionary(self):
+        result = group_accuracy_score(Y_true, Y_pred, groups)
+        assert result.minimum < 0.9
+
+        result.by_group = {'a': 1.0, 'b': 0.9}
+
+        assert result.minimum == 0.9
+        assert result.argmin_set == {'b'}
+        assert list(result.groups) == ['a', 'b']
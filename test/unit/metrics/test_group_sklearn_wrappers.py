@@ -119,6 +119,57 @@ def test_group_confusion_matrix_labels():
     assert np.array_equal(result.overall, expected_overall)
 
 
+@pytest.mark.parametrize("sample_weight", [None, weight, np.asarray(weight) / 3])
+def test_group_confusion_matrix_ternary(sample_weight):
+    result = metrics.group_confusion_matrix(Y_true_ternary, Y_pred_ternary, groups,
+                                            sample_weight=sample_weight)
+    expected = metrics.metric_by_group(skm.confusion_matrix,
+                                       Y_true_ternary, Y_pred_ternary, groups,
+                                       sample_weight=sample_weight)
+
+    assert np.array_equal(result.overall, expected.overall)
+    assert result.overall.dtype == expected.overall.dtype
+    assert list(result.by_group.keys()) == list(expected.by_group.keys())
+    for k in expected.by_group.keys():
+        # Groups without every label have smaller matrices, as from sklearn
+        assert np.array_equal(result.by_group[k], expected.by_group[k])
+        assert result.by_group[k].dtype == expected.by_group[k].dtype
+
+
+def test_group_confusion_matrix_labels_shared_array():
+    labels = [c, a]
+
+    result = metrics.group_confusion_matrix(Y_true_ternary, Y_pred_ternary, group2,
+                                            labels=labels)
+
+    assert np.array_equal(result.overall,
+                          skm.confusion_matrix(Y_true_ternary, Y_pred_ternary, labels=labels))
+    for k, matrix in result.by_group.items():
+        members = np.asarray(group2) == k
+        expected = skm.confusion_matrix(np.asarray(Y_true_ternary)[members],
+                                        np.asarray(Y_pred_ternary)[members],
+                                        labels=labels)
+        assert np.array_equal(matrix, expected)
+    assert result.by_group[0].base is not None
+    assert result.by_group[0].base is result.by_group[1].base
+
+
+def test_group_confusion_matrix_normalize():
+    result = metrics.group_confusion_matrix(Y_true_ternary, Y_pred_ternary, group2,
+                                            normalize='true')
+    expected = skm.confusion_matrix(Y_true_ternary, Y_pred_ternary, normalize='true')
+
+    assert np.array_equal(result.overall, expected)
+
+
+def test_group_confusion_matrix_group_without_labels():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_confusion_matrix(Y_true, Y_pred, groups, labels=[4])
+    with pytest.raises(ValueError) as expected_context:
+        skm.confusion_matrix(Y_true, Y_pred, labels=[4])
+    assert exception_context.value.args[0] == expected_context.value.args[0]
+
+
 # ======================================================================================
 
 def test_group_precision_score_ternary():
@@ -1,8 +1,11 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
 
+import math
 import numpy as np
+import pandas as pd
 import pytest
+import sklearn.metrics as skm
 
 import fairlearn.metrics as metrics
 from test.unit.input_convertors import conversions_for_1d
@@ -250,6 +253,139 @@ class TestMetricByGroup:
         assert result.range == 0
         assert result.range_ratio == 1
 
+    def test_interleaved_groups_keep_order(self):
+        y_t = [1, 2, 3, 4, 5, 6, 7, 8]
+        y_p = [8, 7, 6, 5, 4, 3, 2, 1]
+        gid = ['b', 'a', 'b', 'c', 'a', 'b', 'c', 'a']
+
+        def as_tuples(y_true, y_pred):
+            return list(zip(y_true, y_pred))
+
+        result = metrics.metric_by_group(as_tuples, y_t, y_p, gid)
+        assert list(result.by_group.keys()) == ['a', 'b', 'c']
+        assert result.by_group['a'] == [(2, 7), (5, 4), (8, 1)]
+        assert result.by_group['b'] == [(1, 8), (3, 6), (6, 3)]
+        assert result.by_group['c'] == [(4, 5), (7, 2)]
+
+    @pytest.mark.parametrize("metric_function", [metrics.mean_prediction,
+                                                 metrics.mean_overprediction,
+                                                 metrics.mean_underprediction,
+                                                 metrics.balanced_root_mean_squared_error,
+                                                 skm.mean_absolute_error,
+                                                 skm.mean_squared_error])
+    @pytest.mark.parametrize("transform_s_w", conversions_for_1d)
+    def test_regression_kernels_match_per_group_calls(self, metric_function, transform_s_w):
+        y_t = [0, 1, 1, 0, 1, 0, 0, 1, 1, 0]
+        y_p = [0.2, 0.9, 0.4, 0.6, 1.0, 0.1, 0.0, 0.7, 0.3, 0.5]
+        gid = ['b', 'a', 'b', 'a', 'a', 'b', 'c', 'c', 'a', 'b']
+        s_w = [1, 2, 3, 1, 2, 3, 1, 2, 3, 1]
+
+        result = metrics.metric_by_group(metric_function, y_t, y_p, gid,
+                                         sample_weight=transform_s_w(s_w))
+
+        assert result.overall == metric_function(y_t, y_p, sample_weight=s_w)
+        for group in ['a', 'b', 'c']:
+            mask = np.asarray(gid) == group
+            expected = metric_function(np.asarray(y_t)[mask], np.asarray(y_p)[mask],
+                                       sample_weight=np.asarray(s_w)[mask])
+            assert result.by_group[group] == pytest.approx(expected)
+
+    @pytest.mark.parametrize("metric_function", [skm.median_absolute_error, skm.max_error])
+    @pytest.mark.parametrize("transform_y_p", conversions_for_1d)
+    def test_order_statistics_match_per_group_calls(self, metric_function, transform_y_p):
+        y_t = [0.5, 1.5, 1.0, 0.0, 2.5, 1.0, 3.0, 2.0, 0.0]
+        y_p = [0.0, 1.0, 1.0, 1.0, 2.0, 3.0, 3.0, 0.5, 0.5]
+        gid = ['b', 'a', 'b', 'a', 'a', 'b', 'c', 'b', 'a']
+
+        result = metrics.metric_by_group(metric_function, y_t, transform_y_p(y_p), gid)
+
+        assert result.overall == metric_function(y_t, y_p)
+        for group in ['a', 'b', 'c']:
+            mask = np.asarray(gid) == group
+            expected = metric_function(np.asarray(y_t)[mask], np.asarray(y_p)[mask])
+            assert result.by_group[group] == expected
+
+    def test_weighted_median_absolute_error(self):
+        y_t = [0.5, 1.5, 1.0, 0.0, 2.5, 1.0]
+        y_p = [0.0, 1.0, 1.0, 1.0, 2.0, 3.0]
+        gid = [0, 1, 0, 1, 0, 1]
+        s_w = [1, 2, 3, 1, 2, 3]
+
+        result = metrics.group_median_absolute_error(y_t, y_p, gid, sample_weight=s_w)
+
+        assert result.overall == skm.median_absolute_error(y_t, y_p, sample_weight=s_w)
+        assert result.by_group[1] == skm.median_absolute_error(y_t[1::2], y_p[1::2],
+                                                               sample_weight=s_w[1::2])
+
+    def test_root_mean_squared_error(self):
+        y_t = [0.5, 1.5, 1.0, 0.0, 2.5, 1.0]
+        y_p = [0.0, 1.0, 1.0, 1.0, 2.0, 3.0]
+        gid = [0, 1, 0, 1, 0, 1]
+
+        result = metrics.group_root_mean_squared_error(y_t, y_p, gid)
+
+        assert result.overall == math.sqrt(skm.mean_squared_error(y_t, y_p))
+        assert result.by_group[0] == pytest.approx(math.sqrt((0.25 + 0 + 0.25) / 3))
+        assert result.by_group[1] == pytest.approx(math.sqrt((0.25 + 1 + 4) / 3))
+
+
+class TestMultipleSensitiveFeatures:
+    y_t = [0, 1, 1, 0, 1, 0, 1, 1]
+    y_p = [0, 1, 0, 0, 1, 1, 1, 0]
+    sex = ['f', 'm', 'f', 'm', 'f', 'm', 'f', 'f']
+    age = [1, 1, 2, 2, 1, 1, 2, 2]
+
+    def _check_result(self, result):
+        assert list(result.by_group.keys()) == [('f', 1), ('f', 2), ('m', 1), ('m', 2)]
+        assert result.overall == 0.625
+        assert result.by_group[('f', 1)] == 1
+        assert result.by_group[('f', 2)] == pytest.approx(1 / 3)
+        assert result.by_group[('m', 1)] == 0.5
+        assert result.by_group[('m', 2)] == 1
+
+    def test_dataframe(self):
+        gid = pd.DataFrame({'sex': self.sex, 'age': self.age})
+
+        result = metrics.metric_by_group(skm.accuracy_score, self.y_t, self.y_p, gid)
+
+        self._check_result(result)
+
+    def test_two_dimensional_array(self):
+        gid = np.column_stack((self.sex, self.age))
+
+        result = metrics.metric_by_group(skm.accuracy_score, self.y_t, self.y_p, gid)
+
+        # The array has a string dtype, so the ages are strings
+        assert list(result.by_group.keys()) == [('f', '1'), ('f', '2'), ('m', '1'), ('m', '2')]
+
+    def test_kernel_and_wrappers(self):
+        gid = pd.DataFrame({'sex': self.sex, 'age': self.age})
+
+        result = metrics.group_mean_squared_error(self.y_t, self.y_p, gid)
+
+        self._check_result(metrics.group_accuracy_score(self.y_t, self.y_p, gid))
+        assert result.by_group[('f', 2)] == pytest.approx(2 / 3)
+
+    def test_single_column_is_not_a_tuple(self):
+        gid = pd.DataFrame({'sex': self.sex})
+
+        result = metrics.metric_by_group(skm.accuracy_score, self.y_t, self.y_p, gid)
+
+        assert list(result.by_group.keys()) == ['f', 'm']
+
+    def test_many_combinations(self):
+        # Every row is distinct, and there are too many possible
+        # combinations to number with 64 bit integers
+        n = 10000
+        gid = np.column_stack([np.arange(n)[::-1]] * 5)
+        y = np.arange(n)
+
+        result = metrics.metric_by_group(mock_func, y, y, gid)
+
+        assert len(result.by_group) == n
+        assert list(result.by_group.keys())[:2] == [(0,) * 5, (1,) * 5]
+        assert result.by_group[(0,) * 5] == n - 1
+
 
 class TestMakeGroupMetric:
     def test_smoke(self):
@@ -298,3 +434,60 @@ class TestMakeGroupMetric:
         assert result.argmax_set == {c}
         assert result.range == 20
         assert result.range_ratio == pytest.approx(1.0/21.0)
+
+
+class TestCategoricalGroups:
+    y_t = [0, 1, 1, 0, 1, 0, 1, 1]
+    y_p = [0, 1, 0, 0, 1, 1, 1, 0]
+    sex = ['m', 'f', 'x', 'f', 'm', 'f', 'x', 'x']
+
+    def _check_matches_labels(self, gid, labels):
+        expected = metrics.metric_by_group(skm.accuracy_score, self.y_t, self.y_p, labels)
+        result = metrics.metric_by_group(skm.accuracy_score, self.y_t, self.y_p, gid)
+
+        assert list(result.by_group.keys()) == list(expected.by_group.keys())
+        assert result.overall == expected.overall
+        for k in expected.by_group:
+            assert result.by_group[k] == expected.by_group[k]
+
+    @pytest.mark.parametrize("as_series", [True, False])
+    def test_categorical(self, as_series):
+        # The categories are not sorted, and some are not present
+        gid = pd.Categorical(self.sex, categories=['x', 'unused', 'm', 'f'])
+        if as_series:
+            gid = pd.Series(gid)
+
+        self._check_matches_labels(gid, self.sex)
+
+    def test_ordered_categorical_reports_sorted_labels(self):
+        gid = pd.Categorical(self.sex, categories=['x', 'm', 'f'], ordered=True)
+
+        result = metrics.group_accuracy_score(self.y_t, self.y_p, gid)
+        assert list(result.by_group.keys()) == ['f', 'm', 'x']
+
+    def test_categorical_columns(self):
+        age = [1, 2, 1, 2, 1, 2, 2, 2]
+        gid = pd.DataFrame({'sex': pd.Categorical(self.sex, categories=['x', 'm', 'f']),
+                            'age': age})
+
+        self._check_matches_labels(gid, pd.DataFrame({'sex': self.sex, 'age': age}))
+
+    def test_streaming_categorical(self):
+        gid = pd.Series(pd.Categorical(self.sex, categories=['x', 'm', 'f']))
+
+        accumulator = metrics.StreamingGroupMetric(skm.accuracy_score)
+        accumulator.update(self.y_t[:4], self.y_p[:4], gid[:4])
+        accumulator.update(self.y_t[4:], self.y_p[4:], gid[4:])
+
+        expected = metrics.group_accuracy_score(self.y_t, self.y_p, self.sex)
+        result = accumulator.result()
+        assert list(result.by_group.keys()) == list(expected.by_group.keys())
+        for k in expected.by_group:
+            assert result.by_group[k] == pytest.approx(expected.by_group[k])
+
+    def test_arrow_dictionary(self):
+        pa = pytest.importorskip("pyarrow")
+        array = pa.array(self.sex).dictionary_encode()
+
+        self._check_matches_labels(array, self.sex)
+        self._check_matches_labels(pa.chunked_array([array[:3], array[3:]]), self.sex)
@@ -0,0 +1,86 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import pytest
+import sklearn.metrics as skm
+
+import fairlearn.metrics as metrics
+from test.unit.input_convertors import conversions_for_1d
+from test.unit.utility_functions import assert_results_match
+
+# ======================================================
+
+Y_true = [0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+Y_pred = [1, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+groups = ['d', 'e', 'b', 'a', 'a', 'a', 'd', 'c', 'a', 'b', 'c', 'd', 'e', 'a', 'b', 'c', 'd', 'e']
+weight = [1, 2, 3, 1, 2, 3, 4, 2, 3, 3, 2, 1, 2, 3, 1, 2, 3, 4]
+
+metric_functions = {
+    'accuracy': skm.accuracy_score,
+    'precision': skm.precision_score,
+    'recall': skm.recall_score,
+    'mse': skm.mean_squared_error,
+    'selection_rate': metrics.selection_rate,
+    'roc_auc': skm.roc_auc_score,
+    'balanced_accuracy': skm.balanced_accuracy_score,
+    'r2': skm.r2_score
+}
+
+# ======================================================
+
+
+@pytest.mark.parametrize("transform_gid", conversions_for_1d)
+@pytest.mark.parametrize("transform_y_p", conversions_for_1d)
+@pytest.mark.parametrize("transform_y_t", conversions_for_1d)
+def test_matches_metric_by_group(transform_y_t, transform_y_p, transform_gid):
+    y_t = transform_y_t(Y_true)
+    y_p = transform_y_p(Y_pred)
+    gid = transform_gid(groups)
+
+    result = metrics.metrics_by_group(metric_functions, y_t, y_p, gid)
+
+    assert list(result.keys()) == list(metric_functions.keys())
+    for name, metric_function in metric_functions.items():
+        expected = metrics.metric_by_group(metric_function, Y_true, Y_pred, groups)
+        assert_results_match(expected, result[name])
+
+
+def test_matches_metric_by_group_weighted():
+    result = metrics.metrics_by_group(metric_functions, Y_true, Y_pred, groups,
+                                      sample_weight=weight)
+
+    for name, metric_function in metric_functions.items():
+        expected = metrics.metric_by_group(metric_function, Y_true, Y_pred, groups,
+                                           sample_weight=weight)
+        assert_results_match(expected, result[name])
+
+
+def test_non_scalar_metric():
+    result = metrics.metrics_by_group({'cm': skm.confusion_matrix}, Y_true, Y_pred, groups)
+
+    expected = metrics.group_confusion_matrix(Y_true, Y_pred, groups)
+    assert result['cm'] == expected
+
+
+def test_non_binary_data_uses_metric_function():
+    y_t = [0, 1, 2, 2, 1, 0]
+    y_p = [0, 2, 2, 1, 1, 0]
+    gid = [0, 0, 0, 1, 1, 1]
+
+    result = metrics.metrics_by_group({'acc': skm.accuracy_score}, y_t, y_p, gid)
+
+    assert result['acc'].overall == pytest.approx(4 / 6)
+    assert result['acc'].by_group[0] == pytest.approx(2 / 3)
+    assert result['acc'].by_group[1] == pytest.approx(2 / 3)
+
+
+def test_not_dictionary():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.metrics_by_group([skm.accuracy_score], Y_true, Y_pred, groups)
+
+    expected = "metric_functions must be a dictionary of metric functions"
+    assert exception_context.value.args[0] == expected
+
+
+def test_empty_dictionary():
+    assert metrics.metrics_by_group(dict(), Y_true, Y_pred, groups) == dict()
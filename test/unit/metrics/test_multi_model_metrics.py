@@ -0,0 +1,93 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pandas as pd
+import pytest
+import sklearn.metrics as skm
+
+import fairlearn.metrics as metrics
+from test.unit.utility_functions import assert_results_match, decomposable_metrics
+
+# ======================================================
+
+Y_true = [0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+Y_preds = [[1, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1],
+           [0, 0, 1, 1, 1, 0, 0, 1, 1, 0, 0, 1, 0, 1, 0, 1, 1, 0],
+           [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]]
+groups = [3, 4, 1, 0, 0, 0, 3, 2, 0, 1, 2, 3, 4, 0, 1, 2, 3, 4]
+weight = [1, 2, 3, 1, 2, 3, 4, 2, 3, 3, 2, 1, 2, 3, 1, 2, 3, 4]
+
+# The first set have a vectorized implementation, the remainder do not
+supported_metrics = decomposable_metrics + [skm.roc_auc_score, skm.balanced_accuracy_score]
+
+# ======================================================
+
+
+@pytest.mark.parametrize("metric_function", supported_metrics)
+def test_matches_metric_by_group(metric_function):
+    y_preds = np.transpose(Y_preds)
+
+    results = metrics.metric_by_group_for_models(metric_function, Y_true, y_preds, groups)
+
+    assert len(results) == len(Y_preds)
+    for y_pred, result in zip(Y_preds, results):
+        expected = metrics.metric_by_group(metric_function, Y_true, y_pred, groups)
+        assert_results_match(expected, result)
+
+
+@pytest.mark.parametrize("metric_function", supported_metrics)
+def test_matches_metric_by_group_weighted(metric_function):
+    y_preds = pd.DataFrame(np.transpose(Y_preds))
+
+    results = metrics.metric_by_group_for_models(metric_function, Y_true, y_preds, groups,
+                                                 sample_weight=weight)
+
+    assert len(results) == len(Y_preds)
+    for y_pred, result in zip(Y_preds, results):
+        expected = metrics.metric_by_group(metric_function, Y_true, y_pred, groups,
+                                           sample_weight=weight)
+        assert_results_match(expected, result)
+
+
+@pytest.mark.parametrize("metric_function", decomposable_metrics)
+def test_models_in_blocks(metric_function, monkeypatch):
+    y_preds = np.transpose(Y_preds)
+    expected = metrics.metric_by_group_for_models(metric_function, Y_true, y_preds, groups,
+                                                  sample_weight=weight)
+
+    # Only room for the counts of two models at a time
+    monkeypatch.setattr("fairlearn.metrics._binary_classification_metrics._MAX_BLOCK_ELEMENTS",
+                        2 * len(Y_true))
+    results = metrics.metric_by_group_for_models(metric_function, Y_true, y_preds, groups,
+                                                 sample_weight=weight)
+
+    for expected_result, result in zip(expected, results):
+        assert_results_match(expected_result, result)
+
+
+def test_kwargs_passed_through():
+    y_preds = np.transpose(Y_preds)
+
+    results = metrics.metric_by_group_for_models(skm.precision_score, Y_true, y_preds, groups,
+                                                 pos_label=0)
+
+    for y_pred, result in zip(Y_preds, results):
+        expected = metrics.group_precision_score(Y_true, y_pred, groups, pos_label=0)
+        assert_results_match(expected, result)
+
+
+def test_single_model_vector():
+    results = metrics.metric_by_group_for_models(skm.accuracy_score,
+                                                 Y_true, Y_preds[0], groups)
+
+    assert len(results) == 1
+    assert_results_match(metrics.group_accuracy_score(Y_true, Y_preds[0], groups), results[0])
+
+
+def test_length_mismatch():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.metric_by_group_for_models(skm.accuracy_score, Y_true, Y_preds, groups)
+
+    expected = "Array y_preds is not the same size as y_true"
+    assert exception_context.value.args[0] == expected
@@ -0,0 +1,133 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pytest
+
+import fairlearn.metrics as metrics
+from test.unit.input_convertors import conversions_for_1d
+
+# ======================================================
+
+scores = [0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.8, 0.6, 0.6, 0.1, 0.9]
+groups = ['a', 'b', 'a', 'b', 'a', 'b', 'a', 'b', 'a', 'a', 'b', 'b']
+queries = [1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2]
+
+# Query 1 ranks items 0 to 6 in order. Query 2 ranks item 11, then 7,
+# then items 8 and 9 tied, then item 10
+ranks_1 = {0: 1, 1: 2, 2: 3, 3: 4, 4: 5, 5: 6, 6: 7}
+
+# ======================================================
+
+
+def _discount(rank):
+    return 1 / np.log2(1 + rank)
+
+
+def _expected_exposure(k):
+    exposure = np.zeros(len(scores))
+    for item, rank in ranks_1.items():
+        exposure[item] = _discount(rank) if rank <= k else 0
+    exposure[11] = _discount(1) if k >= 1 else 0
+    exposure[7] = _discount(2) if k >= 2 else 0
+    # The tied items share positions 3 and 4
+    exposure[[8, 9]] = sum(_discount(r) for r in [3, 4] if r <= k) / 2
+    exposure[10] = _discount(5) if k >= 5 else 0
+    return exposure
+
+
+def _assert_group_means(result, values):
+    values = np.asarray(values)
+    assert result.overall == pytest.approx(values.mean())
+    for group in ['a', 'b']:
+        members = np.asarray(groups) == group
+        assert result.by_group[group] == pytest.approx(values[members].mean())
+
+
+@pytest.mark.parametrize("transform_gid", conversions_for_1d)
+@pytest.mark.parametrize("transform_qid", conversions_for_1d)
+def test_top_k_selection_rate(transform_gid, transform_qid):
+    result = metrics.group_top_k_selection_rate(scores, transform_gid(groups), 3,
+                                                query_ids=transform_qid(queries))
+
+    # Item 8 and 9 share the third place of query 2
+    selected = [1, 1, 1, 0, 0, 0, 0, 1, 0.5, 0.5, 0, 1]
+    _assert_group_means(result, selected)
+
+
+def test_top_k_selection_rate_short_queries():
+    result = metrics.group_top_k_selection_rate(scores, groups, 10, query_ids=queries)
+
+    _assert_group_means(result, np.ones(len(scores)))
+
+
+def test_top_k_selection_rate_single_query():
+    result = metrics.group_top_k_selection_rate(scores, groups, 2)
+
+    # Items 0 and 11 are tied at the top
+    selected = np.zeros(len(scores))
+    selected[[0, 11]] = 1
+    _assert_group_means(result, selected)
+
+
+@pytest.mark.parametrize("k", [1, 3, 4, None])
+def test_exposure(k):
+    result = metrics.group_exposure(scores, groups, k=k, query_ids=queries)
+
+    _assert_group_means(result, _expected_exposure(7 if k is None else k))
+
+
+def test_exposure_with_relevance():
+    relevance = [1, 0, 1, 1, 0, 1, 0, 1, 1, 0, 1, 1]
+
+    result = metrics.group_exposure(scores, groups, k=3, query_ids=queries,
+                                    relevance=relevance)
+
+    exposure = _expected_exposure(3)
+    relevance = np.asarray(relevance)
+    assert result.overall == pytest.approx(exposure.sum() / relevance.sum())
+    for group in ['a', 'b']:
+        members = np.asarray(groups) == group
+        assert result.by_group[group] == pytest.approx(
+            exposure[members].sum() / relevance[members].sum())
+    assert result.range_ratio == pytest.approx(result.minimum / result.maximum)
+
+
+def test_ragged_queries_match_padded():
+    rng = np.random.default_rng(7)
+    n = 200
+    random_scores = rng.integers(0, 20, n).astype(float)
+    random_groups = rng.integers(0, 3, n)
+    # One long query makes the table of queries mostly padding
+    ragged = np.where(np.arange(n) < 150, 0, np.arange(n))
+    even = np.arange(n) % 10
+
+    for query_ids in [ragged, even]:
+        result = metrics.group_exposure(random_scores, random_groups, k=5, query_ids=query_ids)
+        selection = metrics.group_top_k_selection_rate(random_scores, random_groups, 5,
+                                                       query_ids=query_ids)
+        # Each query gives out the exposure of its top positions in total
+        lengths = np.bincount(np.unique(query_ids, return_inverse=True)[1].reshape(-1))
+        expected_total = sum(_discount(np.arange(1, min(5, m) + 1)).sum() for m in lengths)
+        assert result.overall * n == pytest.approx(expected_total)
+        assert selection.overall * n == pytest.approx(np.minimum(lengths, 5).sum())
+
+
+@pytest.mark.parametrize("k", [0, -1, 1.5, True])
+def test_bad_k(k):
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_top_k_selection_rate(scores, groups, k)
+    assert exception_context.value.args[0] == "k must be a positive integer"
+
+
+def test_scores_not_finite():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_exposure([0.5, np.inf], ['a', 'b'])
+    assert exception_context.value.args[0] == "All scores must be finite"
+
+
+def test_query_ids_size_mismatch():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.group_exposure(scores, groups, query_ids=queries[:-1])
+    assert exception_context.value.args[0] == \
+        "Array query_ids is not the same size as scores"
@@ -0,0 +1,107 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pytest
+import sklearn.metrics as skm
+
+import fairlearn.metrics as metrics
+
+from test.unit.input_convertors import conversions_for_1d
+
+# ======================================================
+
+Y_true = [0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+Y_score = [0.2, 0.4, 0.9, 0.3, 0.8, 0.4, 0.1, 0.6, 0.4,
+           0.2, 0.4, 0.3, 0.5, 0.7, 0.4, 0.9, 0.6, 0.5]
+groups = [3, 4, 1, 0, 0, 0, 3, 2, 0, 1, 2, 3, 4, 0, 1, 2, 3, 4]
+weight = [1, 2, 3, 1, 2, 3, 4, 2, 3, 3, 2, 1, 2, 3, 1, 2, 3, 4]
+
+# ======================================================
+
+
+def _assert_matches_sklearn(result, y_true, y_score, group_membership, sample_weight=None):
+    expected = metrics.metric_by_group(skm.roc_auc_score,
+                                       y_true, y_score, group_membership,
+                                       sample_weight=sample_weight)
+    assert result.overall == pytest.approx(expected.overall)
+    assert list(result.by_group.keys()) == list(expected.by_group.keys())
+    for k in expected.by_group.keys():
+        assert result.by_group[k] == pytest.approx(expected.by_group[k], nan_ok=True)
+
+
+@pytest.mark.parametrize("transform_y_t", conversions_for_1d)
+@pytest.mark.parametrize("transform_y_s", conversions_for_1d)
+@pytest.mark.parametrize("transform_gid", conversions_for_1d)
+def test_matches_sklearn(transform_y_t, transform_y_s, transform_gid):
+    result = metrics.group_roc_auc_score(transform_y_t(Y_true),
+                                         transform_y_s(Y_score),
+                                         transform_gid(groups))
+
+    _assert_matches_sklearn(result, Y_true, Y_score, groups)
+
+
+def test_matches_sklearn_weighted():
+    result = metrics.group_roc_auc_score(Y_true, Y_score, groups, sample_weight=weight)
+
+    _assert_matches_sklearn(result, Y_true, Y_score, groups, weight)
+
+
+def test_random_data_with_ties():
+    rng = np.random.default_rng(5)
+    n = 5000
+    y_true = rng.integers(0, 2, n)
+    # Rounding the scores produces many ties, within and across groups
+    y_score = np.round(rng.random(n) + 0.2 * y_true, 1)
+    group_membership = rng.choice(['p', 'q', 'r', 's'], n)
+    sample_weight = rng.random(n)
+
+    result = metrics.group_roc_auc_score(y_true, y_score, group_membership,
+                                         sample_weight=sample_weight)
+
+    _assert_matches_sklearn(result, y_true, y_score, group_membership, sample_weight)
+
+
+def test_string_labels():
+    y_true = np.where(np.asarray(Y_true) == 1, 'yes', 'no')
+
+    result = metrics.group_roc_auc_score(y_true, Y_score, groups)
+
+    _assert_matches_sklearn(result, y_true, Y_score, groups)
+
+
+def test_single_class_group_uses_sklearn():
+    y_true = list(Y_true)
+    # Group 4 now only has negative samples
+    y_true[17] = 0
+
+    result = metrics.group_roc_auc_score(y_true, Y_score, groups)
+
+    _assert_matches_sklearn(result, y_true, Y_score, groups)
+
+
+def test_kwargs_passed_through():
+    result = metrics.group_roc_auc_score(Y_true, Y_score, groups, max_fpr=0.5)
+
+    expected = metrics.metric_by_group(skm.roc_auc_score, Y_true, Y_score, groups,
+                                       max_fpr=0.5)
+    assert result == expected
+
+
+def test_overall_matches_sklearn():
+    rng = np.random.default_rng(7)
+    n = 2000
+    y_true = rng.integers(0, 2, n)
+    y_score = np.round(rng.random(n) + 0.3 * y_true, 2)
+    group_membership = rng.integers(0, 5, n)
+    sample_weight = rng.random(n)
+
+    # Without weights the counts are exact, so the values are identical
+    result = metrics.group_roc_auc_score(y_true, y_score, group_membership)
+    assert result.overall == skm.roc_auc_score(y_true, y_score)
+
+    result = metrics.group_roc_auc_score(y_true, y_score, group_membership,
+                                         sample_weight=sample_weight)
+    assert result.overall == pytest.approx(skm.roc_auc_score(y_true, y_score,
+                                                             sample_weight=sample_weight),
+                                           rel=1e-12)
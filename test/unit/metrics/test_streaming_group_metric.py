@@ -0,0 +1,303 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pickle
+import pytest
+import sklearn.metrics as skm
+from concurrent.futures import ThreadPoolExecutor
+
+import fairlearn.metrics as metrics
+from test.unit.utility_functions import assert_results_match, decomposable_metrics
+
+# ======================================================
+
+Y_true = [0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+Y_pred = [1, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1]
+groups = ['d', 'e', 'b', 'a', 'a', 'a', 'd', 'c', 'a', 'b', 'c', 'd', 'e', 'a', 'b', 'c', 'd', 'e']
+weight = [1, 2, 3, 1, 2, 3, 4, 2, 3, 3, 2, 1, 2, 3, 1, 2, 3, 4]
+
+# ======================================================
+
+
+def _chunks(chunk_size, *arrays):
+    for start in range(0, len(arrays[0]), chunk_size):
+        yield tuple(a[start:start+chunk_size] for a in arrays)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 7, 100])
+@pytest.mark.parametrize("metric_function", decomposable_metrics)
+def test_matches_metric_by_group(metric_function, chunk_size):
+    accumulator = metrics.StreamingGroupMetric(metric_function)
+    accumulator.update_from_chunks(_chunks(chunk_size, Y_true, Y_pred, groups))
+
+    expected = metrics.metric_by_group(metric_function, Y_true, Y_pred, groups)
+    assert_results_match(expected, accumulator.result())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 100])
+@pytest.mark.parametrize("metric_function", decomposable_metrics)
+def test_matches_metric_by_group_weighted(metric_function, chunk_size):
+    accumulator = metrics.StreamingGroupMetric(metric_function)
+    accumulator.update_from_chunks(_chunks(chunk_size, Y_true, Y_pred, groups, weight))
+
+    expected = metrics.metric_by_group(metric_function, Y_true, Y_pred, groups,
+                                       sample_weight=weight)
+    assert_results_match(expected, accumulator.result())
+
+
+def test_update_returns_self():
+    accumulator = metrics.StreamingGroupMetric(skm.accuracy_score)
+    result = accumulator.update(Y_true[:9], Y_pred[:9], groups[:9]) \
+        .update(Y_true[9:], Y_pred[9:], groups[9:]) \
+        .result()
+
+    expected = metrics.group_accuracy_score(Y_true, Y_pred, groups)
+    assert_results_match(expected, result)
+    assert accumulator.n_groups == 5
+
+
+def test_balanced_root_mean_squared_error():
+    y_t = np.array([0, 1, 0, 1, 1, 0, 0, 1])
+    y_p = np.array([0.1, 0.8, 0.3, 0.4, 0.9, 0.6, 0.2, 0.7])
+    gid = np.array([0, 0, 0, 0, 1, 1, 1, 1])
+
+    accumulator = metrics.StreamingGroupMetric(metrics.balanced_root_mean_squared_error)
+    result = accumulator.update_from_chunks(_chunks(3, y_t, y_p, gid)).result()
+
+    for g in [0, 1]:
+        mask = gid == g
+        rmse_0 = np.sqrt(np.mean(np.square(y_p[mask & (y_t == 0)])))
+        rmse_1 = np.sqrt(np.mean(np.square(1 - y_p[mask & (y_t == 1)])))
+        assert result.by_group[g] == pytest.approx((rmse_0 + rmse_1) / 2)
+
+
+def test_balanced_root_mean_squared_error_single_class_group():
+    accumulator = metrics.StreamingGroupMetric(metrics.balanced_root_mean_squared_error)
+    accumulator.update([0, 1, 0, 0], [0.1, 0.8, 0.3, 0.4], [0, 0, 1, 1])
+
+    # As with metric_by_group, every group needs both classes
+    with pytest.raises(ValueError) as exception_context:
+        accumulator.result()
+    expected = "Only 0 and 1 are allowed in y_true and both must be present"
+    assert exception_context.value.args[0] == expected
+
+
+def test_unsupported_metric():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.StreamingGroupMetric(skm.roc_auc_score)
+
+    expected = "The metric roc_auc_score cannot be computed from sums " \
+        "of per-sample statistics"
+    assert exception_context.value.args[0] == expected
+
+
+def test_no_data():
+    accumulator = metrics.StreamingGroupMetric(skm.accuracy_score)
+
+    with pytest.raises(ValueError) as exception_context:
+        accumulator.result()
+
+    assert exception_context.value.args[0] == "No data have been supplied"
+
+
+def test_non_binary_classification_data():
+    accumulator = metrics.StreamingGroupMetric(skm.recall_score)
+
+    with pytest.raises(ValueError) as exception_context:
+        accumulator.update([0, 1, 2], [0, 1, 1], [0, 0, 1])
+
+    expected = "Only 0 and 1 are allowed in y_true and y_pred"
+    assert exception_context.value.args[0] == expected
+
+
+# ======================================================
+
+
+def _split_states(metric_function, n_parts):
+    states = []
+    for y_t, y_p, gid in _chunks(len(Y_true) // n_parts + 1, Y_true, Y_pred, groups):
+        states.append(metrics.StreamingGroupMetric(metric_function).update(y_t, y_p, gid))
+    return states
+
+
+@pytest.mark.parametrize("metric_function", decomposable_metrics)
+def test_merge_matches_metric_by_group(metric_function):
+    first, second, third = _split_states(metric_function, 3)
+
+    expected = metrics.metric_by_group(metric_function, Y_true, Y_pred, groups)
+    assert_results_match(expected, first.merge(second).merge(third).result())
+    assert_results_match(expected, first.merge(second.merge(third)).result())
+    assert_results_match(expected, third.merge(first).merge(second).result())
+
+
+def test_merge_does_not_modify_inputs():
+    first, second = _split_states(skm.accuracy_score, 2)
+    first_result = first.result()
+    second_result = second.result()
+
+    _ = first.merge(second)
+
+    assert first.result() == first_result
+    assert second.result() == second_result
+
+
+def test_merge_different_metrics():
+    first = metrics.StreamingGroupMetric(skm.accuracy_score)
+    second = metrics.StreamingGroupMetric(skm.recall_score)
+
+    with pytest.raises(ValueError) as exception_context:
+        first.merge(second)
+
+    expected = "Cannot merge states accumulated for different metrics"
+    assert exception_context.value.args[0] == expected
+
+
+def test_pickle_round_trip():
+    accumulator = metrics.StreamingGroupMetric(skm.mean_squared_error)
+    accumulator.update(Y_true, Y_pred, groups, weight)
+
+    restored = pickle.loads(pickle.dumps(accumulator))
+
+    assert restored.result() == accumulator.result()
+    assert restored.merge(accumulator).result() == accumulator.merge(accumulator).result()
+
+
+@pytest.mark.parametrize("n_shards", [1, 2, 5, 50])
+@pytest.mark.parametrize("metric_function", decomposable_metrics)
+def test_sharded_metric_by_group(metric_function, n_shards):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = metrics.sharded_metric_by_group(metric_function, Y_true, Y_pred, groups,
+                                                 sample_weight=weight,
+                                                 n_shards=n_shards, executor=executor)
+
+    expected = metrics.metric_by_group(metric_function, Y_true, Y_pred, groups,
+                                       sample_weight=weight)
+    assert_results_match(expected, result)
+
+
+def test_sharded_metric_by_group_process_pool():
+    result = metrics.sharded_metric_by_group(skm.accuracy_score, Y_true, Y_pred, groups,
+                                             n_shards=3)
+
+    expected = metrics.group_accuracy_score(Y_true, Y_pred, groups)
+    assert_results_match(expected, result)
+
+
+def test_sharded_metric_by_group_bad_n_shards():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.sharded_metric_by_group(skm.accuracy_score, Y_true, Y_pred, groups,
+                                        n_shards=0)
+
+    assert exception_context.value.args[0] == "n_shards must be a positive integer"
+
+
+def test_sharded_metric_by_group_no_data():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.sharded_metric_by_group(skm.accuracy_score, [], [], [])
+
+    assert exception_context.value.args[0] == "No data have been supplied"
+
+
+# ======================================================
+# Order statistics, evaluated with quantile sketches
+
+Y_reg_true = [1.5, 2.0, 0.5, 3.0, 4.5, 2.5, 1.0, 0.0, 3.5,
+              2.0, 1.0, 5.0, 4.0, 2.5, 0.5, 1.5, 3.0, 2.0]
+Y_reg_pred = [1.0, 2.5, 0.0, 3.0, 3.5, 3.0, 2.5, 0.5, 3.0,
+              1.0, 1.5, 4.0, 4.5, 2.0, 1.5, 1.0, 2.0, 2.5]
+
+sketched_metrics = [skm.median_absolute_error, skm.max_error]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 100])
+@pytest.mark.parametrize("metric_function", sketched_metrics)
+def test_order_statistic_exact_for_small_groups(metric_function, chunk_size):
+    accumulator = metrics.StreamingGroupMetric(metric_function)
+    accumulator.update_from_chunks(_chunks(chunk_size, Y_reg_true, Y_reg_pred, groups))
+
+    expected = metrics.metric_by_group(metric_function, Y_reg_true, Y_reg_pred, groups)
+    assert_results_match(expected, accumulator.result())
+
+
+@pytest.mark.parametrize("metric_function", sketched_metrics)
+def test_order_statistic_merge(metric_function):
+    first = metrics.StreamingGroupMetric(metric_function).update(
+        Y_reg_true[:7], Y_reg_pred[:7], groups[:7])
+    second = metrics.StreamingGroupMetric(metric_function).update(
+        Y_reg_true[7:], Y_reg_pred[7:], groups[7:])
+
+    expected = metrics.metric_by_group(metric_function, Y_reg_true, Y_reg_pred, groups)
+    assert_results_match(expected, first.merge(second).result())
+    assert_results_match(expected, second.merge(first).result())
+
+    # Updating a merged state does not change the states which were merged
+    merged = first.merge(second)
+    merged.update(Y_reg_true, [y + 10 for y in Y_reg_pred], groups)
+    assert_results_match(expected, first.merge(second).result())
+
+
+@pytest.mark.parametrize("sketch_size", [50, 200])
+def test_approximate_median_absolute_error(sketch_size):
+    rng = np.random.RandomState(11)
+    n = 200000
+    y_true = rng.normal(size=n)
+    y_pred = y_true + rng.standard_t(3, size=n)
+    group_membership = rng.randint(3, size=n)
+
+    accumulator = metrics.StreamingGroupMetric(skm.median_absolute_error,
+                                               sketch_size=sketch_size)
+    accumulator.update_from_chunks(_chunks(4096, y_true, y_pred, group_membership))
+    result = accumulator.result()
+
+    # Check the rank of each estimate, which is what the sketch bounds
+    errors = np.abs(y_pred - y_true)
+    tolerance = 2 / sketch_size
+    overall_rank = np.mean(errors <= result.overall)
+    assert overall_rank == pytest.approx(0.5, abs=tolerance)
+    for g in range(3):
+        group_errors = errors[group_membership == g]
+        assert np.mean(group_errors <= result.by_group[g]) == pytest.approx(0.5, abs=tolerance)
+
+    expected_max = metrics.group_max_error(y_true, y_pred, group_membership)
+    max_result = metrics.StreamingGroupMetric(skm.max_error).update(
+        y_true, y_pred, group_membership).result()
+    assert_results_match(expected_max, max_result)
+
+
+def test_order_statistic_pickle_round_trip():
+    accumulator = metrics.StreamingGroupMetric(skm.median_absolute_error)
+    accumulator.update(Y_reg_true, Y_reg_pred, groups)
+
+    restored = pickle.loads(pickle.dumps(accumulator))
+    assert_results_match(accumulator.result(), restored.result())
+
+
+def test_sharded_median_absolute_error():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = metrics.sharded_metric_by_group(skm.median_absolute_error,
+                                                 Y_reg_true, Y_reg_pred, groups,
+                                                 n_shards=3, executor=executor)
+
+    expected = metrics.metric_by_group(skm.median_absolute_error,
+                                       Y_reg_true, Y_reg_pred, groups)
+    assert_results_match(expected, result)
+
+
+def test_order_statistic_sample_weight():
+    accumulator = metrics.StreamingGroupMetric(skm.median_absolute_error)
+
+    with pytest.raises(ValueError) as exception_context:
+        accumulator.update(Y_reg_true, Y_reg_pred, groups, weight)
+
+    expected = "Sample weights are not supported for median_absolute_error"
+    assert exception_context.value.args[0] == expected
+
+
+@pytest.mark.parametrize("sketch_size", [4, 10.5])
+def test_bad_sketch_size(sketch_size):
+    with pytest.raises(ValueError) as exception_context:
+        metrics.StreamingGroupMetric(skm.median_absolute_error, sketch_size=sketch_size)
+
+    expected = "sketch_size must be an integer of at least 8"
+    assert exception_context.value.args[0] == expected
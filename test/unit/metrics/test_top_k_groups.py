@@ -0,0 +1,158 @@
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License.
+
+import numpy as np
+import pandas as pd
+import pytest
+import sklearn.metrics as skm
+
+import fairlearn.metrics as metrics
+from test.unit.input_convertors import conversions_for_1d
+
+# ======================================================
+
+Y_true = [0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 0, 1]
+Y_pred = [1, 0, 1, 0, 1, 0, 0, 1, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1]
+groups = ['d', 'e', 'b', 'a', 'a', 'a', 'd', 'c', 'a', 'b',
+          'c', 'd', 'e', 'a', 'b', 'c', 'd', 'e', 'f', 'f']
+weight = [1, 2, 3, 1, 2, 3, 4, 2, 3, 3, 2, 1, 2, 3, 1, 2, 3, 4, 1, 2]
+numbers = [1, 2, 1, 2, 1, 2, 1, 2, 1, 2, 1, 2, 1, 2, 1, 2, 1, 2, 1, 2]
+
+# ======================================================
+
+
+def _ranked(expected, min_support, greater_is_better):
+    """Rank the groups of a full result, for comparison."""
+    counts = pd.Series(groups).value_counts()
+    values = expected.to_pandas()
+    supported = [g for g in values.index if counts[g] >= min_support]
+    return values[supported].sort_values(ascending=not greater_is_better, kind='stable')
+
+
+@pytest.mark.parametrize("transform_gid", conversions_for_1d)
+@pytest.mark.parametrize("sample_weight", [None, weight])
+def test_matches_metric_by_group(transform_gid, sample_weight):
+    expected = metrics.metric_by_group(skm.accuracy_score, Y_true, Y_pred, groups,
+                                       sample_weight=sample_weight)
+
+    result = metrics.metric_by_group_top_k(skm.accuracy_score, Y_true, Y_pred,
+                                           transform_gid(groups), k=2,
+                                           sample_weight=sample_weight)
+
+    assert result.overall == pytest.approx(expected.overall)
+    assert result.n_groups == 6
+    assert result.n_ranked_groups == 6
+    assert list(result.best.columns) == ['value', 'support']
+    for table in [result.best, result.worst]:
+        assert len(table) == 2
+        for group, row in table.iterrows():
+            assert row['value'] == pytest.approx(expected.by_group[group])
+            assert row['support'] == groups.count(group)
+    assert list(result.best['value']) == pytest.approx(sorted(expected.to_numpy())[::-1][:2])
+    assert list(result.worst['value']) == pytest.approx(sorted(expected.to_numpy())[:2])
+
+    summary = result.summary
+    assert summary['mean'] == pytest.approx(expected.to_numpy().mean())
+    assert summary['min'] == pytest.approx(expected.minimum)
+    assert summary['max'] == pytest.approx(expected.maximum)
+    assert summary['50%'] == pytest.approx(np.median(expected.to_numpy()))
+
+
+def test_min_support():
+    expected = metrics.metric_by_group(skm.mean_squared_error, Y_true, Y_pred, groups)
+
+    result = metrics.metric_by_group_top_k(skm.mean_squared_error, Y_true, Y_pred, groups,
+                                           k=3, min_support=4, greater_is_better=False)
+
+    # Only groups 'a' and 'd' have four or more samples
+    ranked = _ranked(expected, 4, False)
+    assert result.n_ranked_groups == 2
+    assert list(result.best.index) == list(ranked.index)
+    assert list(result.worst.index) == list(ranked.index[::-1])
+    assert result.overall == pytest.approx(expected.overall)
+
+
+def test_several_features():
+    features = pd.DataFrame({'letter': groups, 'number': numbers})
+    expected = metrics.metric_by_group(skm.recall_score, Y_true, Y_pred, features)
+
+    result = metrics.metric_by_group_top_k(skm.recall_score, Y_true, Y_pred, features, k=20)
+
+    assert result.n_groups == len(expected.by_group)
+    assert sorted(result.best.index) == sorted(expected.by_group.keys())
+    for group, row in result.best.iterrows():
+        assert row['value'] == pytest.approx(expected.by_group[group])
+
+
+def test_group_index():
+    index = metrics.GroupIndex(groups)
+
+    expected = metrics.metric_by_group_top_k(skm.zero_one_loss, Y_true, Y_pred, groups, k=3)
+    result = metrics.metric_by_group_top_k(skm.zero_one_loss, Y_true, Y_pred, index, k=3)
+
+    assert list(result.best['value']) == list(expected.best['value'])
+    assert list(result.worst['value']) == list(expected.worst['value'])
+
+
+def test_ties_by_first_appearance():
+    result = metrics.metric_by_group_top_k(skm.accuracy_score, [1, 1, 1, 1], [1, 1, 1, 1],
+                                           ['z', 'y', 'x', 'y'], k=2)
+
+    assert list(result.best.index) == ['z', 'y']
+    assert list(result.worst.index) == ['z', 'y']
+
+
+def test_missing_group_labels():
+    result = metrics.metric_by_group_top_k(skm.accuracy_score, [1, 0, 1, 0], [1, 1, 1, 1],
+                                           ['a', None, 'a', None], k=2)
+
+    assert result.n_groups == 2
+    assert list(result.best['value']) == [1, 0]
+    assert pd.isna(result.best.index[1])
+
+
+def test_single_class_group_not_ranked():
+    y_true = [0, 1, 0, 1, 0, 0]
+    y_pred = [0.2, 0.9, 0.4, 0.6, 0.1, 0.3]
+    group_ids = ['a', 'a', 'b', 'b', 'c', 'c']
+
+    # Group 'c' has no positive samples, so the metric is undefined for it
+    result = metrics.metric_by_group_top_k(metrics.balanced_root_mean_squared_error,
+                                           y_true, y_pred, group_ids, k=3,
+                                           greater_is_better=False)
+
+    assert result.n_groups == 3
+    assert result.n_ranked_groups == 2
+    assert list(result.best.index) == ['a', 'b']
+    assert list(result.best['value']) == pytest.approx([0.15, 0.4])
+    assert result.overall == pytest.approx(
+        metrics.balanced_root_mean_squared_error(y_true, y_pred))
+
+
+def test_single_class_overall():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.metric_by_group_top_k(metrics.balanced_root_mean_squared_error,
+                                      [0, 0, 0], [0.2, 0.4, 0.1], ['a', 'b', 'c'])
+    expected = "Only 0 and 1 are allowed in y_true and both must be present"
+    assert exception_context.value.args[0] == expected
+
+
+def test_unsupported_metric():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.metric_by_group_top_k(skm.roc_auc_score, Y_true, Y_pred, groups)
+    expected = "The metric roc_auc_score cannot be computed from sums of per-sample statistics"
+    assert exception_context.value.args[0] == expected
+
+
+@pytest.mark.parametrize("k", [0, 1.5, True])
+def test_bad_k(k):
+    with pytest.raises(ValueError) as exception_context:
+        metrics.metric_by_group_top_k(skm.accuracy_score, Y_true, Y_pred, groups, k=k)
+    assert exception_context.value.args[0] == "k must be a positive integer"
+
+
+def test_bad_min_support():
+    with pytest.raises(ValueError) as exception_context:
+        metrics.metric_by_group_top_k(skm.accuracy_score, Y_true, Y_pred, groups,
+                                      min_support=0)
+    assert exception_context.value.args[0] == "min_support must be a positive integer"
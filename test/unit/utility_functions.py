@@ -2,6 +2,26 @@
 # Licensed under the MIT License.
 
 import numpy as np
+import pytest
+import sklearn.metrics as skm
+
+import fairlearn.metrics as metrics
+
+# The metrics which can be computed from sums of per-sample statistics
+decomposable_metrics = [skm.accuracy_score,
+                        skm.precision_score,
+                        skm.recall_score,
+                        skm.zero_one_loss,
+                        skm.mean_absolute_error,
+                        skm.mean_squared_error,
+                        skm.r2_score,
+                        metrics.fallout_rate,
+                        metrics.mean_prediction,
+                        metrics.mean_overprediction,
+                        metrics.mean_underprediction,
+                        metrics.miss_rate,
+                        metrics.selection_rate,
+                        metrics.specificity_score]
 
 
 def logging_all_close(a, b, rtol=1e-05, atol=1e-08, equal_nan=False):
@@ -21,3 +41,15 @@ def logging_all_close(a, b, rtol=1e-05, atol=1e-08, equal_nan=False):
         print("mismatch indices: ", np.where(np.logical_not(match_mask)))
 
     return np.all(match_mask)
+
+
+def assert_results_match(expected, actual, nan_ok=False):
+    """Assert that two grouped metric results hold the same values.
+
+    The values are compared approximately, with NaN values matching each
+    other when ``nan_ok`` is ``True``.
+    """
+    assert expected.overall == pytest.approx(actual.overall, nan_ok=nan_ok)
+    assert list(expected.by_group.keys()) == list(actual.by_group.keys())
+    for k in expected.by_group.keys():
+        assert expected.by_group[k] == pytest.approx(actual.by_group[k], nan_ok=nan_ok)